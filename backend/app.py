@@ -4,13 +4,47 @@ FastAPI Application for Real-Time Outbreak Prediction System.
 
 import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
 
-from config import FEATURE_ORDER, MODEL_VERSION, REFRESH_INTERVAL
-from services import ModelService, SimulationService, PredictionService, WebSocketManager
+from config import (
+    FEATURE_ORDER,
+    HISTORY_MAX_POINTS,
+    HISTORY_QUERY_WINDOW,
+    LAG_STATE_PATH,
+    MODEL_PATH,
+    PREDICTION_CACHE_ENABLED,
+    REFRESH_INTERVAL,
+    WS_PER_MESSAGE_DEFLATE,
+)
+from services import (
+    ModelService,
+    ModelWatcher,
+    HttpPushSource,
+    create_feature_source,
+    ModelRegistry,
+    PredictionCache,
+    SimulationService,
+    PredictionService,
+    WebSocketManager,
+    PredictionExecutor,
+    TickScheduler,
+    ReadinessTracker,
+    REGISTRY,
+    available_encodings,
+    create_prediction_bus,
+    create_leader_election,
+    run_while_leader,
+    create_history_store,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -19,51 +53,203 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize services
-model_service = ModelService()
-simulation_service = SimulationService()
-prediction_service = PredictionService(model_service, simulation_service)
-websocket_manager = WebSocketManager()
+# Readiness: the model has finished loading and the loop has produced a batch
+readiness = ReadinessTracker(checks=["model", "prediction_loop"])
+
+# Services, built by build_services() when the app starts rather than on import
+model_service = None
+model_registry = None
+simulation_service = None
+prediction_service = None
+websocket_manager = None
+prediction_executor = None
+tick_scheduler = None
+model_watcher = None
+feature_source = None
+prediction_bus = None
+leader_election = None
+history_store = None
 
-# Background task reference
+# Background task references
 background_task = None
+watcher_task = None
+
+
+def build_services() -> None:
+    """
+    Construct the services before the app accepts requests.
+    
+    This restores lag state and opens the history directory, but loads no
+    model and imports no xgboost; that happens in start_services.
+    """
+    global model_service, model_registry, simulation_service, prediction_service
+    global websocket_manager, prediction_executor, tick_scheduler, model_watcher
+    global feature_source, prediction_bus, leader_election, history_store
+    
+    with readiness.phase("construct_services"):
+        model_service = ModelService(cache=PredictionCache() if PREDICTION_CACHE_ENABLED else None)
+        model_registry = ModelRegistry(model_service)
+        simulation_service = SimulationService(state_path=LAG_STATE_PATH)
+        prediction_service = PredictionService(model_service, simulation_service, model_registry)
+        websocket_manager = WebSocketManager()
+        prediction_executor = PredictionExecutor(prediction_service)
+        tick_scheduler = TickScheduler()
+        model_watcher = ModelWatcher(model_service, executor=prediction_executor)
+        feature_source = create_feature_source()
+        prediction_bus = create_prediction_bus()
+        leader_election = create_leader_election()
+        history_store = create_history_store()
+
+
+def is_leader() -> bool:
+    """Whether this worker produces prediction batches (always, without an election)."""
+    return leader_election is None or leader_election.is_leader
+
+
+class ModelReloadRequest(BaseModel):
+    """Body of an admin model reload request."""
+    model: str = "default"
+    path: Optional[str] = None
+    version: Optional[str] = None
+
+
+class IngestRequest(BaseModel):
+    """Body of an HTTP observation push: one object per district observation."""
+    observations: List[Dict[str, Any]]
+
+
+async def run_prediction_tick(observations: Optional[Dict[str, Any]] = None):
+    """
+    Run one prediction tick: predict all districts and broadcast the batch.
+    
+    Predictions run in the prediction executor so the event loop stays free
+    for health checks, metadata requests and websocket traffic. With a
+    prediction bus the batch is published instead, and every worker's bus
+    loop broadcasts it to that worker's clients.
+    
+    Args:
+        observations: Observed columns to score instead of simulated features.
+    """
+    try:
+        tick_start = time.perf_counter()
+        
+        # Generate batch predictions off the event loop
+        batch, executor_time = await prediction_executor.run_batch(observations)
+        executor_wall_time = time.perf_counter() - tick_start
+        
+        if prediction_bus is None:
+            # Broadcast to all connected clients
+            await websocket_manager.broadcast(batch)
+            readiness.mark("prediction_loop")
+            action = "Broadcast"
+        else:
+            await prediction_bus.publish(batch)
+            action = f"Published ({prediction_bus.kind} bus)"
+        
+        loop_time = time.perf_counter() - tick_start - executor_wall_time
+        outbreak_count = sum(1 for item in batch["items"] if item["outbreak_flag"])
+        logger.info(
+            f"{action} batch: {len(batch['items'])} predictions, "
+            f"{outbreak_count} outbreaks, "
+            f"{websocket_manager.get_connection_count()} clients "
+            f"(executor {executor_time:.3f}s, "
+            f"waiting {executor_wall_time - executor_time:.3f}s, "
+            f"event loop {loop_time:.3f}s)"
+        )
+    
+    except Exception as e:
+        logger.error(f"Error in prediction loop: {e}")
+        readiness.mark("prediction_loop", False)
+        return
+    
+    if history_store is not None:
+        try:
+            await asyncio.to_thread(history_store.append, batch["items"])
+        except Exception as e:
+            logger.error(f"Failed to record prediction history: {e}")
 
 
 async def prediction_loop():
     """Background task that runs predictions every REFRESH_INTERVAL seconds."""
-    logger.info(f"Starting prediction loop (interval: {REFRESH_INTERVAL}s)")
+    logger.info(
+        f"Starting prediction loop (interval: {REFRESH_INTERVAL}s, "
+        f"missed tick policy: {tick_scheduler.policy})"
+    )
+    await tick_scheduler.run(run_prediction_tick)
+
+
+async def ingestion_loop():
+    """Background task that scores and broadcasts each chunk from the feature source."""
+    logger.info(f"Starting ingestion loop ({feature_source.kind} source)")
+    readiness.mark("prediction_loop")
     
-    while True:
+    producer = asyncio.create_task(feature_source.run())
+    try:
+        async for observations in feature_source.chunks():
+            await run_prediction_tick(observations)
+    finally:
+        producer.cancel()
+
+
+async def produce_batches():
+    """
+    Run the prediction loop, fed by the simulator or the feature source.
+    
+    When the loop stops (shutdown or lost leadership) lag state is saved at
+    once, so whoever produces batches next resumes from the last tick.
+    """
+    try:
+        if feature_source is None:
+            await prediction_loop()
+        else:
+            await ingestion_loop()
+    finally:
         try:
-            # Generate batch predictions
-            batch = prediction_service.predict_batch()
-            
-            # Broadcast to all connected clients
-            await websocket_manager.broadcast(batch)
-            
-            outbreak_count = sum(1 for item in batch["items"] if item["outbreak_flag"])
-            logger.info(
-                f"Broadcast batch: {len(batch['items'])} predictions, "
-                f"{outbreak_count} outbreaks, "
-                f"{websocket_manager.get_connection_count()} clients"
-            )
-            
+            await prediction_executor.save_lag_state()
         except Exception as e:
-            logger.error(f"Error in prediction loop: {e}")
-        
-        await asyncio.sleep(REFRESH_INTERVAL)
+            logger.error(f"Failed to save lag state: {e}")
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan handler for startup and shutdown."""
-    global background_task
+async def lead_bus():
+    """
+    Produce batches for every worker while this one is the elected leader.
     
-    # Startup
-    logger.info("Starting Outbreak Prediction System...")
+    Picks up the lag state snapshot left by the previous leader before the
+    first tick, so forecasts continue where it stopped, and reloads the
+    history writer state that leader may have changed on disk.
+    """
+    await prediction_executor.reload_lag_state()
+    if history_store is not None:
+        await asyncio.to_thread(history_store.reset_writer)
+    server = asyncio.create_task(prediction_bus.serve())
+    try:
+        await produce_batches()
+    finally:
+        server.cancel()
+
+
+async def bus_loop():
+    """Background task that broadcasts each batch from the prediction bus to this worker's clients."""
+    logger.info(f"Subscribing to the {prediction_bus.kind} prediction bus")
+    async for batch, frames in prediction_bus.subscribe():
+        await websocket_manager.broadcast(batch, frames)
+        readiness.mark("prediction_loop")
+
+
+async def start_services():
+    """
+    Staged startup, run in the background so the server accepts requests at once.
     
+    Loads the model (importing xgboost) off the event loop, warms up the
+    prediction path on a synthetic batch, then starts the prediction loop.
+    With a prediction bus, every worker subscribes to it and only the
+    elected leader runs the prediction loop.
+    """
     # Load model
-    if model_service.load_model():
+    with readiness.phase("load_model"):
+        loaded = await asyncio.to_thread(model_service.load_model)
+    
+    if loaded:
         logger.info("Model loaded successfully")
     else:
         logger.warning(
@@ -71,19 +257,66 @@ async def lifespan(app: FastAPI):
             "Place your model at: backend/model/xgb_log_target.model"
         )
     
-    # Start background prediction loop
-    background_task = asyncio.create_task(prediction_loop())
+    # Load routed and shadow models held alongside the default one
+    with readiness.phase("load_registry"):
+        registry_loaded = await asyncio.to_thread(model_registry.load_models)
+    for name, ok in registry_loaded.items():
+        if not ok:
+            logger.warning(f"Registry model {name} not loaded; its districts use the default model")
+    
+    # Warm up where batches run (the worker process with the process executor),
+    # so the first real tick is not slow
+    prediction_executor.start()
+    try:
+        with readiness.phase("warm_up"):
+            await prediction_executor.warm_up()
+    except Exception as e:
+        logger.warning(f"Warm-up failed: {e}")
+    readiness.mark("model")
+    
+    # Start background prediction loop, fed by the simulator or the feature source
+    if prediction_bus is None:
+        await produce_batches()
+        return
+    
+    subscriber = asyncio.create_task(bus_loop())
+    try:
+        if leader_election is None:
+            await lead_bus()
+        else:
+            await run_while_leader(leader_election, lead_bus)
+    finally:
+        subscriber.cancel()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan handler for startup and shutdown."""
+    global background_task, watcher_task
+    
+    # Startup
+    logger.info("Starting Outbreak Prediction System...")
+    build_services()
+    background_task = asyncio.create_task(start_services())
+    watcher_task = asyncio.create_task(model_watcher.run())
     
     yield
     
     # Shutdown
     logger.info("Shutting down Outbreak Prediction System...")
-    if background_task:
-        background_task.cancel()
-        try:
-            await background_task
-        except asyncio.CancelledError:
-            pass
+    for task in (watcher_task, background_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    prediction_executor.shutdown()
+    await websocket_manager.shutdown()
+    if prediction_bus is not None:
+        await prediction_bus.close()
+    if history_store is not None:
+        history_store.close()
 
 
 # Create FastAPI app
@@ -112,6 +345,12 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "metadata": "/metadata",
+            "metrics": "/metrics",
+            "livez": "/livez",
+            "readyz": "/readyz",
+            "model_reload": "/admin/model/reload",
+            "ingest": "/ingest",
+            "history": "/history",
             "websocket": "/ws",
         }
     }
@@ -126,11 +365,22 @@ async def get_metadata():
     """
     return {
         "feature_list": FEATURE_ORDER,
-        "model_version": MODEL_VERSION,
+        "model_version": model_service.model_version,
         "refresh_interval": REFRESH_INTERVAL,
         "model_loaded": model_service.is_loaded,
+        "model": model_service.get_model_info(),
+        "model_registry": await prediction_executor.registry_status(),
         "districts": simulation_service.get_districts(),
         "active_connections": websocket_manager.get_connection_count(),
+        "encodings": available_encodings(),
+        "scheduler": tick_scheduler.get_stats(),
+        "feature_source": (
+            feature_source.get_stats() if feature_source is not None else {"kind": "simulated"}
+        ),
+        "prediction_bus": (
+            {**prediction_bus.get_stats(), "leader": is_leader()}
+            if prediction_bus is not None else {"kind": "none"}
+        ),
     }
 
 
@@ -138,18 +388,201 @@ async def get_metadata():
 async def health_check():
     """Health check endpoint."""
     return {
-        "status": "healthy",
+        "status": "healthy" if readiness.ready else "starting",
+        "ready": readiness.ready,
         "model_loaded": model_service.is_loaded,
         "active_connections": websocket_manager.get_connection_count(),
     }
 
 
+@app.get("/livez")
+async def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readiness_check():
+    """
+    Readiness probe.
+    
+    Returns 200 once the model has finished loading and the prediction loop
+    has produced a batch, 503 before that. Includes startup phase timings.
+    """
+    status = readiness.get_status()
+    status["model_loaded"] = model_service.is_loaded
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics endpoint.
+    
+    Exposes hot-path timings (feature generation, vectorization, model
+    predict, serialization, client sends), batch and outbreak counts, tick
+    scheduling stats and websocket client counts.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/model/reload")
+async def reload_model(request: Optional[ModelReloadRequest] = None):
+    """
+    Load a new model in the background and swap it in between ticks.
+    
+    The model names a registry entry ("default" unless given). The path
+    defaults to that model's file and must be inside the model directory.
+    The reload reaches the process that scores batches, including a
+    process-pool worker. Responds 409 if the candidate fails validation or
+    warm-up; the previous model keeps serving in that case.
+    """
+    request = request or ModelReloadRequest()
+    try:
+        target = model_registry.get(request.model)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {request.model}")
+    
+    path = None
+    if request.path is not None:
+        model_dir = Path(MODEL_PATH).parent.resolve()
+        path = (model_dir / request.path).resolve()
+        if path.parent != model_dir:
+            raise HTTPException(status_code=400, detail="Model path must be inside the model directory")
+        if not path.exists():
+            raise HTTPException(status_code=404, detail=f"Model file not found: {path.name}")
+    
+    if target is model_service:
+        swapped = await model_watcher.reload(path, request.version)
+    else:
+        swapped = await prediction_executor.reload_model(request.model, path, request.version)
+    if not swapped:
+        raise HTTPException(status_code=409, detail="Model rejected; previous model still serving")
+    return {"status": "reloaded", "model": target.get_model_info()}
+
+
+@app.post("/ingest", status_code=202)
+async def ingest(request: IngestRequest):
+    """
+    Push a batch of district observations to be scored (FEATURE_SOURCE = "http").
+    
+    Each observation needs a "district" field plus any FEATURE_ORDER columns
+    (and optionally a "disease" name). A push is queued as chunks of
+    INGEST_CHUNK_ROWS rows; it is rejected with 413 if it could never fit in
+    the ingest queue and with 429 while the queue lacks room for it (retry
+    after a tick). With a prediction bus only the leader accepts pushes;
+    other workers respond 503.
+    """
+    if not isinstance(feature_source, HttpPushSource):
+        raise HTTPException(status_code=404, detail="HTTP ingestion is not enabled")
+    if not is_leader():
+        raise HTTPException(
+            status_code=503,
+            detail="Not the prediction leader",
+            headers={"Retry-After": str(REFRESH_INTERVAL)},
+        )
+    if not request.observations:
+        raise HTTPException(status_code=400, detail="No observations")
+    if len(request.observations) > feature_source.max_rows:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {feature_source.max_rows} observations can be pushed at once",
+        )
+    
+    try:
+        accepted = feature_source.offer(request.observations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not accepted:
+        raise HTTPException(
+            status_code=429,
+            detail="Ingest queue full",
+            headers={"Retry-After": str(REFRESH_INTERVAL)},
+        )
+    return {"accepted": len(request.observations), **feature_source.get_stats()}
+
+
+def _history_range(start: Optional[datetime], end: Optional[datetime]) -> Tuple[float, float]:
+    """Resolve a history query range to unix seconds; naive datetimes are UTC."""
+    end_ts = _to_timestamp(end) if end is not None else time.time()
+    start_ts = _to_timestamp(start) if start is not None else end_ts - HISTORY_QUERY_WINDOW
+    if start_ts > end_ts:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return start_ts, end_ts
+
+
+def _to_timestamp(value: datetime) -> float:
+    """Convert a datetime to unix seconds, reading naive values as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+@app.get("/history")
+async def history_status():
+    """Get the history store's segment count, row count and time range."""
+    if history_store is None:
+        raise HTTPException(status_code=404, detail="Prediction history is disabled")
+    return await asyncio.to_thread(history_store.get_stats)
+
+
+@app.get("/history/{district}")
+async def district_history(
+    district: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(HISTORY_MAX_POINTS, ge=1, le=HISTORY_MAX_POINTS),
+):
+    """
+    Get a district's recorded predictions in a time range.
+    
+    start and end are ISO-8601 times or unix seconds; end defaults to now and
+    start to HISTORY_QUERY_WINDOW before end. Returns one list per column,
+    with "ts" in unix seconds. At most limit rows are returned, the latest
+    ones; use /history/{district}/downsampled for longer ranges.
+    """
+    if history_store is None:
+        raise HTTPException(status_code=404, detail="Prediction history is disabled")
+    start_ts, end_ts = _history_range(start, end)
+    return await asyncio.to_thread(history_store.query, district, start_ts, end_ts, limit)
+
+
+@app.get("/history/{district}/downsampled")
+async def district_history_downsampled(
+    district: str,
+    step: float = Query(..., gt=0, description="Bucket width in seconds"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """
+    Get a district's predictions aggregated into buckets of step seconds.
+    
+    Each non-empty bucket reports its start time, row count, mean and max
+    predicted cases, mean and max outbreak probability and outbreak count.
+    """
+    if history_store is None:
+        raise HTTPException(status_code=404, detail="Prediction history is disabled")
+    start_ts, end_ts = _history_range(start, end)
+    if (end_ts - start_ts) / step > HISTORY_MAX_POINTS:
+        raise HTTPException(
+            status_code=400, detail=f"Range needs more than {HISTORY_MAX_POINTS} buckets; use a larger step"
+        )
+    return await asyncio.to_thread(history_store.downsample, district, start_ts, end_ts, step)
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for real-time prediction updates.
     
     Clients connect here to receive batch predictions every REFRESH_INTERVAL seconds.
+    Frames are JSON text by default; connect with ?encoding=msgpack (or the
+    "msgpack" subprotocol) to receive MessagePack binary frames instead.
+    Connect with ?mode=delta to receive a snapshot followed by per-district
+    deltas; send {"type": "resync"} after a sequence gap to get a new snapshot.
+    Send {"type": "subscribe", "districts": [...], "diseases": [...],
+    "outbreaks_only": true} to receive only matching items.
     """
     await websocket_manager.connect(websocket)
     
@@ -164,18 +597,14 @@ async def websocket_endpoint(websocket: WebSocket):
             }
         )
         
+        await websocket_manager.send_initial_state(websocket)
+        
         # Keep connection alive
         while True:
             try:
-                # Wait for any client messages (ping/pong, etc.)
+                # Wait for any client messages (ping/pong, resync, etc.)
                 data = await websocket.receive_text()
-                
-                # Handle client messages if needed
-                if data == "ping":
-                    await websocket_manager.send_personal_message(
-                        websocket,
-                        {"type": "pong"}
-                    )
+                await websocket_manager.handle_client_message(websocket, data)
                     
             except WebSocketDisconnect:
                 break
@@ -188,4 +617,4 @@ async def websocket_endpoint(websocket: WebSocket):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    uvicorn.run(app, host="0.0.0.0", port=8001, ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE)
@@ -0,0 +1,229 @@
+"""
+Benchmark suite for the prediction pipeline.
+
+Runs SimulationService, PredictionService and ModelService stage by stage
+and end to end at configurable district counts with fixed seeds, and drives
+WebSocketManager.broadcast against in-process fake clients. Results are
+printed (or written) as JSON so runs can be compared across commits.
+
+Usage (from the backend directory):
+    python benchmarks/bench_pipeline.py --districts 10 1000 100000 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import numpy as np
+
+from config import MODEL_PATH
+from services import ModelService, PredictionService, SimulationService, WebSocketManager
+
+# Dict-based stages are skipped above this many districts unless overridden
+DEFAULT_MAX_DICT_DISTRICTS = 10000
+
+
+class FakeWebSocket:
+    """In-process stand-in for a websocket client that counts received frames."""
+    
+    def __init__(self, on_frame: Callable[[], None]):
+        self.query_params: Dict[str, str] = {}
+        self.scope: Dict[str, Any] = {}
+        self.bytes_received = 0
+        self._on_frame = on_frame
+    
+    async def accept(self, subprotocol: str = None) -> None:
+        pass
+    
+    async def send_text(self, data: str) -> None:
+        self.bytes_received += len(data)
+        self._on_frame()
+    
+    async def send_bytes(self, data: bytes) -> None:
+        self.bytes_received += len(data)
+        self._on_frame()
+    
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+def summarize(name: str, rows: int, samples: List[float]) -> Dict[str, Any]:
+    """
+    Summarize timing samples for one stage.
+    
+    Args:
+        name: Stage name.
+        rows: Rows (districts) processed per sample.
+        samples: Durations in seconds.
+    
+    Returns:
+        Dict with latency percentiles and throughput.
+    """
+    latencies = np.array(samples)
+    p50 = float(np.percentile(latencies, 50))
+    return {
+        "stage": name,
+        "districts": rows,
+        "repeat": len(samples),
+        "p50_ms": round(p50 * 1000, 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+        "mean_ms": round(float(latencies.mean()) * 1000, 3),
+        "rows_per_second": round(rows / p50, 1) if p50 > 0 else None,
+    }
+
+
+def time_stage(fn: Callable[[], Any], repeat: int, warmup: int) -> List[float]:
+    """Run fn warmup + repeat times and return the timed durations."""
+    for _ in range(warmup):
+        fn()
+    
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def time_broadcast(batch: Dict[str, Any], clients: int, repeat: int) -> List[float]:
+    """
+    Time WebSocketManager.broadcast until every fake client received the frame.
+    
+    Args:
+        batch: The batch prediction message to broadcast.
+        clients: Number of fake clients to connect.
+        repeat: Number of timed broadcasts.
+    
+    Returns:
+        List of durations in seconds.
+    """
+    manager = WebSocketManager()
+    pending = 0
+    done = asyncio.Event()
+    
+    def on_frame() -> None:
+        nonlocal pending
+        pending -= 1
+        if pending == 0:
+            done.set()
+    
+    for _ in range(clients):
+        await manager.connect(FakeWebSocket(on_frame))
+    
+    samples = []
+    for _ in range(repeat):
+        pending = clients
+        done.clear()
+        start = time.perf_counter()
+        await manager.broadcast(batch)
+        await done.wait()
+        samples.append(time.perf_counter() - start)
+    
+    await manager.shutdown()
+    return samples
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every stage at every district count."""
+    model_service = ModelService()
+    if not model_service.load_model():
+        raise SystemExit(f"Model not found at {MODEL_PATH}")
+    
+    results = []
+    for n_districts in args.districts:
+        random.seed(args.seed)
+        districts = [f"district_{idx}" for idx in range(n_districts)]
+        simulation = SimulationService(districts=districts, seed=args.seed)
+        prediction = PredictionService(model_service, simulation)
+        
+        def stage(name: str, fn: Callable[[], Any]) -> None:
+            samples = time_stage(fn, args.repeat, args.warmup)
+            results.append(summarize(name, n_districts, samples))
+            logging.info(f"{name} @ {n_districts}: p50 {results[-1]['p50_ms']} ms")
+        
+        stage("generate_matrix", lambda: simulation.generate_feature_matrix(districts))
+        matrix = simulation.generate_feature_matrix(districts)
+        stage("model_predict", lambda: model_service.predict(matrix))
+        
+        if n_districts <= args.max_dict_districts:
+            stage("generate_dicts", lambda: [simulation.generate_features(d) for d in districts])
+            feature_rows = [simulation.generate_features(d) for d in districts]
+            stage("vectorize", lambda: prediction.features_to_matrix(feature_rows))
+        
+        stage("predict_batch", prediction.predict_batch)
+        
+        if args.clients > 0:
+            batch = prediction.predict_batch()
+            samples = asyncio.run(time_broadcast(batch, args.clients, args.repeat))
+            summary = summarize("broadcast", n_districts, samples)
+            summary["clients"] = args.clients
+            results.append(summary)
+    
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "model_path": str(MODEL_PATH),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+
+
+def git_commit() -> str:
+    """Get the current git commit, or "unknown" outside a checkout."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the prediction pipeline.")
+    parser.add_argument("--districts", type=int, nargs="+", default=[10, 1000, 100000],
+                        help="District counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per stage")
+    parser.add_argument("--clients", type=int, default=100,
+                        help="Fake websocket clients for the broadcast stage (0 to skip)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for all random generators")
+    parser.add_argument("--max-dict-districts", type=int, default=DEFAULT_MAX_DICT_DISTRICTS,
+                        help="Skip dict-based stages above this many districts")
+    parser.add_argument("--output", type=Path, help="Write JSON results to this file")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logging.getLogger().setLevel(logging.INFO)
+    logging.getLogger("services").setLevel(logging.WARNING)
+    
+    report = run_benchmarks(args)
+    output = json.dumps(report, indent=2)
+    
+    if args.output:
+        args.output.write_text(output)
+        print(f"Results written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,86 @@ Contains feature ordering, district definitions, and simulation parameters.
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Model Configuration
 MODEL_PATH = Path(__file__).parent / "model" / "xgb_log_target.model"
 MODEL_VERSION = "xgb_log_target"
+MODEL_NTHREAD = 0  # Threads per predict call; 0 uses the XGBoost default
+MODEL_ENGINE = "xgboost"  # "xgboost" or "numpy" (compiled trees, no xgboost import needed)
+MODEL_COMPILED_PATH = Path(__file__).parent / "model" / "xgb_log_target.trees.npz"
+MODEL_ENGINE_CHUNK_ROWS = 1024  # Rows traversed at once by the numpy engine
+WARMUP_ROWS = 64  # Synthetic rows scored at startup before the first tick
+MODEL_WATCH_INTERVAL = 5.0  # seconds between checks of MODEL_PATH for a new model; 0 disables
+MODEL_REGISTRY = {}  # Extra model name -> file in the model directory, held alongside the default model
+MODEL_ROUTES = {}  # District -> registry model name serving it; other districts use the default model
+MODEL_SHADOWS = []  # Registry model names run in shadow on every batch (logged, never broadcast)
 REFRESH_INTERVAL = 10  # seconds
+TICK_MISSED_POLICY = "skip"  # "skip", "catch_up" or "coalesce" when a tick overruns
+
+# Inference Configuration
+BATCH_INFERENCE = True  # Predict all districts with a single model call per tick
+INCLUDE_INPUT_FEATURES = True  # Attach the input feature dict to each prediction
+PREDICTION_EXECUTOR = "thread"  # "thread" or "process" pool for running predictions
+
+# Ingestion Configuration
+FEATURE_SOURCE = "simulated"  # "simulated", "file", "directory" (drop folder) or "http" (POST /ingest)
+INGEST_PATH = None  # CSV/Parquet file for "file", drop directory for "directory"
+INGEST_CHUNK_ROWS = 10000  # Observation rows read and scored per chunk
+INGEST_QUEUE_SIZE = 4  # Chunks buffered between a source and the predictor
+INGEST_POLL_INTERVAL = 2.0  # seconds between drop directory scans
+
+# Prediction Cache Configuration
+PREDICTION_CACHE_ENABLED = False  # Memoize default-model predictions on quantized feature rows
+PREDICTION_CACHE_SIZE = 100000  # Cached rows kept before least recently used rows are evicted
+PREDICTION_CACHE_TTL = 300.0  # seconds a cached prediction stays valid; 0 keeps rows until evicted
+PREDICTION_CACHE_QUANTIZATION = {  # Step each feature group is rounded to before hashing; 0 is exact
+    "weather": 0.1,
+    "lags": 1.0,
+    "demographics": 1.0,
+    "water_quality": 1.0,
+    "wash": 0.1,
+    "health": 0.1,
+    "disease": 0,
+}
+
+# WebSocket Configuration
+WS_SEND_QUEUE_SIZE = 8  # Frames buffered per client before the slow client policy applies
+WS_SEND_TIMEOUT = 5.0  # seconds allowed for a single send before the client is dropped
+WS_SLOW_CLIENT_POLICY = "drop_oldest"  # "drop_oldest" or "disconnect" when a queue is full
+WS_DEFAULT_ENCODING = "json"  # Frame encoding for clients that do not request one
+WS_PER_MESSAGE_DEFLATE = True  # Offer permessage-deflate compression to clients
+WS_BACKFILL_FRAMES = 1  # Latest batch frames replayed to a client right after it connects; 0 disables
+
+# Prediction Bus Configuration
+PREDICTION_BUS = "none"  # "none" (one process), "local" (in-process), "unix" (workers on one host) or "redis"
+BUS_ENCODING = "json"  # Serializer a batch is published in; matching clients get the frame as is
+BUS_SOCKET_PATH = Path(tempfile.gettempdir()) / "outbreak-prediction-bus.sock"  # Leader's socket for "unix"
+BUS_LOCK_PATH = Path(tempfile.gettempdir()) / "outbreak-prediction-leader.lock"  # flock electing the "unix" leader
+BUS_QUEUE_SIZE = 8  # Batches buffered per subscriber before the oldest is dropped
+BUS_MAX_BUFFER_BYTES = 64 * 1024 * 1024  # Unsent bytes a "unix" follower may lag by before it is dropped
+BUS_RECONNECT_DELAY = 1.0  # seconds before a subscriber reconnects to the bus
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")  # redis:// or unix:// URL of a RESP server
+BUS_CHANNEL = "outbreak:predictions"  # Redis pub/sub channel for batches
+LEADER_LOCK_KEY = "outbreak:leader"  # Redis key holding the leader lease
+LEADER_TTL = 5.0  # seconds a Redis leader lease lasts without renewal
+LEADER_RENEW_INTERVAL = 1.0  # seconds between leadership attempts and renewals
+
+# Simulation Configuration
+SIMULATION_MODE = "numpy"  # "numpy" (columnar, vectorized) or "dict" (per-district)
+SIMULATION_SEED = None  # Seed for the numpy generator; None for fresh entropy
+DISTRICT_PROFILES_PATH = None  # CSV or Parquet file of static per-district features; None simulates them once
+LAG_STATE_PATH = Path(__file__).parent / "state" / "lag_state.snapshot"  # None keeps lag state in memory only
+LAG_SNAPSHOT_INTERVAL = 30.0  # Minimum seconds between lag state snapshots; 0 snapshots every tick
+
+# History Configuration
+HISTORY_PATH = Path(__file__).parent / "state" / "history"  # Prediction history segment directory; None disables history
+HISTORY_SEGMENT_SECONDS = 3600  # Time window covered by one segment before it is sealed and indexed
+HISTORY_SEGMENT_ROWS = 1000000  # Rows preallocated per segment file; a full segment rotates early
+HISTORY_RETENTION_SECONDS = 30 * 86400  # Sealed segments older than this are deleted; 0 keeps everything
+HISTORY_QUERY_WINDOW = 86400  # seconds of history returned when a query gives no start
+HISTORY_MAX_POINTS = 10000  # Most rows or buckets a single history query returns
 
 # Districts for simulation
 DISTRICTS = [
@@ -77,6 +151,43 @@ FEATURE_ORDER = [
     "Disease_nan"
 ]
 
+# Feature groups, used to configure per-group behaviour such as cache quantization
+FEATURE_GROUPS = {
+    "weather": [
+        "weekly_avg_temp",
+        "weekly_avg_humidity",
+        "weekly_avg_precipitation",
+        "prev_avg_temp",
+        "prev_avg_humidity",
+        "prev_avg_precipitation",
+    ],
+    "lags": ["No. of Cases_lag_1", "No. of Cases_lag_2", "cases_roll2"],
+    "demographics": [
+        "Number of households",
+        "Population",
+        "Area",
+        "Population density",
+        "Population of children b/w (0-4) age",
+        "Population of children b/w (5-9) age",
+        "literacy rate",
+    ],
+    "water_quality": ["E_coli", "Total_Coliform"],
+    "wash": [
+        "Population living in households with an improved drinking-water source (%)",
+        "Population living in households that use an improved sanitation facility (%)",
+        "Households using clean fuel for cooking (%)",
+        "Households with access to electricity (%)",
+        "Households using iodized salt (%)",
+    ],
+    "health": [
+        "Prevalence of diarrhoea in the last 2 weeks (children under 5) (%)",
+        "Children with diarrhoea who received ORS (%)",
+        "Children with diarrhoea who received zinc (%)",
+        "Children with diarrhoea taken to a health facility (%)",
+    ],
+    "disease": [name for name in FEATURE_ORDER if name.startswith("Disease_")],
+}
+
 # Simulation ranges for realistic data generation
 SIMULATION_RANGES = {
     # Weather ranges
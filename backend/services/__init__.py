@@ -1,13 +1,76 @@
 """Services package for the Outbreak Prediction System."""
 
 from .model_service import ModelService
+from .model_watcher import ModelWatcher
+from .model_registry import ModelRegistry
+from .prediction_cache import PredictionCache
+from .fallback_predictor import FallbackPredictor
+from .disease_table import DiseaseTable
 from .simulation_service import SimulationService
+from .district_profiles import DistrictProfileStore
+from .feature_sources import (
+    FeatureSource,
+    FileSource,
+    DirectorySource,
+    HttpPushSource,
+    create_feature_source,
+)
 from .prediction_service import PredictionService
+from .history_store import HistoryStore, create_history_store
 from .websocket_manager import WebSocketManager
+from .prediction_bus import (
+    PredictionBus,
+    LocalBus,
+    UnixSocketBus,
+    RedisBus,
+    create_prediction_bus,
+    create_leader_election,
+)
+from .leader_election import LeaderElection, FileLockElection, RedisElection, run_while_leader
+from .resp_client import RespClient, RespError
+from .prediction_executor import PredictionExecutor
+from .tick_scheduler import TickScheduler
+from .metrics import REGISTRY, MetricsRegistry
+from .readiness import ReadinessTracker
+from .serializers import Serializer, available_encodings, get_serializer, register_serializer
 
 __all__ = [
     "ModelService",
+    "ModelWatcher",
+    "ModelRegistry",
+    "PredictionCache",
+    "FallbackPredictor",
+    "DiseaseTable",
     "SimulationService", 
+    "DistrictProfileStore",
+    "FeatureSource",
+    "FileSource",
+    "DirectorySource",
+    "HttpPushSource",
+    "create_feature_source",
     "PredictionService",
+    "HistoryStore",
+    "create_history_store",
     "WebSocketManager",
+    "PredictionBus",
+    "LocalBus",
+    "UnixSocketBus",
+    "RedisBus",
+    "create_prediction_bus",
+    "create_leader_election",
+    "LeaderElection",
+    "FileLockElection",
+    "RedisElection",
+    "run_while_leader",
+    "RespClient",
+    "RespError",
+    "PredictionExecutor",
+    "TickScheduler",
+    "REGISTRY",
+    "MetricsRegistry",
+    "ReadinessTracker",
+    "Serializer",
+    "available_encodings",
+    "get_serializer",
+    "register_serializer",
 ]
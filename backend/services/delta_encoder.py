@@ -0,0 +1,111 @@
+"""
+Delta Encoder for the incremental prediction stream.
+
+Delta-mode websocket clients receive a full snapshot when they connect and
+afterwards only what changed per district, tagged with sequence numbers so
+a client that misses a frame can detect the gap and request a resync.
+"""
+
+from typing import Dict, Any
+
+# Prediction fields that are always included in a district delta
+PREDICTION_FIELDS = [
+    "ts",
+    "predicted_log",
+    "predicted_cases",
+    "predicted_cases_rounded",
+    "outbreak_prob",
+    "outbreak_flag",
+]
+
+# Fields that are only included when they change
+TRACKED_FIELDS = ["disease", "model_version"]
+
+
+class DeltaEncoder:
+    """Tracks the latest prediction per district and builds snapshot/delta messages."""
+    
+    def __init__(self):
+        self.sequence: int = 0
+        self._items: Dict[str, Dict[str, Any]] = {}
+    
+    def update(self, batch: Dict[str, Any], compute_delta: bool = True) -> Dict[str, Any]:
+        """
+        Advance the stream to a new batch.
+        
+        Args:
+            batch: The batch prediction message.
+            compute_delta: Whether to diff against the previous state. When no
+                delta clients are connected the state is only recorded.
+        
+        Returns:
+            Dict containing the batch delta message, or an empty dict if
+            compute_delta is False.
+        """
+        self.sequence += 1
+        deltas = []
+        
+        for item in batch["items"]:
+            district = item["district"]
+            if compute_delta:
+                deltas.append(self._diff(self._items.get(district), item))
+            self._items[district] = item
+        
+        if not compute_delta:
+            return {}
+        
+        return {
+            "type": "batch_delta",
+            "seq": self.sequence,
+            "base_seq": self.sequence - 1,
+            "items": deltas,
+        }
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Build a full snapshot of the latest state.
+        
+        Returns:
+            Dict containing the snapshot message at the current sequence number.
+        """
+        return {
+            "type": "batch_snapshot",
+            "seq": self.sequence,
+            "items": list(self._items.values()),
+        }
+    
+    def _diff(self, previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the delta for one district.
+        
+        Args:
+            previous: The district's previous prediction, or None if unseen.
+            current: The district's new prediction.
+        
+        Returns:
+            Dict with the new prediction, changed fields and any outbreak flag
+            transition. Unseen districts are sent in full.
+        """
+        if previous is None:
+            return dict(current)
+        
+        delta = {"district": current["district"]}
+        for field in PREDICTION_FIELDS:
+            delta[field] = current[field]
+        
+        for field in TRACKED_FIELDS:
+            if current.get(field) != previous.get(field):
+                delta[field] = current.get(field)
+        
+        if previous["outbreak_flag"] != current["outbreak_flag"]:
+            delta["flag_transition"] = "raised" if current["outbreak_flag"] else "cleared"
+        
+        features = current.get("input_features")
+        if features is not None:
+            previous_features = previous.get("input_features") or {}
+            delta["changed_features"] = {
+                name: value for name, value in features.items()
+                if previous_features.get(name) != value
+            }
+        
+        return delta
@@ -0,0 +1,125 @@
+"""
+Disease Table for sampling and one-hot encoding diseases by index.
+"""
+
+import logging
+from typing import Any, Dict, List, Mapping, Sequence
+
+import numpy as np
+
+from config import DISEASE_FREQUENCIES, FEATURE_ORDER
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the one-hot disease columns in FEATURE_ORDER
+DISEASE_PREFIX = "Disease_"
+
+# Name reported for rows with no disease column set
+UNKNOWN_DISEASE = "Unknown"
+
+
+class DiseaseTable:
+    """
+    Disease columns, names and sampling weights, precomputed once.
+    
+    A disease is handled as its index into the one-hot block: a batch is
+    sampled as an array of indices from the cumulative weights, written
+    into the feature matrix by index and named by looking the index up, so
+    no per-row dicts, normalization or string handling is needed.
+    """
+    
+    def __init__(
+        self,
+        frequencies: Mapping[str, float] = DISEASE_FREQUENCIES,
+        feature_order: Sequence[str] = FEATURE_ORDER,
+    ):
+        self.features = [name for name in feature_order if name.startswith(DISEASE_PREFIX)]
+        self.names = [name[len(DISEASE_PREFIX):] for name in self.features]
+        self.columns = np.array([feature_order.index(name) for name in self.features])
+        self._width = len(feature_order)
+        # Read the block as a view when the columns are adjacent, as in FEATURE_ORDER
+        first, last = int(self.columns.min()), int(self.columns.max())
+        contiguous = last - first + 1 == len(self.columns) and (np.diff(self.columns) == 1).all()
+        self._block = slice(first, last + 1) if contiguous else self.columns
+        
+        weights = np.array([frequencies.get(name, 0.0) for name in self.features], dtype=np.float64)
+        self.cumulative = np.cumsum(weights) / weights.sum()
+        
+        self._index = {name: idx for idx, name in enumerate(self.names)}
+        self._index.update({name: idx for idx, name in enumerate(self.features)})
+        # Index -1 (no disease set) resolves to the last label
+        self._labels = np.array(self.names + [UNKNOWN_DISEASE], dtype=object)
+        self._one_hot = [
+            {name: int(idx == selected) for idx, name in enumerate(self.features)}
+            for selected in range(len(self.features))
+        ]
+    
+    def __len__(self) -> int:
+        return len(self.features)
+    
+    def sample(self, uniforms: Any) -> Any:
+        """
+        Map uniform draws in [0, 1) to disease indices by frequency.
+        
+        Args:
+            uniforms: A draw or array of draws, e.g. rng.random(n_rows).
+        
+        Returns:
+            Disease index per draw, with the shape of uniforms.
+        """
+        selected = self.cumulative.searchsorted(uniforms, side="right")
+        # Guard against the last cumulative weight rounding to just under 1
+        return np.minimum(selected, len(self.features) - 1)
+    
+    def encode(self, matrix: np.ndarray, indices: np.ndarray) -> None:
+        """
+        Write the one-hot block of a feature matrix in place.
+        
+        Args:
+            matrix: Feature matrix in FEATURE_ORDER.
+            indices: Disease index per row.
+        """
+        matrix[:, self._block] = 0.0
+        matrix[np.arange(len(matrix)), self.columns[indices]] = 1.0
+    
+    def decode(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Recover disease indices from the one-hot block of a feature matrix.
+        
+        Args:
+            matrix: Feature matrix (or vectors) in FEATURE_ORDER.
+        
+        Returns:
+            np.ndarray: Disease index per row, -1 where no column is set.
+        """
+        one_hot = np.asarray(matrix).reshape(-1, self._width)[:, self._block]
+        selected = one_hot.argmax(axis=1)
+        found = one_hot[np.arange(len(one_hot)), selected] == 1
+        return np.where(found, selected, -1)
+    
+    def labels(self, indices: np.ndarray) -> List[str]:
+        """Disease name per index, UNKNOWN_DISEASE for -1."""
+        return self._labels[indices].tolist()
+    
+    def index(self, name: str, default: int = -1) -> int:
+        """
+        Look up a disease index by name, with or without the column prefix.
+        
+        Args:
+            name: Disease name such as "Dengue" or "Disease_Dengue".
+            default: Index returned for unknown names.
+        """
+        return self._index.get(name, default)
+    
+    def one_hot(self, index: int) -> Dict[str, int]:
+        """
+        Shared one-hot feature dict for a disease index.
+        
+        The dict is reused across calls; copy it (e.g. with dict.update)
+        rather than modifying it.
+        """
+        return self._one_hot[index]
+
+
+# Table for the configured model features and disease frequencies
+DISEASES = DiseaseTable()
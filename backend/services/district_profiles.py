@@ -0,0 +1,199 @@
+"""
+District Profile Store for static per-district features.
+"""
+
+import csv
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import FEATURE_GROUPS, FEATURE_ORDER, SIMULATION_RANGES
+
+logger = logging.getLogger(__name__)
+
+# District-level constants in the training data: drawn or loaded once, never per tick
+STATIC_FEATURES = [
+    name for name in FEATURE_ORDER
+    if any(name in FEATURE_GROUPS[group] for group in ("demographics", "wash", "health"))
+]
+DISTRICT_COLUMN = "district"
+
+
+class DistrictProfileStore:
+    """
+    Array-backed table of static features, one row per district.
+    
+    Columns follow STATIC_FEATURES, which is in FEATURE_ORDER order, so a
+    block of rows can be copied straight into a feature matrix.
+    """
+    
+    def __init__(self, districts: Sequence[str], values: np.ndarray):
+        values = np.asarray(values, dtype=np.float32)
+        if values.shape != (len(districts), len(STATIC_FEATURES)):
+            raise ValueError(
+                f"Expected profile values of shape ({len(districts)}, {len(STATIC_FEATURES)}), "
+                f"got {values.shape}"
+            )
+        
+        self.districts: List[str] = list(districts)
+        self.values = values
+        self.feature_columns = np.array([FEATURE_ORDER.index(name) for name in STATIC_FEATURES])
+        self._index: Dict[str, int] = {district: row for row, district in enumerate(self.districts)}
+        if len(self._index) != len(self.districts):
+            raise ValueError("District profiles contain duplicate districts")
+    
+    @classmethod
+    def generate(cls, districts: Sequence[str], rng: np.random.Generator) -> "DistrictProfileStore":
+        """
+        Draw simulated static features for each district.
+        
+        Args:
+            districts: Names of the districts.
+            rng: Generator to draw from.
+        
+        Returns:
+            DistrictProfileStore: The generated profiles.
+        """
+        return cls(districts, _draw_profiles(len(districts), rng))
+    
+    @classmethod
+    def from_file(cls, path: Path) -> "DistrictProfileStore":
+        """
+        Load district profiles from a CSV or Parquet file.
+        
+        The file needs a "district" column and one column per static feature,
+        named as in FEATURE_ORDER. "Population density" is derived from
+        Population and Area when the file does not provide it.
+        
+        Args:
+            path: Path to a .csv or .parquet file.
+        
+        Returns:
+            DistrictProfileStore: The loaded profiles.
+        
+        Raises:
+            ValueError: If the format is unsupported or columns are missing.
+            ImportError: If a Parquet file is given and pyarrow is not installed.
+        """
+        path = Path(path)
+        if path.suffix == ".csv":
+            columns = _read_csv_columns(path)
+        elif path.suffix == ".parquet":
+            columns = _read_parquet_columns(path)
+        else:
+            raise ValueError(f"Unsupported district profile format: {path.suffix}")
+        
+        if "Population density" not in columns and {"Population", "Area"} <= columns.keys():
+            population = np.asarray(columns["Population"], dtype=np.float64)
+            area = np.asarray(columns["Area"], dtype=np.float64)
+            columns["Population density"] = (population / area).tolist()
+        
+        missing = [name for name in [DISTRICT_COLUMN] + STATIC_FEATURES if name not in columns]
+        if missing:
+            raise ValueError(f"District profile file {path} is missing columns: {missing}")
+        
+        values = np.column_stack(
+            [np.asarray(columns[name], dtype=np.float32) for name in STATIC_FEATURES]
+        )
+        store = cls([str(district) for district in columns[DISTRICT_COLUMN]], values)
+        logger.info(f"Loaded {len(store.districts)} district profiles from {path}")
+        return store
+    
+    def add_generated(self, districts: Sequence[str], rng: np.random.Generator) -> None:
+        """
+        Draw profiles for districts the store does not have yet.
+        
+        Args:
+            districts: Names of the districts that need a profile.
+            rng: Generator to draw from.
+        """
+        new_districts = [district for district in dict.fromkeys(districts) if district not in self._index]
+        if not new_districts:
+            return
+        
+        self.values = np.concatenate([self.values, _draw_profiles(len(new_districts), rng)])
+        for district in new_districts:
+            self._index[district] = len(self.districts)
+            self.districts.append(district)
+    
+    def rows(self, districts: Sequence[str]) -> np.ndarray:
+        """
+        Get the profile rows backing a list of districts.
+        
+        Raises:
+            KeyError: If a district has no profile.
+        """
+        index = self._index
+        return np.fromiter((index[district] for district in districts), dtype=np.intp, count=len(districts))
+    
+    def get(self, district: str) -> Dict[str, float]:
+        """Get one district's static features as a dict."""
+        return dict(zip(STATIC_FEATURES, self.values[self._index[district]].tolist()))
+    
+    def __contains__(self, district: str) -> bool:
+        return district in self._index
+    
+    def __len__(self) -> int:
+        return len(self.districts)
+
+
+def load_profiles(
+    path: Optional[Path], districts: Sequence[str], rng: np.random.Generator
+) -> DistrictProfileStore:
+    """
+    Build the profile store for a set of districts.
+    
+    Profiles come from the file when a path is given; districts the file does
+    not cover get simulated profiles.
+    
+    Args:
+        path: CSV or Parquet profile file, or None to simulate every profile.
+        districts: Districts that need a profile.
+        rng: Generator for simulated profiles.
+    
+    Returns:
+        DistrictProfileStore: Profiles covering every district.
+    """
+    if path is None:
+        return DistrictProfileStore.generate(districts, rng)
+    
+    store = DistrictProfileStore.from_file(path)
+    missing = [district for district in districts if district not in store]
+    if missing:
+        logger.warning(f"No profile for {len(missing)} districts in {path}; simulating them")
+        store.add_generated(missing, rng)
+    return store
+
+
+def _draw_profiles(n_rows: int, rng: np.random.Generator) -> np.ndarray:
+    """Draw static features uniformly from SIMULATION_RANGES."""
+    drawn = [name for name in STATIC_FEATURES if name != "Population density"]
+    low = np.array([SIMULATION_RANGES[name][0] for name in drawn])
+    high = np.array([SIMULATION_RANGES[name][1] for name in drawn])
+    draws = dict(zip(drawn, rng.uniform(low, high, size=(n_rows, len(drawn))).T))
+    
+    draws["Population density"] = draws["Population"] / draws["Area"]
+    return np.column_stack([draws[name] for name in STATIC_FEATURES]).astype(np.float32)
+
+
+def _read_csv_columns(path: Path) -> Dict[str, List[str]]:
+    """Read a CSV file into a dict of column name to values."""
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        columns: Dict[str, List[str]] = {name: [] for name in reader.fieldnames or []}
+        for record in reader:
+            for name, value in record.items():
+                columns[name].append(value)
+    return columns
+
+
+def _read_parquet_columns(path: Path) -> Dict[str, list]:
+    """Read a Parquet file into a dict of column name to values (needs pyarrow)."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading district profiles from Parquet requires pyarrow") from e
+    
+    return pq.read_table(path).to_pydict()
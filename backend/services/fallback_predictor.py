@@ -0,0 +1,72 @@
+"""
+Fallback Predictor for running without a trained model.
+"""
+
+import logging
+from typing import Optional
+
+import numpy as np
+
+from config import FEATURE_ORDER, SIMULATION_SEED
+
+logger = logging.getLogger(__name__)
+
+# Model version reported for heuristic predictions made without a model
+FALLBACK_MODEL_VERSION = "simulation_fallback"
+
+# Features the heuristic reads, with the value used when a feature is unobserved (NaN)
+FALLBACK_DEFAULTS = {
+    "No. of Cases_lag_1": 10.0,
+    "No. of Cases_lag_2": 10.0,
+    "prev_avg_humidity": 60.0,
+    "prev_avg_temp": 30.0,
+    "Population living in households that use an improved sanitation facility (%)": 70.0,
+    "E_coli": 100.0,
+}
+
+# Half-width of the uniform noise added to each log prediction
+FALLBACK_NOISE = 0.3
+
+
+class FallbackPredictor:
+    """
+    Vectorized heuristic standing in for the model when none is loaded.
+    
+    Scores a feature matrix in FEATURE_ORDER like ModelService.predict, so
+    degraded-mode runs take the same batched path as the real model. Noise
+    comes from its own generator, so predictions are reproducible under a
+    seed.
+    """
+    
+    version = FALLBACK_MODEL_VERSION
+    
+    def __init__(self, seed: Optional[int] = SIMULATION_SEED):
+        self._rng = np.random.default_rng(seed)
+        self._columns = np.array([FEATURE_ORDER.index(name) for name in FALLBACK_DEFAULTS])
+        self._defaults = np.array(list(FALLBACK_DEFAULTS.values()))
+    
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Predict log case counts for a feature matrix.
+        
+        Cases are the mean of the two lags, scaled up by humidity,
+        temperature, poor sanitation and E. coli counts.
+        
+        Args:
+            matrix: Feature matrix of shape (n_rows, len(FEATURE_ORDER)).
+        
+        Returns:
+            np.ndarray: Float64 log predictions, one per row.
+        """
+        values = np.asarray(matrix)[:, self._columns].astype(np.float64)
+        values = np.where(np.isnan(values), self._defaults, values)
+        lag1, lag2, humidity, temp, sanitation, ecoli = values.T
+        
+        base_cases = (lag1 + lag2) / 2
+        weather_factor = 1 + (humidity - 50) / 100 + (temp - 25) / 50
+        sanitation_factor = 1 + (100 - sanitation) / 100
+        ecoli_factor = 1 + ecoli / 1000
+        
+        predicted_cases = np.maximum(base_cases * weather_factor * sanitation_factor * ecoli_factor, 1)
+        noise = self._rng.uniform(-FALLBACK_NOISE, FALLBACK_NOISE, size=len(values))
+        return np.log1p(predicted_cases) + noise
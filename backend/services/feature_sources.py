@@ -0,0 +1,387 @@
+"""
+Feature Sources for feeding observed data into the batched prediction path.
+
+A source reads observations in chunks and hands them to the predictor through
+a bounded queue. File readers wait when the queue is full and HTTP pushes are
+rejected, so ingestion never runs ahead of scoring by more than the queue.
+"""
+
+import asyncio
+import csv
+import logging
+import shutil
+from pathlib import Path
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import (
+    FEATURE_ORDER,
+    FEATURE_SOURCE,
+    INGEST_CHUNK_ROWS,
+    INGEST_PATH,
+    INGEST_POLL_INTERVAL,
+    INGEST_QUEUE_SIZE,
+)
+from .disease_table import DISEASES
+from .district_profiles import DISTRICT_COLUMN
+from .metrics import REGISTRY
+from .simulation_service import SimulationService
+
+logger = logging.getLogger(__name__)
+
+# Column name -> one value per row; always includes DISTRICT_COLUMN
+Observations = Dict[str, Any]
+
+DISEASE_COLUMN = "disease"
+FILE_SUFFIXES = (".csv", ".parquet")
+
+INGEST_ROWS = REGISTRY.counter("ingest_rows_total", "Observation rows queued for scoring")
+INGEST_REJECTED = REGISTRY.counter(
+    "ingest_rejected_total", "Pushed batches rejected because the ingest queue was full"
+)
+INGEST_QUEUE_DEPTH = REGISTRY.gauge("ingest_queue_depth", "Observation chunks waiting to be scored")
+
+
+class FeatureSource:
+    """
+    Base class for observation sources.
+    
+    Subclasses produce chunks in run() and put them on the bounded queue;
+    the ingestion loop consumes them with chunks().
+    """
+    
+    kind = "base"
+    
+    def __init__(self, queue_size: int = INGEST_QUEUE_SIZE):
+        self._queue: "asyncio.Queue[Optional[Observations]]" = asyncio.Queue(maxsize=queue_size)
+        self._rows = 0
+    
+    async def run(self) -> None:
+        """Produce observation chunks until the source is exhausted or cancelled."""
+    
+    async def chunks(self) -> AsyncIterator[Observations]:
+        """Yield queued observation chunks until the source signals the end."""
+        while True:
+            chunk = await self._queue.get()
+            INGEST_QUEUE_DEPTH.set(self._queue.qsize())
+            if chunk is None:
+                return
+            yield chunk
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the source kind, queue depth and rows queued so far."""
+        return {
+            "kind": self.kind,
+            "queued_chunks": self._queue.qsize(),
+            "max_queued_chunks": self._queue.maxsize,
+            "rows": self._rows,
+        }
+    
+    async def _put(self, chunk: Observations) -> None:
+        """Queue a chunk, waiting while the queue is full."""
+        await self._queue.put(chunk)
+        self._queued(chunk)
+    
+    def _queued(self, chunk: Observations) -> None:
+        """Account for a chunk that was just queued."""
+        n_rows = len(chunk[DISTRICT_COLUMN])
+        self._rows += n_rows
+        INGEST_ROWS.inc(n_rows)
+        INGEST_QUEUE_DEPTH.set(self._queue.qsize())
+
+
+class FileSource(FeatureSource):
+    """Streams one CSV or Parquet file in chunks, then ends."""
+    
+    kind = "file"
+    
+    def __init__(
+        self,
+        path: Path,
+        chunk_rows: int = INGEST_CHUNK_ROWS,
+        queue_size: int = INGEST_QUEUE_SIZE,
+    ):
+        super().__init__(queue_size)
+        self.path = Path(path)
+        self.chunk_rows = chunk_rows
+    
+    async def run(self) -> None:
+        try:
+            await _stream_file(self.path, self.chunk_rows, self._put)
+            logger.info(f"Finished ingesting {self.path} ({self._rows} rows)")
+        finally:
+            await self._queue.put(None)
+
+
+class DirectorySource(FeatureSource):
+    """
+    Watches a drop directory and streams every CSV or Parquet file put there.
+    
+    A file is read once its size and mtime are unchanged across two scans,
+    then moved to processed/ (or failed/ if it could not be read).
+    """
+    
+    kind = "directory"
+    
+    def __init__(
+        self,
+        directory: Path,
+        chunk_rows: int = INGEST_CHUNK_ROWS,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        poll_interval: float = INGEST_POLL_INTERVAL,
+    ):
+        super().__init__(queue_size)
+        self.directory = Path(directory)
+        self.chunk_rows = chunk_rows
+        self.poll_interval = poll_interval
+        self._seen: Dict[Path, Tuple[float, int]] = {}
+        self._files = 0
+    
+    async def run(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Watching {self.directory} for observation files")
+        
+        while True:
+            for path in self._stable_files():
+                try:
+                    await _stream_file(path, self.chunk_rows, self._put)
+                    self._finish(path, "processed")
+                    self._files += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Failed to ingest {path}: {e}")
+                    self._finish(path, "failed")
+            await asyncio.sleep(self.poll_interval)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats["files"] = self._files
+        return stats
+    
+    def _stable_files(self) -> List[Path]:
+        """Files whose size and mtime did not change since the previous scan."""
+        current = {}
+        for path in sorted(self.directory.iterdir()):
+            if path.suffix in FILE_SUFFIXES and path.is_file():
+                stat = path.stat()
+                current[path] = (stat.st_mtime, stat.st_size)
+        
+        stable = [path for path, stat in current.items() if self._seen.get(path) == stat]
+        self._seen = {path: stat for path, stat in current.items() if path not in stable}
+        return stable
+    
+    def _finish(self, path: Path, outcome: str) -> None:
+        """Move a handled file out of the drop directory."""
+        target_dir = self.directory / outcome
+        target_dir.mkdir(exist_ok=True)
+        shutil.move(str(path), str(target_dir / path.name))
+
+
+class HttpPushSource(FeatureSource):
+    """
+    Accepts observation batches pushed to the HTTP ingest endpoint.
+    
+    A push is split into chunks of chunk_rows rows and admitted only if every
+    chunk fits in the queue, so queued rows never exceed
+    queue_size * chunk_rows however large a single push is.
+    """
+    
+    kind = "http"
+    
+    def __init__(self, chunk_rows: int = INGEST_CHUNK_ROWS, queue_size: int = INGEST_QUEUE_SIZE):
+        super().__init__(queue_size)
+        self.chunk_rows = chunk_rows
+    
+    @property
+    def max_rows(self) -> int:
+        """Largest push that can ever be admitted."""
+        return self._queue.maxsize * self.chunk_rows
+    
+    async def run(self) -> None:
+        # Chunks arrive through offer(); nothing to produce here
+        await asyncio.Event().wait()
+    
+    def offer(self, rows: Sequence[Dict[str, Any]]) -> bool:
+        """
+        Queue a batch of observation rows without waiting.
+        
+        Args:
+            rows: One dict per observation, each with a "district" key.
+        
+        Returns:
+            bool: False if the queue lacks room for every chunk of the batch
+            and the batch was rejected; nothing is queued then.
+        
+        Raises:
+            ValueError: If a row has no district or the batch exceeds max_rows.
+        """
+        if len(rows) > self.max_rows:
+            raise ValueError(f"At most {self.max_rows} observations can be pushed at once")
+        if any(DISTRICT_COLUMN not in row for row in rows):
+            raise ValueError(f"Every observation needs a '{DISTRICT_COLUMN}' field")
+        
+        n_chunks = -(-len(rows) // self.chunk_rows)
+        if self._queue.maxsize - self._queue.qsize() < n_chunks:
+            INGEST_REJECTED.inc()
+            return False
+        
+        for start in range(0, len(rows), self.chunk_rows):
+            chunk_rows = rows[start:start + self.chunk_rows]
+            names = dict.fromkeys(name for row in chunk_rows for name in row)
+            chunk = {name: [row.get(name) for row in chunk_rows] for name in names}
+            self._queue.put_nowait(chunk)
+            self._queued(chunk)
+        return True
+
+
+def create_feature_source(
+    kind: str = FEATURE_SOURCE, path: Optional[Path] = INGEST_PATH
+) -> Optional[FeatureSource]:
+    """
+    Build the configured feature source.
+    
+    Args:
+        kind: "simulated", "file", "directory" or "http".
+        path: Input file or drop directory for the file-based sources.
+    
+    Returns:
+        The source, or None for the built-in simulator.
+    """
+    if kind == "simulated":
+        return None
+    if kind == "http":
+        return HttpPushSource()
+    if kind in ("file", "directory"):
+        if path is None:
+            raise ValueError(f"FEATURE_SOURCE={kind!r} needs INGEST_PATH")
+        return FileSource(path) if kind == "file" else DirectorySource(path)
+    raise ValueError(f"Unknown feature source: {kind}")
+
+
+def assemble_observations(
+    observations: Observations, simulation_service: SimulationService
+) -> Tuple[np.ndarray, List[str], List[str]]:
+    """
+    Build a feature matrix from observed columns.
+    
+    Columns named as in FEATURE_ORDER are used as given. A "disease" column
+    holding disease names is expanded into the one-hot columns. Static
+    district features and lags that were not observed are filled in by the
+    simulation service; any other missing column is left as NaN, which the
+    model treats as a missing value.
+    
+    Args:
+        observations: Observed columns, including "district".
+        simulation_service: Source of district profiles and lag state.
+    
+    Returns:
+        Tuple of (float32 feature matrix, districts backing each row, names
+        of feature columns that were neither observed nor filled).
+    """
+    districts = [str(district) for district in observations[DISTRICT_COLUMN]]
+    matrix = np.full((len(districts), len(FEATURE_ORDER)), np.nan, dtype=np.float32)
+    observed = set()
+    
+    for idx, name in enumerate(FEATURE_ORDER):
+        if name in observations:
+            matrix[:, idx] = _to_float32(observations[name])
+            observed.add(name)
+    
+    if DISEASE_COLUMN in observations and not observed.intersection(DISEASES.features):
+        _one_hot_diseases(matrix, observations[DISEASE_COLUMN])
+        observed.update(DISEASES.features)
+    
+    missing = simulation_service.fill_unobserved_features(matrix, districts, observed)
+    return matrix, districts, missing
+
+
+def _one_hot_diseases(matrix: np.ndarray, diseases: Sequence[Any]) -> None:
+    """Expand disease names into the one-hot columns; unknown names map to Disease_nan."""
+    unknown = DISEASES.index("nan")
+    indices = np.array([DISEASES.index(str(disease), unknown) for disease in diseases], dtype=np.intp)
+    DISEASES.encode(matrix, indices)
+
+
+def _to_float32(values: Any) -> np.ndarray:
+    """Convert a column to float32, reading blanks and unparseable values as NaN."""
+    try:
+        return np.asarray(values, dtype=np.float32)
+    except (TypeError, ValueError):
+        return np.array([_parse_float(value) for value in values], dtype=np.float32)
+
+
+def _parse_float(value: Any) -> float:
+    """Parse one value, NaN if it is not a number."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+async def _stream_file(path: Path, chunk_rows: int, put: Any) -> None:
+    """Read a file chunk by chunk in a worker thread and queue each chunk."""
+    chunks = _iter_file_chunks(path, chunk_rows)
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            await put(chunk)
+    finally:
+        chunks.close()
+
+
+def _iter_file_chunks(path: Path, chunk_rows: int) -> Iterator[Observations]:
+    """Yield a file's columns chunk_rows rows at a time without loading it whole."""
+    if path.suffix == ".csv":
+        yield from _iter_csv_chunks(path, chunk_rows)
+    elif path.suffix == ".parquet":
+        yield from _iter_parquet_chunks(path, chunk_rows)
+    else:
+        raise ValueError(f"Unsupported observation file format: {path.suffix}")
+
+
+def _iter_csv_chunks(path: Path, chunk_rows: int) -> Iterator[Observations]:
+    """Yield CSV columns in chunks of raw string values."""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        if DISTRICT_COLUMN not in header:
+            raise ValueError(f"{path} has no '{DISTRICT_COLUMN}' column")
+        
+        rows = []
+        skipped = 0
+        for record in reader:
+            if len(record) != len(header):
+                skipped += 1
+                continue
+            rows.append(record)
+            if len(rows) == chunk_rows:
+                yield dict(zip(header, map(list, zip(*rows))))
+                rows = []
+        if rows:
+            yield dict(zip(header, map(list, zip(*rows))))
+        if skipped:
+            logger.warning(f"Skipped {skipped} malformed rows in {path}")
+
+
+def _iter_parquet_chunks(path: Path, chunk_rows: int) -> Iterator[Observations]:
+    """Yield Parquet record batches as columns (needs pyarrow)."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading observations from Parquet requires pyarrow") from e
+    
+    parquet_file = pq.ParquetFile(path)
+    if DISTRICT_COLUMN not in parquet_file.schema_arrow.names:
+        raise ValueError(f"{path} has no '{DISTRICT_COLUMN}' column")
+    
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+        yield {
+            name: column.to_numpy(zero_copy_only=False)
+            for name, column in zip(batch.schema.names, batch.columns)
+        }
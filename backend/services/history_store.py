@@ -0,0 +1,650 @@
+"""
+History Store for an append-only, columnar record of every prediction.
+
+Rows go to a memory-mapped segment file covering one time window. When the
+window ends (or the file fills up) the segment is sealed: rewritten sorted by
+district and time with a per-district index, so a range query on a sealed
+segment is two binary searches and a slice.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from config import (
+    HISTORY_MAX_POINTS,
+    HISTORY_PATH,
+    HISTORY_RETENTION_SECONDS,
+    HISTORY_SEGMENT_ROWS,
+    HISTORY_SEGMENT_SECONDS,
+)
+from .lag_state import _fsync_directory
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+HISTORY_ROWS = REGISTRY.counter("history_rows_total", "Prediction rows appended to the history store")
+HISTORY_SEALS = REGISTRY.counter("history_segments_sealed_total", "History segments sealed and indexed")
+HISTORY_APPEND_SECONDS = REGISTRY.histogram(
+    "history_append_seconds", "Time spent appending a batch to the history store"
+)
+HISTORY_QUERY_SECONDS = REGISTRY.histogram(
+    "history_query_seconds", "Time spent answering a history query"
+)
+
+# Columns in file order: 8-byte, then 4-byte, then 1-byte types, so every column stays aligned.
+# district, disease and model_version hold ids into the string dictionary.
+HISTORY_COLUMNS = [
+    ("ts", np.dtype("<f8")),
+    ("district", np.dtype("<u4")),
+    ("disease", np.dtype("<u4")),
+    ("model_version", np.dtype("<u4")),
+    ("predicted_log", np.dtype("<f4")),
+    ("predicted_cases", np.dtype("<f4")),
+    ("outbreak_prob", np.dtype("<f4")),
+    ("outbreak_flag", np.dtype("u1")),
+]
+STRING_COLUMNS = ("district", "disease", "model_version")
+
+# Segment layout: header, one array per column (capacity rows each), then for sealed
+# segments the index: sorted district ids (uint32) and row offsets (uint64, n_keys + 1).
+# Header fields: magic, format version, sealed, capacity, rows, window start, min ts,
+# max ts, index keys. Only the first `rows` rows are valid; writers bump it last.
+SEGMENT_MAGIC = b"HISTSEG\0"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct("<8sIIQQdddQ")
+_ROWS_FIELD = struct.Struct("<Q")
+_ROWS_OFFSET = 24
+_TS_RANGE = struct.Struct("<dd")
+_TS_RANGE_OFFSET = 40
+
+SEALED_SUFFIX = ".seg"
+ACTIVE_SUFFIX = ".active"
+DICTIONARY_NAME = "strings.jsonl"
+
+
+class _Segment:
+    """One memory-mapped segment file, active (appendable) or sealed (indexed)."""
+    
+    def __init__(self, path: Path, writable: bool = False):
+        self.path = path
+        self._file = open(path, "r+b" if writable else "rb")
+        try:
+            self._mapped = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            )
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"History segment {path.name} is empty")
+        
+        try:
+            self._open_views()
+        except ValueError:
+            self.close()
+            raise
+    
+    def _open_views(self) -> None:
+        """Validate the header and map each column."""
+        mapped = self._mapped
+        if len(mapped) < SEGMENT_HEADER.size:
+            raise ValueError(f"History segment {self.path.name} is truncated")
+        magic, version, sealed, capacity, _, window_start, _, _, n_keys = (
+            SEGMENT_HEADER.unpack_from(mapped)
+        )
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            raise ValueError(f"{self.path.name} is not a history segment of a supported version")
+        if len(mapped) != _segment_size(capacity, n_keys):
+            raise ValueError(f"History segment {self.path.name} is truncated")
+        
+        self.sealed = bool(sealed)
+        self.capacity = capacity
+        self.window_start = window_start
+        self.columns: Dict[str, np.ndarray] = {}
+        offset = SEGMENT_HEADER.size
+        for name, dtype in HISTORY_COLUMNS:
+            self.columns[name] = np.frombuffer(mapped, dtype=dtype, count=capacity, offset=offset)
+            offset += capacity * dtype.itemsize
+        
+        if self.sealed:
+            offset = _align(offset)
+            self.keys = np.frombuffer(mapped, dtype="<u4", count=n_keys, offset=offset)
+            self.offsets = np.frombuffer(
+                mapped, dtype="<u8", count=n_keys + 1, offset=_align(offset + 4 * n_keys)
+            )
+    
+    @property
+    def rows(self) -> int:
+        """Committed rows; read from the header, so it follows a live writer."""
+        return _ROWS_FIELD.unpack_from(self._mapped, _ROWS_OFFSET)[0]
+    
+    @property
+    def ts_range(self) -> Tuple[float, float]:
+        """Earliest and latest committed timestamp."""
+        return _TS_RANGE.unpack_from(self._mapped, _TS_RANGE_OFFSET)
+    
+    def append(self, columns: Dict[str, np.ndarray]) -> None:
+        """Write rows after the committed ones, then commit them in the header."""
+        start = self.rows
+        ts = columns["ts"]
+        end = start + len(ts)
+        for name, _ in HISTORY_COLUMNS:
+            self.columns[name][start:end] = columns[name]
+        
+        min_ts, max_ts = self.ts_range if start else (np.inf, -np.inf)
+        _TS_RANGE.pack_into(
+            self._mapped, _TS_RANGE_OFFSET, min(min_ts, float(ts.min())), max(max_ts, float(ts.max()))
+        )
+        _ROWS_FIELD.pack_into(self._mapped, _ROWS_OFFSET, end)
+    
+    def select(self, district_id: int, start: float, end: float) -> Union[slice, np.ndarray]:
+        """
+        Find the rows of one district with start <= ts <= end.
+        
+        Returns:
+            A slice of contiguous, time-ordered rows for sealed segments,
+            row positions in append order for the active one.
+        """
+        rows = self.rows
+        if self.sealed:
+            position = self.keys.searchsorted(district_id)
+            if position == len(self.keys) or self.keys[position] != district_id:
+                return slice(0, 0)
+            lo, hi = int(self.offsets[position]), int(self.offsets[position + 1])
+            ts = self.columns["ts"][lo:hi]
+            first = lo + int(ts.searchsorted(start, side="left"))
+            last = lo + int(ts.searchsorted(end, side="right"))
+            return slice(first, last)
+        
+        ts = self.columns["ts"][:rows]
+        mask = (self.columns["district"][:rows] == district_id) & (ts >= start) & (ts <= end)
+        return np.flatnonzero(mask)
+    
+    def close(self) -> None:
+        """Unmap the file."""
+        self.columns = {}
+        self.keys = self.offsets = None
+        try:
+            self._mapped.close()
+        except BufferError:
+            # A caller still holds a view; the mapping is released with it
+            pass
+        self._file.close()
+
+
+class HistoryStore:
+    """
+    Append-only prediction history in time-windowed, memory-mapped segments.
+    
+    One process appends (the prediction leader); any number of processes can
+    query the same directory, since readers pick up new segments and rows
+    from disk on every query.
+    """
+    
+    def __init__(
+        self,
+        path: Union[str, Path] = HISTORY_PATH,
+        segment_seconds: float = HISTORY_SEGMENT_SECONDS,
+        segment_rows: int = HISTORY_SEGMENT_ROWS,
+        retention_seconds: float = HISTORY_RETENTION_SECONDS,
+    ):
+        if segment_seconds <= 0 or segment_rows <= 0:
+            raise ValueError("History segments need a positive window and row capacity")
+        
+        self.path = Path(path)
+        self.segment_seconds = segment_seconds
+        self.segment_rows = segment_rows
+        self.retention_seconds = retention_seconds
+        
+        # Writer state, set up on the first append
+        self._active: Optional[_Segment] = None
+        self._string_ids: Optional[Dict[str, int]] = None
+        self._dictionary_file = None
+        self._write_lock = threading.Lock()
+        
+        # Reader state, refreshed from disk on every query
+        self._segments: Dict[str, _Segment] = {}
+        self._strings: List[str] = []
+        self._read_ids: Dict[str, int] = {}
+        self._strings_offset = 0
+        self._read_lock = threading.Lock()
+    
+    def append(self, items: List[Dict[str, Any]]) -> None:
+        """
+        Record a batch of prediction items.
+        
+        Args:
+            items: Items of a batch prediction message.
+        """
+        if not items:
+            return
+        
+        with self._write_lock, HISTORY_APPEND_SECONDS.time():
+            if self._string_ids is None:
+                self._open_writer()
+            columns = self._to_columns(items)
+            
+            windows = np.floor(columns["ts"] / self.segment_seconds) * self.segment_seconds
+            for window in np.unique(windows):
+                in_window = windows == window
+                chunk = columns if in_window.all() else {
+                    name: values[in_window] for name, values in columns.items()
+                }
+                self._append_window(float(window), chunk)
+        
+        HISTORY_ROWS.inc(len(items))
+    
+    def query(
+        self, district: str, start: float, end: float, limit: int = HISTORY_MAX_POINTS
+    ) -> Dict[str, Any]:
+        """
+        Get one district's predictions in a time range.
+        
+        Args:
+            district: District name.
+            start: Range start, unix seconds (inclusive).
+            end: Range end, unix seconds (inclusive).
+            limit: Most rows to return; the latest rows are kept.
+        
+        Returns:
+            Dict with the row count, whether it was truncated, and one list per
+            column ("ts" in unix seconds).
+        """
+        with HISTORY_QUERY_SECONDS.time():
+            columns, strings = self._collect(district, start, end)
+            total = len(columns["ts"])
+            if total > limit:
+                columns = {name: values[-limit:] for name, values in columns.items()}
+            
+            result = {
+                # float32 columns widen to float64 on output; round off the representation noise
+                name: np.round(values.astype(np.float64), 4).tolist() if values.dtype == np.float32
+                else values.tolist()
+                for name, values in columns.items()
+            }
+            for name in ("disease", "model_version"):
+                result[name] = [strings[string_id] for string_id in result[name]]
+            result["outbreak_flag"] = [bool(flag) for flag in result["outbreak_flag"]]
+            del result["district"]
+        
+        return {
+            "district": district,
+            "start": start,
+            "end": end,
+            "count": min(total, limit),
+            "truncated": total > limit,
+            "columns": result,
+        }
+    
+    def downsample(self, district: str, start: float, end: float, step: float) -> Dict[str, Any]:
+        """
+        Aggregate one district's predictions into fixed-width time buckets.
+        
+        Args:
+            district: District name.
+            start: Range start, unix seconds; buckets are aligned to it.
+            end: Range end, unix seconds (inclusive).
+            step: Bucket width in seconds.
+        
+        Returns:
+            Dict with one list per aggregate, one entry per non-empty bucket:
+            bucket start, row count, mean and max predicted cases, mean and max
+            outbreak probability and the number of flagged outbreaks.
+        """
+        with HISTORY_QUERY_SECONDS.time():
+            columns, _ = self._collect(district, start, end)
+            ts = columns["ts"]
+            buckets = np.floor((ts - start) / step).astype(np.int64)
+            if len(buckets) and np.any(np.diff(buckets) < 0):
+                order = np.argsort(buckets, kind="stable")
+                buckets = buckets[order]
+                columns = {name: values[order] for name, values in columns.items()}
+            
+            starts = np.flatnonzero(np.r_[True, np.diff(buckets) != 0]) if len(buckets) else buckets
+            counts = np.diff(np.r_[starts, len(buckets)])
+            cases = columns["predicted_cases"].astype(np.float64)
+            prob = columns["outbreak_prob"].astype(np.float64)
+            result = {
+                "ts": (start + buckets[starts] * step).tolist(),
+                "count": counts.tolist(),
+                "predicted_cases_mean": _reduce(np.add, cases, starts, counts),
+                "predicted_cases_max": _reduce(np.maximum, cases, starts),
+                "outbreak_prob_mean": _reduce(np.add, prob, starts, counts),
+                "outbreak_prob_max": _reduce(np.maximum, prob, starts),
+                "outbreaks": _reduce(np.add, columns["outbreak_flag"].astype(np.int64), starts),
+            }
+        
+        return {
+            "district": district,
+            "start": start,
+            "end": end,
+            "step": step,
+            "count": len(starts),
+            "columns": result,
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get segment and row counts and the time range held."""
+        with self._read_lock:
+            segments = self._refresh()
+            ranges = [segment.ts_range for segment in segments if segment.rows]
+            return {
+                "path": str(self.path),
+                "sealed_segments": sum(1 for segment in segments if segment.sealed),
+                "active_rows": sum(segment.rows for segment in segments if not segment.sealed),
+                "rows": sum(segment.rows for segment in segments),
+                "oldest": min((low for low, _ in ranges), default=None),
+                "newest": max((high for _, high in ranges), default=None),
+                "segment_seconds": self.segment_seconds,
+                "retention_seconds": self.retention_seconds,
+            }
+    
+    def reset_writer(self) -> None:
+        """
+        Drop writer state so the next append reloads it from disk.
+        
+        Call this when this process becomes the writer again: another writer
+        may have extended the dictionary and sealed or deleted the active
+        segment in the meantime.
+        """
+        with self._write_lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+            if self._dictionary_file is not None:
+                self._dictionary_file.close()
+                self._dictionary_file = None
+            self._string_ids = None
+    
+    def close(self) -> None:
+        """Release files; the active segment stays unsealed and is resumed on restart."""
+        self.reset_writer()
+        
+        with self._read_lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+    
+    def _collect(self, district: str, start: float, end: float) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """Gather one district's rows in a time range from every segment, oldest first."""
+        with self._read_lock:
+            segments = self._refresh()
+            strings = self._strings
+            parts: Dict[str, List[np.ndarray]] = {name: [] for name, _ in HISTORY_COLUMNS}
+            district_id = self._read_ids.get(district)
+            
+            if district_id is not None:
+                for segment in segments:
+                    if not segment.rows:
+                        continue
+                    low, high = segment.ts_range
+                    if high < start or low > end:
+                        continue
+                    rows = segment.select(district_id, start, end)
+                    for name, _ in HISTORY_COLUMNS:
+                        parts[name].append(segment.columns[name][rows])
+            
+            columns = {
+                name: np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+                for name, dtype in HISTORY_COLUMNS
+            }
+        
+        return columns, strings
+    
+    def _refresh(self) -> List[_Segment]:
+        """Sync open segments and the string dictionary with the directory. Caller holds the read lock."""
+        if not self.path.is_dir():
+            return []
+        
+        names = sorted(
+            entry.name for entry in os.scandir(self.path)
+            if entry.name.endswith((SEALED_SUFFIX, ACTIVE_SUFFIX))
+        )
+        sealed_stems = {name[:-len(SEALED_SUFFIX)] for name in names if name.endswith(SEALED_SUFFIX)}
+        # An active file next to its sealed copy is left over from an interrupted seal
+        names = [
+            name for name in names
+            if not (name.endswith(ACTIVE_SUFFIX) and name[:-len(ACTIVE_SUFFIX)] in sealed_stems)
+        ]
+        
+        for name in set(self._segments) - set(names):
+            self._segments.pop(name).close()
+        for name in names:
+            if name not in self._segments:
+                try:
+                    self._segments[name] = _Segment(self.path / name)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping unreadable history segment {name}: {e}")
+        
+        self._read_dictionary()
+        return [self._segments[name] for name in names if name in self._segments]
+    
+    def _read_dictionary(self) -> None:
+        """Read strings appended to the dictionary since the last refresh."""
+        try:
+            with open(self.path / DICTIONARY_NAME, "rb") as f:
+                f.seek(self._strings_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        
+        # Ignore a line the writer has not finished
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            string = json.loads(line)
+            self._read_ids[string] = len(self._strings)
+            self._strings.append(string)
+        self._strings_offset += len(complete)
+    
+    def _open_writer(self) -> None:
+        """Load the dictionary and resume or seal segments left by a previous writer."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        
+        strings: List[str] = []
+        dictionary_path = self.path / DICTIONARY_NAME
+        if dictionary_path.exists():
+            data = dictionary_path.read_bytes()
+            complete = data[:data.rfind(b"\n") + 1]
+            strings = [json.loads(line) for line in complete.splitlines()]
+            if len(complete) != len(data):
+                os.truncate(dictionary_path, len(complete))
+        self._string_ids = {string: string_id for string_id, string in enumerate(strings)}
+        self._dictionary_file = open(dictionary_path, "ab")
+        
+        for path in sorted(self.path.glob(f"*{ACTIVE_SUFFIX}")):
+            if path.with_suffix(SEALED_SUFFIX).exists():
+                path.unlink()
+                continue
+            try:
+                segment = _Segment(path, writable=True)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Discarding unreadable active history segment {path.name}: {e}")
+                path.unlink()
+                continue
+            if self._active is not None:
+                self._seal()
+            self._active = segment
+        
+        if self._active is not None:
+            logger.info(f"Resuming history segment {self._active.path.name} ({self._active.rows} rows)")
+    
+    def _to_columns(self, items: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Convert prediction items to column arrays, assigning string ids."""
+        parsed: Dict[str, float] = {}
+        for item in items:
+            if item["ts"] not in parsed:
+                parsed[item["ts"]] = datetime.fromisoformat(item["ts"]).timestamp()
+        
+        columns = {
+            "ts": np.fromiter((parsed[item["ts"]] for item in items), dtype=np.float64, count=len(items)),
+            "predicted_log": np.array([item["predicted_log"] for item in items], dtype=np.float32),
+            "predicted_cases": np.array([item["predicted_cases"] for item in items], dtype=np.float32),
+            "outbreak_prob": np.array([item["outbreak_prob"] for item in items], dtype=np.float32),
+            "outbreak_flag": np.array([item["outbreak_flag"] for item in items], dtype=np.uint8),
+        }
+        for name in STRING_COLUMNS:
+            columns[name] = self._string_column(item[name] for item in items)
+        return columns
+    
+    def _string_column(self, values: Iterable[str]) -> np.ndarray:
+        """Map strings to dictionary ids, appending new strings to the dictionary file."""
+        ids = self._string_ids
+        column = []
+        added = []
+        for value in values:
+            string_id = ids.get(value)
+            if string_id is None:
+                string_id = ids[value] = len(ids)
+                added.append(value)
+            column.append(string_id)
+        
+        if added:
+            # Strings reach the file before any row that refers to them
+            self._dictionary_file.write(
+                b"".join(json.dumps(value).encode() + b"\n" for value in added)
+            )
+            self._dictionary_file.flush()
+        return np.array(column, dtype=np.uint32)
+    
+    def _append_window(self, window: float, columns: Dict[str, np.ndarray]) -> None:
+        """Append rows of one time window, rotating segments as they fill up."""
+        if self._active is not None and self._active.window_start != window:
+            self._seal()
+        
+        written = 0
+        total = len(columns["ts"])
+        while written < total:
+            if self._active is None:
+                self._active = self._create_segment(window)
+            room = self._active.capacity - self._active.rows
+            if room == 0:
+                self._seal()
+                continue
+            
+            chunk = slice(written, written + room)
+            self._active.append({name: values[chunk] for name, values in columns.items()})
+            written += min(room, total - written)
+    
+    def _create_segment(self, window: float) -> _Segment:
+        """Create a preallocated active segment for a time window."""
+        prefix = f"{int(window):012d}-"
+        # Continue after the highest sequence in use; counting files would
+        # mix active and sealed copies and miss gaps left by retention
+        sequences = [
+            int(path.name[len(prefix):].split(".", 1)[0])
+            for path in self.path.glob(f"{prefix}*")
+            if path.name.endswith((SEALED_SUFFIX, ACTIVE_SUFFIX))
+        ]
+        sequence = max(sequences, default=-1) + 1
+        path = self.path / f"{prefix}{sequence:04d}{ACTIVE_SUFFIX}"
+        
+        with open(path, "wb") as f:
+            f.write(SEGMENT_HEADER.pack(
+                SEGMENT_MAGIC, SEGMENT_VERSION, 0, self.segment_rows, 0, window, 0.0, 0.0, 0
+            ))
+            f.truncate(_segment_size(self.segment_rows, 0))
+        return _Segment(path, writable=True)
+    
+    def _seal(self) -> None:
+        """Rewrite the active segment sorted by district and time, with its index."""
+        active = self._active
+        self._active = None
+        rows = active.rows
+        sealed_path = active.path.with_suffix(SEALED_SUFFIX)
+        
+        if rows:
+            columns = {name: values[:rows] for name, values in active.columns.items()}
+            order = np.lexsort((columns["ts"], columns["district"]))
+            districts = columns["district"][order]
+            keys, starts = np.unique(districts, return_index=True)
+            offsets = np.append(starts, rows).astype("<u8")
+            min_ts, max_ts = active.ts_range
+            
+            # Strings must be durable before a sealed segment refers to them
+            os.fsync(self._dictionary_file.fileno())
+            
+            tmp_path = sealed_path.with_name(f".{sealed_path.name}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(SEGMENT_HEADER.pack(
+                    SEGMENT_MAGIC, SEGMENT_VERSION, 1, rows, rows,
+                    active.window_start, min_ts, max_ts, len(keys),
+                ))
+                for name, dtype in HISTORY_COLUMNS:
+                    f.write(columns[name][order].astype(dtype, copy=False).tobytes())
+                f.write(b"\0" * (_align(f.tell()) - f.tell()))
+                f.write(keys.astype("<u4").tobytes())
+                f.write(b"\0" * (_align(f.tell()) - f.tell()))
+                f.write(offsets.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, sealed_path)
+            _fsync_directory(self.path)
+            del columns, districts
+            HISTORY_SEALS.inc()
+            logger.info(f"Sealed history segment {sealed_path.name} ({rows} rows, {len(keys)} districts)")
+        
+        active.close()
+        active.path.unlink()
+        self._apply_retention()
+    
+    def _apply_retention(self) -> None:
+        """Delete sealed segments whose newest row is past the retention period."""
+        if self.retention_seconds <= 0:
+            return
+        
+        cutoff = time.time() - self.retention_seconds
+        for path in self.path.glob(f"*{SEALED_SUFFIX}"):
+            try:
+                with open(path, "rb") as f:
+                    header = SEGMENT_HEADER.unpack(f.read(SEGMENT_HEADER.size))
+            except (OSError, struct.error):
+                continue
+            if header[7] < cutoff:
+                path.unlink()
+                logger.info(f"Deleted expired history segment {path.name}")
+
+
+def create_history_store(path: Optional[Path] = HISTORY_PATH) -> Optional[HistoryStore]:
+    """
+    Build the configured history store.
+    
+    Args:
+        path: Segment directory, or None to keep no history.
+    
+    Returns:
+        The store, or None when history is disabled.
+    """
+    return HistoryStore(path) if path is not None else None
+
+
+def _align(offset: int) -> int:
+    """Round a file offset up to 8 bytes."""
+    return (offset + 7) & ~7
+
+
+def _segment_size(capacity: int, n_keys: int) -> int:
+    """Size in bytes of a segment file."""
+    size = SEGMENT_HEADER.size + sum(capacity * dtype.itemsize for _, dtype in HISTORY_COLUMNS)
+    if n_keys:
+        size = _align(_align(size) + 4 * n_keys) + 8 * (n_keys + 1)
+    return size
+
+
+def _reduce(
+    ufunc: np.ufunc, values: np.ndarray, starts: np.ndarray, counts: Optional[np.ndarray] = None
+) -> list:
+    """Reduce each bucket of a sorted column; divide by counts for a mean."""
+    if not len(starts):
+        return []
+    reduced = ufunc.reduceat(values, starts)
+    if counts is not None:
+        reduced = reduced / counts
+    return np.round(reduced, 4).tolist() if reduced.dtype.kind == "f" else reduced.tolist()
@@ -0,0 +1,237 @@
+"""
+Lag State for per-district case history kept in contiguous arrays.
+
+State can be written to a crash-safe snapshot file and memory-mapped back in,
+so a restarted or secondary instance resumes from the last saved tick.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Fields tracked per series, one contiguous array row each
+LAG_FIELDS = ["No. of Cases_lag_1", "No. of Cases_lag_2", "cases_roll2", "last_predicted_cases"]
+LAG_1, LAG_2, ROLL_2, LAST_PREDICTED = range(len(LAG_FIELDS))
+
+# Upper bounds of the uniform draws for a series seen for the first time
+INITIAL_LAG_MAX = 50.0
+INITIAL_PREDICTED_MAX = 30.0
+
+# Snapshot layout: header, float64 values (n_fields x n_series), NUL-separated UTF-8 keys.
+# Header fields: magic, format version, n_fields, n_series, tick, saved_at, keys length, CRC32.
+SNAPSHOT_MAGIC = b"LAGSNAP\0"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<8sIIQQdQI4x")
+
+
+class LagState:
+    """
+    Lag and rolling-average state for many series, indexed by integer id.
+    
+    Each series is keyed by district name and gets an id on first sight;
+    its fields live in column `id` of one float64 array, so memory and
+    batch updates are linear in the number of series with no per-series
+    Python objects beyond the key index.
+    """
+    
+    def __init__(
+        self,
+        keys: Iterable[str] = (),
+        rng: Optional[np.random.Generator] = None,
+        capacity: int = 16,
+    ):
+        self._rng = rng if rng is not None else np.random.default_rng()
+        self._index: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._values = np.zeros((len(LAG_FIELDS), max(capacity, 1)), dtype=np.float64)
+        self.ids(list(keys))
+    
+    @property
+    def values(self) -> np.ndarray:
+        """State of every known series, shape (len(LAG_FIELDS), n_series)."""
+        return self._values[:, :len(self._keys)]
+    
+    @property
+    def keys(self) -> List[str]:
+        """Series keys in id order."""
+        return list(self._keys)
+    
+    def ids(self, keys: Sequence[str]) -> np.ndarray:
+        """
+        Map series keys to ids, adding unseen series with random initial lags.
+        
+        Args:
+            keys: Series keys, e.g. district names.
+        
+        Returns:
+            np.ndarray: One id per key.
+        """
+        index = self._index
+        try:
+            return np.fromiter((index[key] for key in keys), dtype=np.intp, count=len(keys))
+        except KeyError:
+            self._add([key for key in dict.fromkeys(keys) if key not in index])
+            return np.fromiter((index[key] for key in keys), dtype=np.intp, count=len(keys))
+    
+    def lags(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Get the lag features for a batch of series.
+        
+        Returns:
+            np.ndarray: Shape (len(ids), 3) with lag_1, lag_2 and roll2 columns.
+        """
+        return self._values[LAG_1:ROLL_2 + 1, ids].T
+    
+    def update(self, ids: np.ndarray, predicted_cases: np.ndarray) -> None:
+        """
+        Shift the lags of a batch of series by one step.
+        
+        Each id must appear at most once per call.
+        
+        Args:
+            ids: Series ids to update.
+            predicted_cases: New case count for each id.
+        """
+        values = self._values
+        values[LAG_2, ids] = values[LAG_1, ids]
+        values[LAG_1, ids] = predicted_cases
+        values[ROLL_2, ids] = (values[LAG_1, ids] + values[LAG_2, ids]) / 2
+        values[LAST_PREDICTED, ids] = predicted_cases
+    
+    def get(self, key: str) -> Dict[str, float]:
+        """Get one series' state as a dict keyed by LAG_FIELDS."""
+        series_id = self.ids([key])[0]
+        return dict(zip(LAG_FIELDS, self._values[:, series_id].tolist()))
+    
+    def save(self, path: Union[str, Path], tick: int = 0) -> None:
+        """
+        Write a snapshot atomically.
+        
+        The snapshot is written to a uniquely named temporary file in the
+        same directory, fsynced and renamed over the previous one, so a crash
+        at any point leaves either the old or the new snapshot intact and
+        concurrent writers never share a temporary file.
+        
+        Args:
+            path: Snapshot file path.
+            tick: Tick counter stored with the snapshot.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        values = np.ascontiguousarray(self.values).tobytes()
+        keys = "\0".join(self._keys).encode("utf-8")
+        checksum = zlib.crc32(keys, zlib.crc32(values))
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(LAG_FIELDS), len(self._keys),
+            tick, time.time(), len(keys), checksum,
+        )
+        
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(values)
+                f.write(keys)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        _fsync_directory(path.parent)
+    
+    @classmethod
+    def load(
+        cls, path: Union[str, Path], rng: Optional[np.random.Generator] = None
+    ) -> Tuple["LagState", int, float]:
+        """
+        Load a snapshot written by save().
+        
+        The file is memory-mapped and its checksum verified before the values
+        are copied into a new state.
+        
+        Args:
+            path: Snapshot file path.
+            rng: Generator for series first seen after loading.
+        
+        Returns:
+            Tuple of (state, tick stored with the snapshot, unix time it was saved).
+        
+        Raises:
+            ValueError: If the file is truncated, corrupt or from another format.
+        """
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if len(mapped) < SNAPSHOT_HEADER.size:
+                raise ValueError("Lag state snapshot is truncated")
+            magic, version, n_fields, n_series, tick, saved_at, keys_length, checksum = (
+                SNAPSHOT_HEADER.unpack_from(mapped)
+            )
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or n_fields != len(LAG_FIELDS):
+                raise ValueError("Not a lag state snapshot of a supported version")
+            
+            values_end = SNAPSHOT_HEADER.size + n_fields * n_series * 8
+            if len(mapped) != values_end + keys_length:
+                raise ValueError("Lag state snapshot is truncated")
+            
+            payload = memoryview(mapped)[SNAPSHOT_HEADER.size:]
+            try:
+                if zlib.crc32(payload) != checksum:
+                    raise ValueError("Lag state snapshot checksum mismatch")
+                values = np.frombuffer(
+                    mapped, dtype=np.float64, count=n_fields * n_series, offset=SNAPSHOT_HEADER.size
+                ).reshape(n_fields, n_series)
+                
+                state = cls(rng=rng, capacity=n_series)
+                state._values[:, :n_series] = values
+                del values
+                keys = mapped[values_end:].decode("utf-8").split("\0") if n_series else []
+            finally:
+                payload.release()
+        
+        state._keys = keys
+        state._index = {key: series_id for series_id, key in enumerate(keys)}
+        return state, tick, saved_at
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def _add(self, keys: List[str]) -> None:
+        """Assign ids to new series, growing the arrays geometrically."""
+        start = len(self._keys)
+        end = start + len(keys)
+        if end > self._values.shape[1]:
+            grown = np.zeros((len(LAG_FIELDS), max(end, 2 * self._values.shape[1])), dtype=np.float64)
+            grown[:, :start] = self._values[:, :start]
+            self._values = grown
+        
+        self._values[LAG_1:ROLL_2 + 1, start:end] = self._rng.uniform(
+            0, INITIAL_LAG_MAX, size=(ROLL_2 + 1, len(keys))
+        )
+        self._values[LAST_PREDICTED, start:end] = self._rng.uniform(
+            0, INITIAL_PREDICTED_MAX, size=len(keys)
+        )
+        for offset, key in enumerate(keys):
+            self._index[key] = start + offset
+        self._keys.extend(keys)
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Persist a rename by syncing its directory (no-op where unsupported)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
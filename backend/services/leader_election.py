@@ -0,0 +1,190 @@
+"""
+Leader Election so exactly one worker computes each prediction batch.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from config import BUS_LOCK_PATH, LEADER_LOCK_KEY, LEADER_RENEW_INTERVAL, LEADER_TTL
+from .metrics import REGISTRY
+from .resp_client import RespClient, RespError
+
+logger = logging.getLogger(__name__)
+
+IS_LEADER = REGISTRY.gauge("is_leader", "1 while this worker produces prediction batches")
+LEADER_CHANGES = REGISTRY.counter("leader_changes_total", "Times this worker gained or lost leadership")
+
+
+class LeaderElection(ABC):
+    """Base class for leader elections."""
+    
+    kind = "base"
+    is_leader = False  # Set by run_while_leader while the task runs
+    
+    @abstractmethod
+    async def try_acquire(self) -> bool:
+        """Try to become leader without waiting."""
+    
+    @abstractmethod
+    async def renew(self) -> bool:
+        """Extend leadership; False once it has been lost."""
+    
+    @abstractmethod
+    async def release(self) -> None:
+        """Give up leadership if held."""
+
+
+class FileLockElection(LeaderElection):
+    """
+    Leader election between worker processes on one host.
+    
+    The leader holds an exclusive flock on a lock file. The kernel releases
+    the lock when the process exits, so a crashed leader is replaced on the
+    next poll without any lease timeout.
+    """
+    
+    kind = "flock"
+    
+    def __init__(self, path: Path = BUS_LOCK_PATH):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+    
+    async def try_acquire(self) -> bool:
+        import fcntl
+        
+        if self._fd is not None:
+            return True
+        
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+    
+    async def renew(self) -> bool:
+        return self._fd is not None
+    
+    async def release(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class RedisElection(LeaderElection):
+    """
+    Leader election across hosts with a Redis lease.
+    
+    The leader owns a key set with SET NX PX and extends it while the key
+    still holds its identity. A leader that stops renewing loses the lease
+    after LEADER_TTL seconds.
+    """
+    
+    kind = "redis"
+    
+    def __init__(
+        self,
+        client: Optional[RespClient] = None,
+        key: str = LEADER_LOCK_KEY,
+        ttl: float = LEADER_TTL,
+    ):
+        self.client = client or RespClient()
+        self.key = key
+        self.ttl_ms = int(ttl * 1000)
+        self.identity = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    
+    async def try_acquire(self) -> bool:
+        reply = await self.client.execute("SET", self.key, self.identity, "NX", "PX", self.ttl_ms)
+        return reply == "OK"
+    
+    async def renew(self) -> bool:
+        # If the lease expired between GET and PEXPIRE this extends the new
+        # owner's lease, which is harmless; the next renewal sees the change.
+        if await self.client.execute("GET", self.key) != self.identity.encode():
+            return False
+        return await self.client.execute("PEXPIRE", self.key, self.ttl_ms) == 1
+    
+    async def release(self) -> None:
+        try:
+            if await self.client.execute("GET", self.key) == self.identity.encode():
+                await self.client.execute("DEL", self.key)
+        except (ConnectionError, OSError, RespError) as e:
+            logger.warning(f"Could not release leadership: {e}")
+
+
+async def run_while_leader(
+    election: LeaderElection,
+    on_elected: Callable[[], Awaitable[None]],
+    interval: float = LEADER_RENEW_INTERVAL,
+) -> None:
+    """
+    Campaign for leadership forever and run a task while it is held.
+    
+    on_elected starts when leadership is won and is cancelled as soon as a
+    renewal fails; the worker then goes back to campaigning. Connection
+    failures and error replies from the server (NOAUTH, LOADING, ...) are
+    logged and retried rather than ending the campaign.
+    
+    Args:
+        election: The election to take part in.
+        on_elected: Coroutine function run while this worker is leader.
+        interval: Seconds between acquisition attempts and renewals.
+    """
+    try:
+        while True:
+            try:
+                acquired = await election.try_acquire()
+            except (ConnectionError, OSError, RespError) as e:
+                logger.warning(f"Leader election unavailable: {e}")
+                acquired = False
+            if not acquired:
+                await asyncio.sleep(interval)
+                continue
+            
+            logger.info(f"Became prediction leader ({election.kind})")
+            election.is_leader = True
+            IS_LEADER.set(1)
+            LEADER_CHANGES.inc()
+            task = asyncio.create_task(on_elected())
+            task.add_done_callback(_log_task_failure)
+            try:
+                # Keep the lease even if the task finishes, so it is not rerun elsewhere
+                while True:
+                    await asyncio.sleep(interval)
+                    try:
+                        held = await election.renew()
+                    except (ConnectionError, OSError, RespError) as e:
+                        logger.warning(f"Leadership renewal failed: {e}")
+                        held = False
+                    if not held:
+                        logger.warning("Lost prediction leadership")
+                        break
+            finally:
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+                election.is_leader = False
+                IS_LEADER.set(0)
+                LEADER_CHANGES.inc()
+                await election.release()
+    finally:
+        await election.release()
+
+
+def _log_task_failure(task: "asyncio.Task[None]") -> None:
+    """Log a leader task that stopped with an error."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Leader task failed: {task.exception()}")
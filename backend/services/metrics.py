@@ -0,0 +1,272 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Buckets for row and item counts
+SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+class Counter:
+    """Monotonically increasing counter."""
+    
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the counter by amount."""
+        with self._lock:
+            self._value += amount
+    
+    @property
+    def value(self) -> float:
+        """Current counter value."""
+        return self._value
+    
+    def drain(self) -> Optional[float]:
+        """Take the increase since the last drain, or None if there was none."""
+        with self._lock:
+            value, self._value = self._value, 0.0
+        return value or None
+    
+    def merge(self, value: float) -> None:
+        """Add an increase drained from another process."""
+        self.inc(value)
+    
+    def render(self) -> List[str]:
+        """Render the counter in Prometheus text format."""
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {_format_value(self._value)}",
+        ]
+
+
+class Gauge:
+    """Value that can go up and down."""
+    
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._changed = False
+        self._lock = threading.Lock()
+    
+    def set(self, value: float) -> None:
+        """Set the gauge to value."""
+        self._value = value
+        self._changed = True
+    
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the gauge by amount."""
+        with self._lock:
+            self._value += amount
+            self._changed = True
+    
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrease the gauge by amount."""
+        with self._lock:
+            self._value -= amount
+            self._changed = True
+    
+    @property
+    def value(self) -> float:
+        """Current gauge value."""
+        return self._value
+    
+    def drain(self) -> Optional[float]:
+        """Take the value if it was written since the last drain, else None."""
+        with self._lock:
+            changed, self._changed = self._changed, False
+        return self._value if changed else None
+    
+    def merge(self, value: float) -> None:
+        """Adopt a value drained from another process."""
+        self.set(value)
+    
+    def render(self) -> List[str]:
+        """Render the gauge in Prometheus text format."""
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_format_value(self._value)}",
+        ]
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values."""
+    
+    def __init__(self, name: str, description: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+    
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the enclosed block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+    
+    def drain(self) -> Optional[Dict[str, Any]]:
+        """Take the observations since the last drain, or None if there were none."""
+        with self._lock:
+            if not self._count:
+                return None
+            state = {"counts": self._counts, "sum": self._sum, "count": self._count}
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
+        return state
+    
+    def merge(self, state: Dict[str, Any]) -> None:
+        """Add observations drained from a histogram with the same buckets."""
+        with self._lock:
+            for idx, count in enumerate(state["counts"]):
+                self._counts[idx] += count
+            self._sum += state["sum"]
+            self._count += state["count"]
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the histogram state.
+        
+        Returns:
+            Dict with cumulative bucket counts keyed by upper bound, plus the
+            total count and sum of observations.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = count
+        
+        return {"buckets": cumulative, "count": count, "sum": round(total, 6)}
+    
+    def render(self) -> List[str]:
+        """Render the histogram in Prometheus text format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for bound, count in snapshot["buckets"].items():
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {count}')
+        lines.append(f"{self.name}_sum {_format_value(snapshot['sum'])}")
+        lines.append(f"{self.name}_count {snapshot['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together for scraping."""
+    
+    def __init__(self, prefix: str = "outbreak_"):
+        self.prefix = prefix
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+    
+    def counter(self, name: str, description: str = "") -> Counter:
+        """Get or create a counter."""
+        return self._get_or_create(Counter, name, description)
+    
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        """Get or create a gauge."""
+        return self._get_or_create(Gauge, name, description)
+    
+    def histogram(
+        self, name: str, description: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Get or create a histogram."""
+        return self._get_or_create(Histogram, name, description, buckets=buckets)
+    
+    def render(self) -> str:
+        """
+        Render every registered metric.
+        
+        Returns:
+            str: Metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+    
+    def drain(self) -> Dict[str, Any]:
+        """
+        Take what every metric recorded since the last drain.
+        
+        Used by worker processes, whose metrics live in their own copy of
+        the registry, to ship their updates to the web process.
+        
+        Returns:
+            Dict of drained state by metric name, for merge; metrics with
+            nothing new are left out.
+        """
+        drained = {}
+        for name, metric in list(self._metrics.items()):
+            state = metric.drain()
+            if state is not None:
+                drained[name] = state
+        return drained
+    
+    def merge(self, drained: Dict[str, Any]) -> None:
+        """
+        Apply state drained from another process's registry.
+        
+        Counters and histograms accumulate; gauges take the drained value.
+        Metrics this registry does not know are ignored.
+        """
+        for name, state in drained.items():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(state)
+    
+    def _get_or_create(self, metric_type: type, name: str, description: str, **kwargs: Any) -> Any:
+        """Return the registered metric with this name, creating it if needed."""
+        full_name = self.prefix + name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = metric_type(full_name, description, **kwargs)
+            elif not isinstance(metric, metric_type):
+                raise ValueError(f"Metric {full_name} already registered as {type(metric).__name__}")
+        return metric
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value, dropping the fraction for whole numbers."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Default registry served by the /metrics endpoint
+REGISTRY = MetricsRegistry()
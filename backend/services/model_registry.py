@@ -0,0 +1,200 @@
+"""
+Model Registry for serving several model versions with routing and shadowing.
+"""
+
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from config import MODEL_PATH, MODEL_REGISTRY, MODEL_ROUTES, MODEL_SHADOWS
+from .metrics import REGISTRY
+from .model_service import ModelService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "default"
+
+SHADOW_PREDICT_SECONDS = REGISTRY.histogram(
+    "shadow_predict_seconds", "Latency of shadow model predict calls"
+)
+SHADOW_FAILURES = REGISTRY.counter(
+    "shadow_failures_total", "Shadow model predict calls that raised"
+)
+
+
+class ModelRegistry:
+    """
+    Holds several named models and decides which one scores each district.
+    
+    Every district is served by exactly one primary model: the one named in
+    its route, or the default model. Shadow models score the same feature
+    matrix after the primary call; their output is compared with what was
+    served and logged, but never returned.
+    """
+    
+    def __init__(
+        self,
+        default: ModelService,
+        models: Mapping[str, str] = MODEL_REGISTRY,
+        routes: Mapping[str, str] = MODEL_ROUTES,
+        shadows: Iterable[str] = MODEL_SHADOWS,
+    ):
+        self._models: Dict[str, ModelService] = {DEFAULT_MODEL: default}
+        for name, filename in models.items():
+            path = Path(MODEL_PATH).parent / filename
+            self._models[name] = ModelService(default.engine, path, Path(filename).stem)
+        
+        for district, name in routes.items():
+            if name not in self._models:
+                raise ValueError(f"Route for {district} uses unknown model: {name}")
+        for name in shadows:
+            if name not in self._models:
+                raise ValueError(f"Unknown shadow model: {name}")
+        
+        self.routes: Dict[str, str] = dict(routes)
+        self.shadows: List[str] = list(shadows)
+        self._shadow_stats: Dict[str, Dict[str, Any]] = {}
+    
+    @property
+    def default(self) -> ModelService:
+        """The model serving districts without a route."""
+        return self._models[DEFAULT_MODEL]
+    
+    def get(self, name: str) -> ModelService:
+        """
+        Get a registered model.
+        
+        Raises:
+            KeyError: If no model is registered under this name.
+        """
+        return self._models[name]
+    
+    def load_models(self) -> Dict[str, bool]:
+        """
+        Load every registered model except the default one.
+        
+        Returns:
+            Dict mapping model names to whether they loaded.
+        """
+        return {
+            name: service.load_model()
+            for name, service in self._models.items()
+            if name != DEFAULT_MODEL
+        }
+    
+    def predict(
+        self, matrix: np.ndarray, districts: Sequence[str], shadow: bool = True
+    ) -> Tuple[np.ndarray, List[str]]:
+        """
+        Score each row with the primary model for its district, then run shadows.
+        
+        Rows routed to a model that is not loaded are scored by the default
+        model. Shadow failures are logged and never affect the result.
+        
+        Args:
+            matrix: Feature matrix of shape (n_rows, len(FEATURE_ORDER)).
+            districts: District backing each row.
+            shadow: Whether to run the shadow models on this matrix.
+        
+        Returns:
+            Tuple of (log predictions, model version per row).
+        
+        Raises:
+            RuntimeError: If a row's model (or the default) is not loaded.
+        """
+        start = time.perf_counter()
+        groups = self._group_rows(districts)
+        
+        if len(groups) == 1:
+            # Common case: one model serves the whole batch, no row gathering
+            service = next(iter(groups))
+            predictions, version = service.predict_with_version(matrix)
+            predictions = np.asarray(predictions, dtype=np.float64)
+            versions = [version] * len(predictions)
+        else:
+            predictions = np.empty(len(matrix), dtype=np.float64)
+            row_versions = np.empty(len(matrix), dtype=object)
+            for service, rows in groups.items():
+                group_predictions, version = service.predict_with_version(matrix[rows])
+                predictions[rows] = group_predictions
+                row_versions[rows] = version
+            versions = row_versions.tolist()
+        
+        if shadow and self.shadows:
+            self._run_shadows(matrix, predictions, time.perf_counter() - start)
+        
+        return predictions, versions
+    
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get registry state.
+        
+        Returns:
+            Dict with each model's info, the district routes, and the latest
+            comparison for each shadow model.
+        """
+        return {
+            "models": {name: service.get_model_info() for name, service in self._models.items()},
+            "routes": dict(self.routes),
+            "shadows": {name: self._shadow_stats.get(name) for name in self.shadows},
+        }
+    
+    def _group_rows(self, districts: Sequence[str]) -> Dict[ModelService, Any]:
+        """
+        Map each serving model to the rows it scores.
+        
+        Returns:
+            Dict of model to row index array, or to a full slice when a single
+            model serves every row.
+        """
+        if not self.routes:
+            return {self.default: slice(None)}
+        
+        names = np.array([self.routes.get(district, DEFAULT_MODEL) for district in districts])
+        groups: Dict[ModelService, List[np.ndarray]] = {}
+        for name in np.unique(names).tolist():
+            service = self._models[name]
+            if not service.is_loaded:
+                service = self.default
+            groups.setdefault(service, []).append(np.flatnonzero(names == name))
+        
+        if len(groups) == 1:
+            return {service: slice(None) for service in groups}
+        return {service: np.concatenate(rows) for service, rows in groups.items()}
+    
+    def _run_shadows(self, matrix: np.ndarray, served: np.ndarray, served_seconds: float) -> None:
+        """Score the matrix with each shadow model and log how it compares."""
+        for name in self.shadows:
+            service = self._models[name]
+            if not service.is_loaded:
+                continue
+            
+            start = time.perf_counter()
+            try:
+                predictions, version = service.predict_with_version(matrix)
+            except Exception as e:
+                SHADOW_FAILURES.inc()
+                logger.error(f"Shadow model {name} failed: {e}")
+                continue
+            seconds = time.perf_counter() - start
+            SHADOW_PREDICT_SECONDS.observe(seconds)
+            
+            diff = np.abs(np.asarray(predictions, dtype=np.float64) - served)
+            stats = {
+                "version": version,
+                "rows": len(diff),
+                "mean_abs_diff": round(float(np.nanmean(diff)), 6) if len(diff) else 0.0,
+                "max_abs_diff": round(float(np.nanmax(diff)), 6) if len(diff) else 0.0,
+                "latency_seconds": round(seconds, 6),
+                "served_latency_seconds": round(served_seconds, 6),
+            }
+            self._shadow_stats[name] = stats
+            logger.info(
+                f"Shadow {name} ({version}) on {stats['rows']} rows: "
+                f"mean |diff| {stats['mean_abs_diff']:.4f}, "
+                f"max |diff| {stats['max_abs_diff']:.4f} (log cases), "
+                f"latency {seconds * 1000:.1f}ms vs {served_seconds * 1000:.1f}ms served"
+            )
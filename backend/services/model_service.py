@@ -2,59 +2,185 @@
 Model Service for loading and running inference with XGBoost model.
 """
 
+import hashlib
 import logging
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 import numpy as np
-import xgboost as xgb
 
-from config import MODEL_PATH, MODEL_VERSION
+from config import (
+    FEATURE_ORDER,
+    MODEL_COMPILED_PATH,
+    MODEL_ENGINE,
+    MODEL_NTHREAD,
+    MODEL_PATH,
+    MODEL_VERSION,
+    WARMUP_ROWS,
+)
+from .metrics import REGISTRY
+from .prediction_cache import PredictionCache
+from .tree_engine import NumpyTreeEnsemble
+
+if TYPE_CHECKING:
+    import xgboost as xgb
 
 logger = logging.getLogger(__name__)
 
+MODEL_PREDICT_SECONDS = REGISTRY.histogram(
+    "model_predict_seconds", "Latency of ModelService.predict calls"
+)
+
+
+class LoadedModel:
+    """An immutable, ready-to-serve model version."""
+    
+    def __init__(
+        self,
+        version: str,
+        path: Path,
+        booster: Optional["xgb.Booster"] = None,
+        tree_engine: Optional[NumpyTreeEnsemble] = None,
+    ):
+        self.version = version
+        self.path = path
+        self.booster = booster
+        self.tree_engine = tree_engine
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+    
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        """Run the model on a contiguous float32 matrix in FEATURE_ORDER."""
+        if self.tree_engine is not None:
+            return self.tree_engine.predict(matrix)
+        return self.booster.inplace_predict(matrix, validate_features=False)
+
 
 class ModelService:
-    """Service for managing the XGBoost outbreak prediction model."""
+    """
+    Service for managing the XGBoost outbreak prediction model.
+    
+    With the "xgboost" engine predictions run on the XGBoost booster. With
+    the "numpy" engine the trees are compiled once into flat arrays and
+    evaluated by NumpyTreeEnsemble; if a compiled file for the current model
+    contents exists, xgboost is never imported.
+    
+    The served model can be replaced at runtime with reload_model. The new
+    version is loaded, validated and warmed up before a single reference
+    swap, so each predict call sees exactly one model version.
+    
+    An optional PredictionCache memoizes predictions on quantized feature
+    rows; it is emptied whenever the served version changes.
+    """
+    
+    def __init__(
+        self,
+        engine: str = MODEL_ENGINE,
+        path: Path = MODEL_PATH,
+        version: str = MODEL_VERSION,
+        cache: Optional[PredictionCache] = None,
+    ):
+        if engine not in ("xgboost", "numpy"):
+            raise ValueError(f"Unknown model engine: {engine}")
+        
+        self.engine: str = engine
+        self.path = Path(path)
+        self.base_version = version
+        self.cache = cache
+        self._current: Optional[LoadedModel] = None
+        self._reload_lock = threading.Lock()
     
-    def __init__(self):
-        self.model: Optional[xgb.Booster] = None
-        self.model_version: str = MODEL_VERSION
-        self.is_loaded: bool = False
+    @property
+    def is_loaded(self) -> bool:
+        """Whether a model is available for predictions."""
+        return self._current is not None
+    
+    @property
+    def model(self) -> Optional["xgb.Booster"]:
+        """The XGBoost booster currently served, if any."""
+        current = self._current
+        return current.booster if current is not None else None
+    
+    @property
+    def tree_engine(self) -> Optional[NumpyTreeEnsemble]:
+        """The compiled tree engine currently served, if any."""
+        current = self._current
+        return current.tree_engine if current is not None else None
+    
+    @property
+    def model_version(self) -> str:
+        """Version of the model currently served."""
+        current = self._current
+        return current.version if current is not None else self.base_version
     
     def load_model(self) -> bool:
         """
-        Load the XGBoost booster model from disk.
+        Load the XGBoost booster model (or its compiled trees) from disk.
         
         Returns:
             bool: True if model loaded successfully, False otherwise.
         """
+        model_path = self.path
+        
+        if not model_path.exists():
+            logger.warning(
+                f"Model file not found at {model_path}. "
+                "Please place your trained model at this location."
+            )
+            return False
+        
         try:
-            model_path = Path(MODEL_PATH)
-            
-            if not model_path.exists():
-                logger.warning(
-                    f"Model file not found at {model_path}. "
-                    "Please place your trained model at this location."
-                )
-                return False
-            
-            self.model = xgb.Booster()
-            self.model.load_model(str(model_path))
-            self.is_loaded = True
-            
-            logger.info(f"Model loaded successfully from {model_path}")
+            self._current = self._build_model(model_path, self.base_version)
+            logger.info(f"Model loaded successfully from {model_path} ({self.engine} engine)")
             return True
             
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
-            self.is_loaded = False
             return False
     
+    def reload_model(self, path: Optional[Path] = None, version: Optional[str] = None) -> bool:
+        """
+        Load a new model version in the calling thread and swap it in.
+        
+        The candidate must match FEATURE_ORDER and produce finite predictions
+        on a warm-up batch; otherwise the current model keeps serving.
+        
+        Args:
+            path: Model file to load (defaults to the service's model path).
+            version: Version label (defaults to the base version plus a content hash).
+        
+        Returns:
+            bool: True if the new model is now serving, False otherwise.
+        """
+        model_path = Path(path) if path is not None else self.path
+        
+        with self._reload_lock:
+            try:
+                if version is None:
+                    version = f"{self.base_version}-{_file_digest(model_path)[:8]}"
+                
+                candidate = self._build_model(model_path, version)
+                self._warm_up(candidate)
+            except Exception as e:
+                logger.error(f"Model reload from {model_path} rejected: {e}")
+                return False
+            
+            previous = self.model_version
+            self._current = candidate
+        
+        logger.info(f"Model swapped: {previous} -> {version}")
+        return True
+    
     def predict(self, features: np.ndarray) -> np.ndarray:
         """
         Run prediction on input features.
         
+        Uses XGBoost in-place prediction on a contiguous float32 buffer, which
+        skips DMatrix construction and is safe to call from multiple threads,
+        or the compiled NumPy tree engine. Columns must already be in
+        FEATURE_ORDER; the schema is validated once at load time.
+        
         Args:
             features: Input feature array of shape (n_samples, n_features)
         
@@ -63,26 +189,164 @@ class ModelService:
         
         Raises:
             RuntimeError: If model is not loaded.
+            ValueError: If the feature count does not match FEATURE_ORDER.
         """
-        if not self.is_loaded or self.model is None:
-            raise RuntimeError("Model not loaded. Call load_model() first.")
+        predictions, _ = self.predict_with_version(features)
+        return predictions
+    
+    @MODEL_PREDICT_SECONDS.time()
+    def predict_with_version(self, features: np.ndarray) -> Tuple[np.ndarray, str]:
+        """
+        Run prediction and report which model version produced it.
         
-        # Create DMatrix for XGBoost
-        dmatrix = xgb.DMatrix(features)
+        Args:
+            features: Input feature array of shape (n_samples, n_features)
         
-        # Assign feature names to match model expectation
-        from config import FEATURE_ORDER
-        dmatrix.feature_names = FEATURE_ORDER
+        Returns:
+            Tuple of (raw log predictions, model version).
         
-        # Get predictions (log-transformed)
-        predictions = self.model.predict(dmatrix)
+        Raises:
+            RuntimeError: If model is not loaded.
+            ValueError: If the feature count does not match FEATURE_ORDER.
+        """
+        current = self._current
+        if current is None:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
         
-        return predictions
+        matrix = np.ascontiguousarray(features, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        if matrix.shape[1] != len(FEATURE_ORDER):
+            raise ValueError(
+                f"Expected {len(FEATURE_ORDER)} features, got {matrix.shape[1]}"
+            )
+        
+        # Get predictions (log-transformed)
+        if self.cache is not None:
+            return self.cache.predict(matrix, current.version, current.predict), current.version
+        return current.predict(matrix), current.version
     
     def get_model_info(self) -> dict:
         """Get model metadata."""
+        current = self._current
         return {
             "version": self.model_version,
             "is_loaded": self.is_loaded,
-            "model_path": str(MODEL_PATH),
+            "model_path": str(current.path if current is not None else self.path),
+            "loaded_at": current.loaded_at if current is not None else None,
+            "engine": self.engine,
+            "cache": self.cache.get_stats() if self.cache is not None else None,
         }
+    
+    def _build_model(self, model_path: Path, version: str) -> LoadedModel:
+        """
+        Load and validate a model file without touching the served model.
+        
+        Args:
+            model_path: Path to the XGBoost model file.
+            version: Version label for the loaded model.
+        
+        Returns:
+            LoadedModel: The validated model.
+        
+        Raises:
+            ValueError: If the model has no feature names or they do not
+                match FEATURE_ORDER.
+        """
+        if self.engine == "numpy":
+            loaded = LoadedModel(version, model_path, tree_engine=self._load_tree_engine(model_path))
+            feature_names = loaded.tree_engine.feature_names
+        else:
+            loaded = LoadedModel(version, model_path, booster=self._load_booster(model_path))
+            feature_names = loaded.booster.feature_names
+        
+        # Validate the feature schema once instead of on every predict call
+        if not self._feature_names_match(feature_names):
+            raise ValueError("Model feature names do not match FEATURE_ORDER")
+        
+        return loaded
+    
+    def _warm_up(self, candidate: LoadedModel) -> None:
+        """Run a synthetic batch through a candidate model before serving it."""
+        matrix = np.zeros((WARMUP_ROWS, len(FEATURE_ORDER)), dtype=np.float32)
+        predictions = candidate.predict(matrix)
+        if not np.all(np.isfinite(predictions)):
+            raise ValueError("Model produced non-finite warm-up predictions")
+    
+    def _load_booster(self, model_path: Path) -> "xgb.Booster":
+        """Load an XGBoost booster, importing xgboost on first use."""
+        import xgboost as xgb
+        
+        model = xgb.Booster()
+        model.load_model(str(model_path))
+        if MODEL_NTHREAD > 0:
+            model.set_param({"nthread": MODEL_NTHREAD})
+        return model
+    
+    def _load_tree_engine(self, model_path: Path) -> NumpyTreeEnsemble:
+        """
+        Load the compiled tree engine, compiling it from the booster if needed.
+        
+        Compiled trees are reused only when they record the digest of the
+        current model file, so a model copied in with an older mtime is not
+        served from a stale cache.
+        
+        Args:
+            model_path: Path to the XGBoost model file.
+        
+        Returns:
+            NumpyTreeEnsemble: The compiled ensemble.
+        """
+        if model_path == Path(MODEL_PATH):
+            compiled_path = Path(MODEL_COMPILED_PATH)
+        else:
+            compiled_path = model_path.with_suffix(".trees.npz")
+        
+        digest = _file_digest(model_path)
+        if compiled_path.exists():
+            try:
+                tree_engine = NumpyTreeEnsemble.load(compiled_path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable compiled trees {compiled_path}: {e}")
+            else:
+                if tree_engine.source_digest == digest:
+                    logger.info(f"Loading compiled trees from {compiled_path}")
+                    return tree_engine
+                logger.info(f"Compiled trees in {compiled_path} are stale, recompiling")
+        
+        tree_engine = NumpyTreeEnsemble.from_booster(self._load_booster(model_path))
+        tree_engine.source_digest = digest
+        try:
+            tree_engine.save(compiled_path)
+            logger.info(f"Compiled {tree_engine.num_trees} trees to {compiled_path}")
+        except OSError as e:
+            logger.warning(f"Could not save compiled trees: {e}")
+        return tree_engine
+    
+    def _feature_names_match(self, feature_names: Optional[List[str]]) -> bool:
+        """
+        Check a model's feature names against FEATURE_ORDER.
+        
+        A model saved without feature names cannot be validated and is
+        rejected, since its columns may be in any order.
+        """
+        if feature_names is None:
+            logger.error("Model has no feature names to validate against FEATURE_ORDER")
+            return False
+        if list(feature_names) == FEATURE_ORDER:
+            return True
+        
+        logger.error(
+            f"Model feature names do not match FEATURE_ORDER "
+            f"({len(feature_names)} vs {len(FEATURE_ORDER)} features)"
+        )
+        return False
+
+
+def _file_digest(path: Path) -> str:
+    """SHA-256 of a file; its prefix labels reloaded model versions."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
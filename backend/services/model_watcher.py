@@ -0,0 +1,119 @@
+"""
+Model Watcher for hot-reloading the model when its file changes on disk.
+"""
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from config import MODEL_PATH, MODEL_WATCH_INTERVAL
+from .metrics import REGISTRY
+from .model_registry import DEFAULT_MODEL
+from .model_service import ModelService
+
+if TYPE_CHECKING:
+    from .prediction_executor import PredictionExecutor
+
+logger = logging.getLogger(__name__)
+
+MODEL_RELOADS = REGISTRY.counter(
+    "model_reloads_total", "Models swapped in at runtime"
+)
+MODEL_RELOAD_FAILURES = REGISTRY.counter(
+    "model_reload_failures_total", "Model reloads rejected by validation or warm-up"
+)
+
+
+class ModelWatcher:
+    """
+    Polls the model file and reloads it in the background when it changes.
+    
+    A change is only acted on once the file's size and mtime have been stable
+    for two consecutive polls, so a model that is still being copied into
+    place is never loaded half-written. The load, validation and warm-up run
+    in a worker thread; the swap itself is a single reference assignment in
+    ModelService, so in-flight ticks finish on the model they started with.
+    
+    With an executor, reloads go through PredictionExecutor.reload_model so
+    they also reach a process-pool worker.
+    """
+    
+    def __init__(
+        self,
+        model_service: ModelService,
+        path: Path = MODEL_PATH,
+        interval: float = MODEL_WATCH_INTERVAL,
+        executor: Optional["PredictionExecutor"] = None,
+    ):
+        self.model_service = model_service
+        self.executor = executor
+        self.path = Path(path)
+        self.interval = interval
+        self._loaded_stat: Optional[Tuple[float, int]] = self._stat()
+        self._pending_stat: Optional[Tuple[float, int]] = None
+    
+    async def run(self) -> None:
+        """Poll until cancelled."""
+        if self.interval <= 0:
+            return
+        
+        logger.info(f"Watching {self.path} for model updates (every {self.interval}s)")
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Model watcher check failed: {e}")
+    
+    async def check(self) -> bool:
+        """
+        Check the model file once and reload it if it has settled on a new version.
+        
+        Returns:
+            bool: True if a new model was swapped in.
+        """
+        stat = self._stat()
+        if stat is None or stat == self._loaded_stat:
+            self._pending_stat = None
+            return False
+        
+        if stat != self._pending_stat:
+            # First sighting of this version; wait for it to stop changing
+            self._pending_stat = stat
+            return False
+        
+        self._pending_stat = None
+        self._loaded_stat = stat
+        return await self.reload()
+    
+    async def reload(self, path: Optional[Path] = None, version: Optional[str] = None) -> bool:
+        """
+        Reload the model off the event loop.
+        
+        Args:
+            path: Model file to load (defaults to the watched path).
+            version: Version label for the new model.
+        
+        Returns:
+            bool: True if the new model is now serving.
+        """
+        if self.executor is not None:
+            swapped = await self.executor.reload_model(DEFAULT_MODEL, path or self.path, version)
+        else:
+            swapped = await asyncio.to_thread(
+                self.model_service.reload_model, path or self.path, version
+            )
+        if swapped:
+            MODEL_RELOADS.inc()
+        else:
+            MODEL_RELOAD_FAILURES.inc()
+        return swapped
+    
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        """(mtime, size) of the watched file, or None if it is missing."""
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
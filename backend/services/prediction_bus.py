@@ -0,0 +1,309 @@
+"""
+Prediction Bus for sharing each batch between worker processes.
+
+One elected leader computes a batch, encodes it once and publishes the
+frame; every worker (the leader included) subscribes and fans the batch out
+to its own websocket clients.
+"""
+
+import asyncio
+import logging
+import struct
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from config import (
+    BUS_CHANNEL,
+    BUS_ENCODING,
+    BUS_LOCK_PATH,
+    BUS_MAX_BUFFER_BYTES,
+    BUS_QUEUE_SIZE,
+    BUS_RECONNECT_DELAY,
+    BUS_SOCKET_PATH,
+    PREDICTION_BUS,
+)
+from .leader_election import FileLockElection, LeaderElection, RedisElection
+from .metrics import REGISTRY
+from .resp_client import RespClient, RespError
+from .serializers import Frame, get_serializer
+
+logger = logging.getLogger(__name__)
+
+BUS_PUBLISHED = REGISTRY.counter("bus_published_total", "Batches published to the prediction bus")
+BUS_RECEIVED = REGISTRY.counter("bus_received_total", "Batches received from the prediction bus")
+BUS_DROPPED = REGISTRY.counter(
+    "bus_dropped_total", "Batches a subscriber or follower missed because it fell behind"
+)
+BUS_FOLLOWERS = REGISTRY.gauge("bus_followers", "Workers connected to this leader's bus socket")
+
+# Length prefix of each frame on the Unix socket
+_FRAME_HEADER = struct.Struct("<I")
+
+
+class PredictionBus(ABC):
+    """
+    Base class for prediction buses.
+    
+    Messages travel as "<encoding>\\n<frame>", so subscribers can decode the
+    batch and hand the untouched frame to clients using the same encoding.
+    """
+    
+    kind = "base"
+    
+    def __init__(self, encoding: str = BUS_ENCODING):
+        self.serializer = get_serializer(encoding)
+        self._prefix = self.serializer.name.encode() + b"\n"
+        self._published = 0
+        self._received = 0
+    
+    async def publish(self, message: Dict[str, Any]) -> None:
+        """
+        Encode a batch once and publish it to every subscriber.
+        
+        Args:
+            message: The batch prediction message.
+        """
+        frame = self.serializer.encode(message)
+        data = frame if isinstance(frame, bytes) else frame.encode()
+        await self._publish(self._prefix + data)
+        self._published += 1
+        BUS_PUBLISHED.inc()
+    
+    async def subscribe(self) -> AsyncIterator[Tuple[Dict[str, Any], Dict[str, Frame]]]:
+        """
+        Yield each published batch, reconnecting after bus failures.
+        
+        Yields:
+            Tuple of (decoded batch, {encoding name: frame as published}).
+        """
+        async for payload in self._messages():
+            name, _, data = payload.partition(b"\n")
+            serializer = get_serializer(name.decode())
+            frame: Frame = data if serializer.binary else data.decode()
+            self._received += 1
+            BUS_RECEIVED.inc()
+            yield serializer.decode(frame), {serializer.name: frame}
+    
+    async def serve(self) -> None:
+        """Run the leader's side of the bus until cancelled (nothing by default)."""
+        await asyncio.Event().wait()
+    
+    async def close(self) -> None:
+        """Release bus connections."""
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get bus kind, encoding and message counts."""
+        return {
+            "kind": self.kind,
+            "encoding": self.serializer.name,
+            "published": self._published,
+            "received": self._received,
+        }
+    
+    @abstractmethod
+    async def _publish(self, payload: bytes) -> None:
+        """Deliver one enveloped message."""
+    
+    @abstractmethod
+    def _messages(self) -> AsyncIterator[bytes]:
+        """Yield enveloped messages as they arrive."""
+
+
+class LocalBus(PredictionBus):
+    """
+    In-process bus, for running the bus code path in a single worker.
+    
+    Each subscriber has a bounded queue; a subscriber that falls behind
+    loses its oldest batch rather than holding up the publisher.
+    """
+    
+    kind = "local"
+    
+    def __init__(self, encoding: str = BUS_ENCODING, queue_size: int = BUS_QUEUE_SIZE):
+        super().__init__(encoding)
+        self.queue_size = queue_size
+        self._queues: List[asyncio.Queue] = []
+    
+    async def _publish(self, payload: bytes) -> None:
+        for queue in self._queues:
+            if queue.full():
+                queue.get_nowait()
+                BUS_DROPPED.inc()
+            queue.put_nowait(payload)
+    
+    async def _messages(self) -> AsyncIterator[bytes]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queues.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues.remove(queue)
+
+
+class UnixSocketBus(PredictionBus):
+    """
+    Bus between worker processes on one host.
+    
+    The leader listens on a Unix socket and writes each length-prefixed
+    message to every connected worker. Writes never wait for a follower; one
+    whose unsent backlog passes BUS_MAX_BUFFER_BYTES is disconnected and
+    reconnects to pick up from the next batch.
+    """
+    
+    kind = "unix"
+    
+    def __init__(
+        self,
+        path: Path = BUS_SOCKET_PATH,
+        encoding: str = BUS_ENCODING,
+        max_buffer_bytes: int = BUS_MAX_BUFFER_BYTES,
+        reconnect_delay: float = BUS_RECONNECT_DELAY,
+    ):
+        super().__init__(encoding)
+        self.path = Path(path)
+        self.max_buffer_bytes = max_buffer_bytes
+        self.reconnect_delay = reconnect_delay
+        self._followers: Set[asyncio.StreamWriter] = set()
+    
+    async def serve(self) -> None:
+        # Only the leader serves and it holds the election lock, so any socket file is stale
+        self.path.unlink(missing_ok=True)
+        server = await asyncio.start_unix_server(self._handle_follower, path=str(self.path))
+        logger.info(f"Serving prediction bus on {self.path}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            server.close()
+            for writer in list(self._followers):
+                writer.close()
+            self._followers.clear()
+            BUS_FOLLOWERS.set(0)
+            self.path.unlink(missing_ok=True)
+    
+    async def _handle_follower(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Register a connected worker until it disconnects."""
+        self._followers.add(writer)
+        BUS_FOLLOWERS.set(len(self._followers))
+        try:
+            # Followers never send; reading only detects the disconnect
+            await reader.read()
+        except ConnectionError:
+            pass
+        finally:
+            self._followers.discard(writer)
+            BUS_FOLLOWERS.set(len(self._followers))
+            writer.close()
+    
+    async def _publish(self, payload: bytes) -> None:
+        data = _FRAME_HEADER.pack(len(payload)) + payload
+        for writer in list(self._followers):
+            if writer.transport.get_write_buffer_size() > self.max_buffer_bytes:
+                logger.warning("Bus follower fell too far behind, disconnecting")
+                BUS_DROPPED.inc()
+                self._followers.discard(writer)
+                writer.close()
+                continue
+            writer.write(data)
+    
+    async def _messages(self) -> AsyncIterator[bytes]:
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(str(self.path))
+            except OSError:
+                # No leader serving yet
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            
+            try:
+                while True:
+                    header = await reader.readexactly(_FRAME_HEADER.size)
+                    (length,) = _FRAME_HEADER.unpack(header)
+                    yield await reader.readexactly(length)
+            except (asyncio.IncompleteReadError, ConnectionError) as e:
+                logger.info(f"Prediction bus connection closed ({type(e).__name__}); reconnecting")
+            finally:
+                writer.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+class RedisBus(PredictionBus):
+    """
+    Bus across hosts over Redis pub/sub (or any RESP-compatible server).
+    
+    Pub/sub does not buffer for disconnected subscribers; a worker that
+    reconnects resumes with the next batch.
+    """
+    
+    kind = "redis"
+    
+    def __init__(
+        self,
+        client: Optional[RespClient] = None,
+        channel: str = BUS_CHANNEL,
+        encoding: str = BUS_ENCODING,
+        reconnect_delay: float = BUS_RECONNECT_DELAY,
+    ):
+        super().__init__(encoding)
+        self.client = client or RespClient()
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+    
+    async def _publish(self, payload: bytes) -> None:
+        await self.client.execute("PUBLISH", self.channel, payload)
+    
+    async def _messages(self) -> AsyncIterator[bytes]:
+        while True:
+            try:
+                async for payload in self.client.subscribe(self.channel):
+                    yield payload
+            except (ConnectionError, OSError, RespError) as e:
+                logger.warning(f"Prediction bus subscription lost: {e}; reconnecting")
+            await asyncio.sleep(self.reconnect_delay)
+    
+    async def close(self) -> None:
+        await self.client.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {**super().get_stats(), "channel": self.channel}
+
+
+def create_prediction_bus(kind: str = PREDICTION_BUS) -> Optional[PredictionBus]:
+    """
+    Build the configured prediction bus.
+    
+    Args:
+        kind: "none", "local", "unix" or "redis".
+    
+    Returns:
+        The bus, or None to broadcast straight from the prediction loop.
+    """
+    if kind == "none":
+        return None
+    if kind == "local":
+        return LocalBus()
+    if kind == "unix":
+        return UnixSocketBus()
+    if kind == "redis":
+        return RedisBus()
+    raise ValueError(f"Unknown prediction bus: {kind}")
+
+
+def create_leader_election(kind: str = PREDICTION_BUS) -> Optional[LeaderElection]:
+    """
+    Build the leader election matching a prediction bus.
+    
+    Args:
+        kind: "none", "local", "unix" or "redis".
+    
+    Returns:
+        The election, or None when this process is the only producer.
+    """
+    if kind in ("none", "local"):
+        return None
+    if kind == "unix":
+        return FileLockElection(BUS_LOCK_PATH)
+    if kind == "redis":
+        return RedisElection()
+    raise ValueError(f"Unknown prediction bus: {kind}")
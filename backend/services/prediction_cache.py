@@ -0,0 +1,220 @@
+"""
+Prediction Cache for memoizing model output on quantized feature rows.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    FEATURE_GROUPS,
+    FEATURE_ORDER,
+    PREDICTION_CACHE_QUANTIZATION,
+    PREDICTION_CACHE_SIZE,
+    PREDICTION_CACHE_TTL,
+)
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CACHE_HITS = REGISTRY.counter("prediction_cache_hits_total", "Rows served from the prediction cache")
+CACHE_MISSES = REGISTRY.counter("prediction_cache_misses_total", "Rows sent to the model on a cache miss")
+CACHE_EVICTIONS = REGISTRY.counter(
+    "prediction_cache_evictions_total", "Least recently used rows evicted from the prediction cache"
+)
+CACHE_EXPIRATIONS = REGISTRY.counter(
+    "prediction_cache_expirations_total", "Cached rows dropped after PREDICTION_CACHE_TTL"
+)
+CACHE_INVALIDATIONS = REGISTRY.counter(
+    "prediction_cache_invalidations_total", "Cache clears caused by a model version change"
+)
+CACHE_ENTRIES = REGISTRY.gauge("prediction_cache_entries", "Rows currently held in the prediction cache")
+CACHE_HIT_RATIO = REGISTRY.gauge("prediction_cache_hit_ratio", "Share of rows served from the cache")
+
+
+class PredictionCache:
+    """
+    LRU cache of model predictions with a time-to-live.
+    
+    Each feature row is rounded to the step configured for its feature group
+    and hashed; rows with the same key share a prediction. The cache belongs
+    to one model version and is cleared as soon as it sees another one.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = PREDICTION_CACHE_SIZE,
+        ttl: float = PREDICTION_CACHE_TTL,
+        quantization: Mapping[str, float] = PREDICTION_CACHE_QUANTIZATION,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_entries <= 0:
+            raise ValueError("Prediction cache needs room for at least one row")
+        
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._steps = _column_steps(quantization)
+        self._quantized_columns = np.flatnonzero(self._steps > 0)
+        self._entries: "OrderedDict[bytes, Tuple[float, float]]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+    
+    def predict(
+        self,
+        matrix: np.ndarray,
+        version: str,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+    ) -> np.ndarray:
+        """
+        Serve cached rows and run the model only on the rest.
+        
+        Rows that share a key within one batch are sent to the model once.
+        
+        Args:
+            matrix: Float32 feature matrix in FEATURE_ORDER.
+            version: Version of the model behind predict_fn.
+            predict_fn: Model call for the rows that miss.
+        
+        Returns:
+            np.ndarray: One prediction per row.
+        """
+        keys = self.keys(matrix)
+        predictions = np.empty(len(keys), dtype=np.float64)
+        missing: Dict[bytes, List[int]] = {}
+        
+        with self._lock:
+            if version != self._version:
+                self._invalidate(version)
+            
+            now = self._clock()
+            for row, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and (self.ttl <= 0 or entry[1] > now):
+                    self._entries.move_to_end(key)
+                    predictions[row] = entry[0]
+                    continue
+                if entry is not None:
+                    del self._entries[key]
+                    CACHE_EXPIRATIONS.inc()
+                missing.setdefault(key, []).append(row)
+        
+        n_missed = sum(len(rows) for rows in missing.values())
+        if missing:
+            first_rows = [rows[0] for rows in missing.values()]
+            computed = np.asarray(predict_fn(matrix[first_rows]), dtype=np.float64)
+            for rows, value in zip(missing.values(), computed.tolist()):
+                predictions[rows] = value
+            self._store(list(missing), computed.tolist(), version)
+        
+        self._record(len(keys) - n_missed, n_missed)
+        return predictions
+    
+    def keys(self, matrix: np.ndarray) -> List[bytes]:
+        """
+        Hash each quantized feature row.
+        
+        Args:
+            matrix: Feature matrix of shape (n_rows, len(FEATURE_ORDER)).
+        
+        Returns:
+            List of 16-byte row keys.
+        """
+        quantized = np.array(matrix, dtype=np.float64)
+        if len(self._quantized_columns):
+            columns = self._quantized_columns
+            quantized[:, columns] = np.round(quantized[:, columns] / self._steps[columns])
+        quantized += 0.0  # Fold -0.0 into 0.0 so both hash alike
+        
+        return [hashlib.blake2b(row, digest_size=16).digest() for row in quantized]
+    
+    def clear(self) -> None:
+        """Drop every cached row."""
+        with self._lock:
+            self._entries.clear()
+        CACHE_ENTRIES.set(0)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size, hit rate and the model version it holds."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "version": self._version,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+    
+    def _invalidate(self, version: str) -> None:
+        """Start over for a new model version. Caller holds the lock."""
+        if self._version is not None:
+            logger.info(
+                f"Model version changed ({self._version} -> {version}); "
+                f"dropping {len(self._entries)} cached predictions"
+            )
+            CACHE_INVALIDATIONS.inc()
+        self._entries.clear()
+        self._version = version
+    
+    def _store(self, keys: List[bytes], values: List[float], version: str) -> None:
+        """Insert freshly computed rows, evicting the least recently used."""
+        expires_at = self._clock() + self.ttl
+        with self._lock:
+            if version != self._version:
+                # The model was swapped while these rows were computed
+                return
+            
+            for key, value in zip(keys, values):
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            entries = len(self._entries)
+        
+        if evicted:
+            CACHE_EVICTIONS.inc(evicted)
+        CACHE_ENTRIES.set(entries)
+    
+    def _record(self, hits: int, misses: int) -> None:
+        """Update hit and miss counts."""
+        CACHE_HITS.inc(hits)
+        CACHE_MISSES.inc(misses)
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+            lookups = self._hits + self._misses
+            ratio = self._hits / lookups if lookups else 0.0
+        CACHE_HIT_RATIO.set(ratio)
+
+
+def _column_steps(quantization: Mapping[str, float]) -> np.ndarray:
+    """
+    Expand per-group quantization steps to one step per FEATURE_ORDER column.
+    
+    Features outside every configured group are matched exactly.
+    """
+    steps = np.zeros(len(FEATURE_ORDER), dtype=np.float64)
+    positions = {name: idx for idx, name in enumerate(FEATURE_ORDER)}
+    
+    for group, step in quantization.items():
+        if group not in FEATURE_GROUPS:
+            raise ValueError(f"Unknown feature group in cache quantization: {group}")
+        if step < 0:
+            raise ValueError(f"Quantization step for {group} must not be negative")
+        for name in FEATURE_GROUPS[group]:
+            steps[positions[name]] = step
+    
+    return steps
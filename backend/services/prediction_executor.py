@@ -0,0 +1,247 @@
+"""
+Prediction Executor for running model inference off the asyncio event loop.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from config import (
+    LAG_STATE_PATH,
+    PREDICTION_CACHE_ENABLED,
+    PREDICTION_EXECUTOR,
+)
+from .metrics import REGISTRY
+from .prediction_service import PredictionService
+
+logger = logging.getLogger(__name__)
+
+# Prediction pipeline owned by a worker process (process executor only)
+_worker_prediction_service: Optional[PredictionService] = None
+
+
+def _init_worker_process() -> None:
+    """Build a private prediction pipeline inside a worker process."""
+    global _worker_prediction_service
+    
+    from .model_registry import ModelRegistry
+    from .model_service import ModelService
+    from .prediction_cache import PredictionCache
+    from .simulation_service import SimulationService
+    
+    # Discard metric values inherited from the parent when the worker is forked
+    REGISTRY.drain()
+    
+    model_service = ModelService(cache=PredictionCache() if PREDICTION_CACHE_ENABLED else None)
+    model_service.load_model()
+    model_registry = ModelRegistry(model_service)
+    model_registry.load_models()
+    _worker_prediction_service = PredictionService(
+        model_service, SimulationService(state_path=LAG_STATE_PATH), model_registry
+    )
+
+
+def _run_worker_batch(
+    observations: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], float, Dict[str, Any]]:
+    """Run one prediction batch in a worker process; also return its drained metrics."""
+    batch, elapsed = _timed_batch(_worker_prediction_service, observations)
+    return batch, elapsed, REGISTRY.drain()
+
+
+def _timed_batch(
+    prediction_service: PredictionService, observations: Optional[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], float]:
+    """Run one simulated or observed batch and time it."""
+    start = time.perf_counter()
+    if observations is None:
+        batch = prediction_service.predict_batch()
+    else:
+        batch = prediction_service.predict_observations(observations)
+    return batch, time.perf_counter() - start
+
+
+def _reload_worker_lag_state() -> None:
+    """Reload simulation lag state from its snapshot in a worker process."""
+    _worker_prediction_service.simulation_service.reload_lag_state()
+
+
+def _save_worker_lag_state() -> None:
+    """Snapshot simulation lag state in a worker process."""
+    _worker_prediction_service.simulation_service.save_lag_state()
+
+
+def _warm_up_worker() -> None:
+    """Warm up the prediction pipeline of a worker process."""
+    _worker_prediction_service.warm_up()
+
+
+def _reload_worker_model(name: str, path: Optional[Path], version: Optional[str]) -> bool:
+    """Reload a registry model in a worker process."""
+    return _worker_prediction_service.model_registry.get(name).reload_model(path, version)
+
+
+def _worker_registry_status() -> Dict[str, Any]:
+    """Registry status, with shadow comparisons, of a worker process."""
+    return _worker_prediction_service.model_registry.get_status()
+
+
+class PredictionExecutor:
+    """
+    Runs PredictionService.predict_batch in a thread or process pool.
+    
+    At most one batch is in flight at a time: a tick that arrives while the
+    previous batch is still running waits for it instead of overlapping.
+    The pool therefore has a single worker, which also keeps simulation lag
+    state in one place.
+    
+    With the process executor the worker owns its own pipeline, so model
+    reloads, warm-up and registry status go through the executor rather
+    than the web process's services. The worker's metrics come back with
+    each batch and are merged into the web process's registry.
+    """
+    
+    def __init__(
+        self,
+        prediction_service: PredictionService,
+        kind: str = PREDICTION_EXECUTOR,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown prediction executor: {kind}")
+        
+        self.prediction_service = prediction_service
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self._lock = asyncio.Lock()
+    
+    def start(self) -> None:
+        """Create the underlying pool."""
+        if self._executor is not None:
+            return
+        
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=1, initializer=_init_worker_process)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prediction")
+        
+        logger.info(f"Prediction executor started ({self.kind})")
+    
+    def shutdown(self) -> None:
+        """Shut down the underlying pool without waiting for running batches."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    @property
+    def busy(self) -> bool:
+        """Whether a batch is currently in flight."""
+        return self._lock.locked()
+    
+    async def run_batch(
+        self, observations: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], float]:
+        """
+        Run one prediction batch in the pool.
+        
+        Args:
+            observations: Observed columns to score; None simulates features
+                for every district.
+        
+        Returns:
+            Tuple of (batch prediction message, seconds spent computing the
+            batch inside the executor).
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        
+        async with self._lock:
+            if self.kind == "process":
+                batch, elapsed, metrics = await loop.run_in_executor(
+                    self._executor, _run_worker_batch, observations
+                )
+                REGISTRY.merge(metrics)
+                return batch, elapsed
+            return await loop.run_in_executor(
+                self._executor, _timed_batch, self.prediction_service, observations
+            )
+    
+    async def reload_lag_state(self) -> None:
+        """Reload simulation lag state from its snapshot wherever batches run."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        
+        async with self._lock:
+            if self.kind == "process":
+                await loop.run_in_executor(self._executor, _reload_worker_lag_state)
+            else:
+                await loop.run_in_executor(
+                    self._executor, self.prediction_service.simulation_service.reload_lag_state
+                )
+    
+    async def save_lag_state(self) -> None:
+        """Snapshot simulation lag state now wherever batches run, after any running batch."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        
+        async with self._lock:
+            if self.kind == "process":
+                await loop.run_in_executor(self._executor, _save_worker_lag_state)
+            else:
+                await loop.run_in_executor(
+                    self._executor, self.prediction_service.simulation_service.save_lag_state
+                )
+    
+    async def warm_up(self) -> None:
+        """Warm up the prediction pipeline wherever batches run."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        
+        if self.kind == "process":
+            # Also builds the worker's pipeline, so the first tick does not pay for it
+            await loop.run_in_executor(self._executor, _warm_up_worker)
+        else:
+            await loop.run_in_executor(self._executor, self.prediction_service.warm_up)
+    
+    async def reload_model(
+        self, name: str, path: Optional[Path] = None, version: Optional[str] = None
+    ) -> bool:
+        """
+        Reload a registry model wherever batches run.
+        
+        In process mode the worker reloads first; the web process's copy,
+        which only backs metadata, follows once the worker has swapped.
+        
+        Args:
+            name: Registry name of the model.
+            path: Model file to load (defaults to the model's own path).
+            version: Version label for the new model.
+        
+        Returns:
+            bool: True if the model scoring batches was swapped.
+        
+        Raises:
+            KeyError: If no model is registered under this name.
+        """
+        local = self.prediction_service.model_registry.get(name)
+        if self.kind == "thread":
+            return await asyncio.to_thread(local.reload_model, path, version)
+        
+        self.start()
+        loop = asyncio.get_running_loop()
+        # Queued behind any running batch, so the swap lands between ticks
+        swapped = await loop.run_in_executor(self._executor, _reload_worker_model, name, path, version)
+        if swapped and not await asyncio.to_thread(local.reload_model, path, version):
+            logger.warning(f"Model {name} swapped in the prediction worker but not in the web process")
+        return swapped
+    
+    async def registry_status(self) -> Dict[str, Any]:
+        """Status of the model registry that scores batches."""
+        if self.kind == "thread":
+            return self.prediction_service.model_registry.get_status()
+        
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _worker_registry_status)
@@ -4,30 +4,64 @@ Prediction Service for coordinating model inference and output formatting.
 
 import logging
 from datetime import datetime, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Set, Tuple
 import math
 
 import numpy as np
 
 from config import (
+    BATCH_INFERENCE,
     FEATURE_ORDER,
+    INCLUDE_INPUT_FEATURES,
+    WARMUP_ROWS,
     OUTBREAK_CASE_THRESHOLD,
     OUTBREAK_PROB_THRESHOLD,
-    MODEL_VERSION,
+    SIMULATION_MODE,
 )
 from .model_service import ModelService
+from .disease_table import DISEASES
+from .fallback_predictor import FallbackPredictor
+from .feature_sources import assemble_observations
+from .model_registry import ModelRegistry
 from .simulation_service import SimulationService
+from .metrics import REGISTRY, SIZE_BUCKETS
 
 logger = logging.getLogger(__name__)
 
+VECTORIZATION_SECONDS = REGISTRY.histogram(
+    "vectorization_seconds", "Time spent converting feature dicts to model input"
+)
+BATCH_SIZE = REGISTRY.histogram(
+    "batch_size", "Predictions per batch", buckets=SIZE_BUCKETS
+)
+BATCH_OUTBREAKS = REGISTRY.gauge("batch_outbreaks", "Outbreaks flagged in the latest batch")
+OUTBREAKS_TOTAL = REGISTRY.counter("outbreaks_total", "Outbreaks flagged across all batches")
+
+# Steepness of the outbreak probability sigmoid
+SIGMOID_STEEPNESS = 0.2
+
+# Features shipped as input_features; the one-hot disease block travels as "disease"
+INPUT_FEATURES = [name for name in FEATURE_ORDER if name not in DISEASES.features]
+INPUT_COLUMNS = np.array([FEATURE_ORDER.index(name) for name in INPUT_FEATURES])
+
 
 class PredictionService:
     """Service for running predictions and formatting output."""
     
-    def __init__(self, model_service: ModelService, simulation_service: SimulationService):
+    def __init__(
+        self,
+        model_service: ModelService,
+        simulation_service: SimulationService,
+        model_registry: Optional[ModelRegistry] = None,
+        fallback: Optional[FallbackPredictor] = None,
+    ):
         self.model_service = model_service
         self.simulation_service = simulation_service
+        self.model_registry = model_registry or ModelRegistry(model_service)
+        self.fallback = fallback or FallbackPredictor()
+        self._reported_missing: Set[str] = set()
     
+    @VECTORIZATION_SECONDS.time()
     def features_to_vector(self, features: Dict[str, Any]) -> np.ndarray:
         """
         Convert feature dictionary to ordered numpy array.
@@ -48,6 +82,40 @@ class PredictionService:
         
         return np.array(vector, dtype=np.float32).reshape(1, -1)
     
+    def vector_to_features(self, vector: np.ndarray) -> Dict[str, float]:
+        """
+        Build a feature dictionary view of an ordered feature vector.
+        
+        Args:
+            vector: Feature vector in FEATURE_ORDER.
+        
+        Returns:
+            Dict mapping feature names to values.
+        """
+        return dict(zip(FEATURE_ORDER, vector.tolist()))
+    
+    @VECTORIZATION_SECONDS.time()
+    def features_to_matrix(self, feature_rows: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Convert a list of feature dictionaries to a single ordered feature matrix.
+        
+        Args:
+            feature_rows: One feature dictionary per district.
+        
+        Returns:
+            np.ndarray: Float32 matrix of shape (n_rows, len(FEATURE_ORDER)).
+        """
+        matrix = np.empty((len(feature_rows), len(FEATURE_ORDER)), dtype=np.float32)
+        
+        for row, features in enumerate(feature_rows):
+            try:
+                matrix[row] = [features[feature_name] for feature_name in FEATURE_ORDER]
+            except KeyError:
+                # Slow path logs and zero-fills the missing features
+                matrix[row] = self.features_to_vector(features)[0]
+        
+        return matrix
+    
     def calculate_outbreak_probability(self, predicted_cases: float) -> float:
         """
         Calculate outbreak probability based on predicted cases.
@@ -60,28 +128,28 @@ class PredictionService:
             float: Outbreak probability between 0 and 1.
         """
         # Sigmoid function centered at threshold
-        k = 0.2  # Steepness factor
+        k = SIGMOID_STEEPNESS
         midpoint = OUTBREAK_CASE_THRESHOLD
         
         prob = 1 / (1 + math.exp(-k * (predicted_cases - midpoint)))
         return round(prob, 3)
     
-    def _extract_disease_name(self, features: Dict[str, Any]) -> str:
+    def calculate_outbreak_probabilities(self, predicted_cases: np.ndarray) -> np.ndarray:
         """
-        Extract the disease name from one-hot encoded disease features.
+        Vectorized version of calculate_outbreak_probability.
         
         Args:
-            features: Dictionary of feature values.
+            predicted_cases: Array of predicted case counts.
         
         Returns:
-            str: Name of the disease with value 1, or "Unknown" if none found.
+            np.ndarray: Outbreak probabilities between 0 and 1, rounded to 3 places.
         """
-        for feature_name, value in features.items():
-            if feature_name.startswith("Disease_") and value == 1:
-                # Extract disease name by removing "Disease_" prefix
-                return feature_name.replace("Disease_", "")
-        return "Unknown"
-
+        k = SIGMOID_STEEPNESS
+        midpoint = OUTBREAK_CASE_THRESHOLD
+        
+        probs = 1 / (1 + np.exp(-k * (predicted_cases.astype(np.float64) - midpoint)))
+        return np.round(probs, 3)
+    
     def predict_for_district(self, district: str) -> Dict[str, Any]:
         """
         Generate prediction for a single district.
@@ -95,18 +163,23 @@ class PredictionService:
         # Generate simulated features
         features = self.simulation_service.generate_features(district)
         
-        # Extract disease name for output
-        disease_name = self._extract_disease_name(features)
-        
         # Convert to feature vector
         feature_vector = self.features_to_vector(features)
         
+        # Look up the disease name from its one-hot column
+        disease_name = DISEASES.labels(DISEASES.decode(feature_vector))[0]
+        
         # Run prediction
         if self.model_service.is_loaded:
-            predicted_log = float(self.model_service.predict(feature_vector)[0])
+            predictions, model_versions = self.model_registry.predict(
+                feature_vector, [district], shadow=False
+            )
+            predicted_log = float(predictions[0])
+            model_version = model_versions[0]
         else:
-            # Fallback: simulate prediction when model not available
-            predicted_log = self._simulate_prediction(features)
+            # Fallback: heuristic prediction when model not available
+            predicted_log = float(self.fallback.predict(feature_vector)[0])
+            model_version = self.fallback.version
         
         # Convert log prediction to case count
         predicted_cases = math.exp(predicted_log) - 1
@@ -123,27 +196,81 @@ class PredictionService:
         self.simulation_service.update_lag_state(district, predicted_cases)
         
         # Format output
-        return {
-            "ts": datetime.now(timezone.utc).isoformat(),
-            "district": district,
-            "disease": disease_name,
-            "predicted_log": round(predicted_log, 3),
-            "predicted_cases": round(predicted_cases, 2),
-            "predicted_cases_rounded": round(predicted_cases),
-            "outbreak_prob": outbreak_prob,
-            "outbreak_flag": outbreak_flag,
-            "input_features": features,
-            "model_version": MODEL_VERSION,
-        }
+        return self._format_prediction(
+            ts=datetime.now(timezone.utc).isoformat(),
+            district=district,
+            disease_name=disease_name,
+            predicted_log=predicted_log,
+            predicted_cases=predicted_cases,
+            outbreak_prob=outbreak_prob,
+            outbreak_flag=outbreak_flag,
+            features=self._input_features(features),
+            model_version=model_version,
+        )
     
     def predict_batch(self) -> Dict[str, Any]:
         """
         Generate predictions for all districts.
         
+        With BATCH_INFERENCE enabled, all district feature rows are stacked
+        into one matrix and scored with a single model call.
+        
+        Returns:
+            Dict containing batch prediction message.
+        """
+        districts = self.simulation_service.get_districts()
+        
+        if BATCH_INFERENCE:
+            predictions = self._predict_districts_batched(districts)
+        else:
+            predictions = self._predict_districts_individually(districts)
+        
+        self.simulation_service.checkpoint()
+        return self._batch_message(predictions)
+    
+    def predict_observations(self, observations: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Score a chunk of observed data through the batched prediction path.
+        
+        Args:
+            observations: Observed columns from a FeatureSource, including
+                "district"; see assemble_observations for how gaps are filled.
+        
         Returns:
             Dict containing batch prediction message.
         """
+        matrix, districts, missing = assemble_observations(observations, self.simulation_service)
+        if missing:
+            new_missing = set(missing) - self._reported_missing
+            if new_missing:
+                logger.warning(f"Observations lack {sorted(new_missing)}; scoring them as missing")
+                self._reported_missing.update(new_missing)
+        
+        predictions = self._score_matrix(matrix, districts, None) if districts else []
+        self.simulation_service.checkpoint()
+        return self._batch_message(predictions)
+    
+    def warm_up(self, n_rows: int = WARMUP_ROWS) -> None:
+        """
+        Score a synthetic batch so the first real tick does not pay one-off costs.
+        
+        Lag state is read but never updated, so warm-up does not change
+        subsequent predictions beyond advancing the random generator.
+        
+        Args:
+            n_rows: Number of synthetic rows to score.
+        """
         districts = self.simulation_service.get_districts()
+        if not districts or n_rows <= 0:
+            return
+        
+        rows = (districts * (n_rows // len(districts) + 1))[:n_rows]
+        matrix = self.simulation_service.generate_feature_matrix(rows)
+        self._predict_matrix(matrix, rows)
+        self.features_to_matrix([self.vector_to_features(matrix[0])])
+    
+    def _predict_districts_individually(self, districts: List[str]) -> List[Dict[str, Any]]:
+        """Run predict_for_district for each district, skipping failures."""
         predictions = []
         
         for district in districts:
@@ -154,53 +281,252 @@ class PredictionService:
                 logger.error(f"Error predicting for {district}: {e}")
                 continue
         
+        return predictions
+    
+    def _predict_districts_batched(self, districts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Predict all districts with one feature matrix and one model call.
+        
+        Failures are isolated per district: a district whose features cannot be
+        generated, scored or formatted is logged and skipped.
+        
+        Args:
+            districts: Names of the districts to predict.
+        
+        Returns:
+            List of prediction outputs, one per successfully predicted district.
+        """
+        matrix, batch_districts, feature_rows = self._generate_batch_features(districts)
+        
+        if not batch_districts:
+            return []
+        
+        return self._score_matrix(matrix, batch_districts, feature_rows)
+    
+    def _score_matrix(
+        self,
+        matrix: np.ndarray,
+        batch_districts: List[str],
+        feature_rows: Optional[List[Dict[str, Any]]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Score a feature matrix, update lag state and format one output per row.
+        
+        Args:
+            matrix: Feature matrix in FEATURE_ORDER.
+            batch_districts: District backing each row.
+            feature_rows: Feature dicts backing each row, or None to build
+                them from the matrix when the payload carries input features.
+        
+        Returns:
+            List of prediction outputs, one per successfully predicted row.
+        """
+        # Run prediction on the whole matrix
+        predicted_logs, model_versions = self._predict_matrix(matrix, batch_districts)
+        disease_names = DISEASES.labels(DISEASES.decode(matrix))
+        
+        # Convert log predictions to case counts and outbreak metrics
+        predicted_cases = np.maximum(np.expm1(predicted_logs), 0)
+        outbreak_probs = self.calculate_outbreak_probabilities(predicted_cases)
+        outbreak_flags = (
+            (outbreak_probs > OUTBREAK_PROB_THRESHOLD) |
+            (predicted_cases > OUTBREAK_CASE_THRESHOLD)
+        )
+        
+        # Update lag state for next iteration, in one step for every scored district
+        scored = np.isfinite(predicted_logs)
+        self._update_lag_states(batch_districts, predicted_cases, scored)
+        
+        # Build the feature dict views only when the payload carries them
+        input_values = None
+        if INCLUDE_INPUT_FEATURES and feature_rows is None:
+            input_values = _json_safe_rows(matrix[:, INPUT_COLUMNS])
+        
+        ts = datetime.now(timezone.utc).isoformat()
+        predictions = []
+        
+        for row, district in enumerate(batch_districts):
+            try:
+                if not scored[row]:
+                    raise ValueError("model returned no prediction")
+                
+                cases = float(predicted_cases[row])
+                
+                features = None
+                if INCLUDE_INPUT_FEATURES:
+                    features = (
+                        self._input_features(feature_rows[row]) if input_values is None
+                        else dict(zip(INPUT_FEATURES, input_values[row]))
+                    )
+                
+                predictions.append(self._format_prediction(
+                    ts=ts,
+                    district=district,
+                    disease_name=disease_names[row],
+                    predicted_log=float(predicted_logs[row]),
+                    predicted_cases=cases,
+                    outbreak_prob=float(outbreak_probs[row]),
+                    outbreak_flag=bool(outbreak_flags[row]),
+                    features=features,
+                    model_version=model_versions[row],
+                ))
+            except Exception as e:
+                logger.error(f"Error predicting for {district}: {e}")
+                continue
+        
+        return predictions
+    
+    def _update_lag_states(
+        self, districts: List[str], predicted_cases: np.ndarray, scored: np.ndarray
+    ) -> None:
+        """
+        Shift lag state once per scored district.
+        
+        Observed data may hold several rows for one district; the last
+        scored row for a district wins.
+        """
+        rows = np.flatnonzero(scored).tolist()
+        latest = {districts[row]: row for row in rows}
+        if len(latest) != len(rows):
+            rows = list(latest.values())
+        
+        self.simulation_service.update_lag_states(list(latest), predicted_cases[rows])
+    
+    def _batch_message(self, predictions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Record batch metrics and wrap predictions in a batch message."""
+        outbreak_count = sum(1 for prediction in predictions if prediction["outbreak_flag"])
+        BATCH_SIZE.observe(len(predictions))
+        BATCH_OUTBREAKS.set(outbreak_count)
+        OUTBREAKS_TOTAL.inc(outbreak_count)
+        
         return {
             "type": "batch_prediction",
             "items": predictions,
         }
     
-    def _simulate_prediction(self, features: Dict[str, Any]) -> float:
+    def _generate_batch_features(
+        self, districts: List[str]
+    ) -> Tuple[np.ndarray, List[str], Optional[List[Dict[str, Any]]]]:
         """
-        Simulate a prediction when model is not available.
-        Uses a simple heuristic based on input features.
+        Generate the feature matrix for a batch of districts.
+        
+        In "numpy" simulation mode the matrix is produced directly by the
+        columnar generator and no feature dicts are built. In "dict" mode,
+        or if the columnar generator fails, features are generated per
+        district and districts that fail are skipped.
         
         Args:
-            features: Dictionary of feature values.
+            districts: Names of the districts to generate features for.
         
         Returns:
-            float: Simulated log prediction.
+            Tuple of (feature matrix, districts backing each row, feature
+            dicts backing each row or None in columnar mode).
         """
-        # Base prediction from lag features
-        lag1 = features.get("No. of Cases_lag_1", 10)
-        lag2 = features.get("No. of Cases_lag_2", 10)
+        if SIMULATION_MODE == "numpy" and districts:
+            try:
+                matrix = self.simulation_service.generate_feature_matrix(districts)
+                return matrix, list(districts), None
+            except Exception as e:
+                logger.error(f"Columnar feature generation failed, falling back to dicts: {e}")
+        
+        batch_districts = []
+        feature_rows = []
+        for district in districts:
+            try:
+                feature_rows.append(self.simulation_service.generate_features(district))
+                batch_districts.append(district)
+            except Exception as e:
+                logger.error(f"Error generating features for {district}: {e}")
         
-        # Weather impact
-        humidity = features.get("prev_avg_humidity", 60)
-        temp = features.get("prev_avg_temp", 30)
+        return self.features_to_matrix(feature_rows), batch_districts, feature_rows
+    
+    def _predict_matrix(
+        self, matrix: np.ndarray, districts: List[str]
+    ) -> Tuple[np.ndarray, List[str]]:
+        """
+        Score a feature matrix, isolating failures to individual rows.
         
-        # Sanitation impact (lower sanitation = higher cases)
-        sanitation = features.get(
-            "Population living in households that use an improved sanitation facility (%)", 
-            70
-        )
+        Rows are scored by the model routed to their district, and shadow
+        models run on the same matrix. If the batched call fails, rows are
+        retried one at a time and any row that still fails is returned as NaN.
         
-        # E.coli impact
-        ecoli = features.get("E_coli", 100)
+        Args:
+            matrix: Feature matrix of shape (n_rows, len(FEATURE_ORDER)).
+            districts: District backing each row.
         
-        # Simple heuristic formula
-        base_cases = (lag1 + lag2) / 2
-        weather_factor = 1 + (humidity - 50) / 100 + (temp - 25) / 50
-        sanitation_factor = 1 + (100 - sanitation) / 100
-        ecoli_factor = 1 + ecoli / 1000
+        Returns:
+            Tuple of (log predictions with NaN where a row could not be
+            scored, version of the model that scored each row).
+        """
+        if not self.model_service.is_loaded:
+            # Fallback: heuristic prediction when model not available
+            return self.fallback.predict(matrix), [self.fallback.version] * len(matrix)
         
-        predicted_cases = base_cases * weather_factor * sanitation_factor * ecoli_factor
-        predicted_cases = max(1, predicted_cases)  # Ensure positive
+        try:
+            return self.model_registry.predict(matrix, districts)
+        except Exception as e:
+            logger.error(f"Batch prediction failed, retrying per district: {e}")
         
-        # Convert to log
-        predicted_log = math.log(predicted_cases + 1)
+        predicted_logs = np.full(len(matrix), np.nan)
+        model_versions = [self.model_service.model_version] * len(matrix)
+        for row in range(len(matrix)):
+            try:
+                predictions, versions = self.model_registry.predict(
+                    matrix[row:row + 1], districts[row:row + 1], shadow=False
+                )
+            except Exception:
+                continue
+            predicted_logs[row] = predictions[0]
+            model_versions[row] = versions[0]
         
-        # Add some noise
-        import random
-        predicted_log += random.uniform(-0.3, 0.3)
+        return predicted_logs, model_versions
+    
+    def _input_features(self, features: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop the one-hot disease keys from a feature dict for the payload."""
+        return {name: features[name] for name in INPUT_FEATURES if name in features}
+    
+    def _format_prediction(
+        self,
+        ts: str,
+        district: str,
+        disease_name: str,
+        predicted_log: float,
+        predicted_cases: float,
+        outbreak_prob: float,
+        outbreak_flag: bool,
+        features: Optional[Dict[str, Any]],
+        model_version: str,
+    ) -> Dict[str, Any]:
+        """Build the output message for a single district prediction."""
+        prediction = {
+            "ts": ts,
+            "district": district,
+            "disease": disease_name,
+            "predicted_log": round(predicted_log, 3),
+            "predicted_cases": round(predicted_cases, 2),
+            "predicted_cases_rounded": round(predicted_cases),
+            "outbreak_prob": outbreak_prob,
+            "outbreak_flag": outbreak_flag,
+            "input_features": features,
+            "model_version": model_version,
+        }
+        if features is None:
+            del prediction["input_features"]
         
-        return predicted_log
+        return prediction
+
+
+def _json_safe_rows(values: np.ndarray) -> List[List[Any]]:
+    """
+    Convert a float matrix to nested lists with None for NaN and infinity.
+    
+    Unobserved columns stay NaN, which plain json.dumps would write as a bare
+    NaN token that JSON.parse rejects.
+    """
+    finite = np.isfinite(values)
+    if finite.all():
+        return values.tolist()
+    
+    rows = values.astype(object)
+    rows[~finite] = None
+    return rows.tolist()
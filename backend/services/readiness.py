@@ -0,0 +1,75 @@
+"""
+Readiness Tracker for staged service startup.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessTracker:
+    """
+    Records startup phase timings and readiness checks.
+    
+    The service is ready once every named check has been marked ready.
+    """
+    
+    def __init__(self, checks: Iterable[str]):
+        self._checks: Dict[str, bool] = {name: False for name in checks}
+        self._ready_after: Dict[str, float] = {}
+        self._phases: Dict[str, Dict[str, Any]] = {}
+        self._started = time.monotonic()
+    
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time a startup phase.
+        
+        Args:
+            name: Name of the phase.
+        """
+        start = time.monotonic()
+        self._phases[name] = {"status": "running", "seconds": None}
+        try:
+            yield
+        except BaseException:
+            self._phases[name]["status"] = "failed"
+            raise
+        else:
+            self._phases[name]["status"] = "done"
+        finally:
+            self._phases[name]["seconds"] = round(time.monotonic() - start, 4)
+            logger.info(f"Startup phase '{name}' {self._phases[name]['status']} "
+                        f"in {self._phases[name]['seconds']}s")
+    
+    def mark(self, check: str, ready: bool = True) -> None:
+        """
+        Set the state of a readiness check.
+        
+        Args:
+            check: Name of the check.
+            ready: Whether the check passes.
+        """
+        if self._checks.get(check) != ready:
+            self._checks[check] = ready
+            if ready and check not in self._ready_after:
+                self._ready_after[check] = round(time.monotonic() - self._started, 4)
+            logger.info(f"Readiness check '{check}': {'ready' if ready else 'not ready'}")
+    
+    @property
+    def ready(self) -> bool:
+        """Whether every readiness check passes."""
+        return all(self._checks.values())
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Get readiness checks and startup phase timings."""
+        return {
+            "ready": self.ready,
+            "checks": dict(self._checks),
+            "phases": {name: dict(phase) for name, phase in self._phases.items()},
+            "ready_after_seconds": dict(self._ready_after),
+            "uptime_seconds": round(time.monotonic() - self._started, 3),
+        }
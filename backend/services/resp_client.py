@@ -0,0 +1,175 @@
+"""
+Minimal asyncio client for the Redis serialization protocol (RESP2).
+
+Covers the handful of commands the prediction bus and leader election use, so
+any RESP-compatible server (Redis, Valkey, KeyDB or a local stand-in) works
+without an extra dependency.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from config import REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+Argument = Union[str, bytes, int, float]
+
+
+class RespError(Exception):
+    """Error reply from the server."""
+
+
+class RespClient:
+    """
+    One RESP connection with sequential request/reply calls.
+    
+    Commands are serialized by a lock, so a client can be shared by tasks on
+    one event loop. A subscribed connection can only be used for messages,
+    so subscribe() opens its own.
+    """
+    
+    def __init__(self, url: str = REDIS_URL):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", "unix"):
+            raise ValueError(f"Unsupported Redis URL: {url}")
+        
+        self.url = url
+        self._host = parsed.hostname or "localhost"
+        self._port = parsed.port or 6379
+        self._unix_path = parsed.path if parsed.scheme == "unix" else None
+        self._password = parsed.password
+        self._db = int(parsed.path.lstrip("/") or 0) if parsed.scheme == "redis" else 0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+    
+    async def execute(self, *args: Argument) -> Any:
+        """
+        Send one command and return its reply.
+        
+        If the call is cancelled or fails other than with an error reply, the
+        reply may still be unread, so the connection is dropped rather than
+        handing that reply to the next command.
+        
+        Raises:
+            RespError: If the server replies with an error.
+            ConnectionError: If the connection is lost.
+        """
+        async with self._lock:
+            if self._writer is None:
+                self._reader, self._writer = await self._open()
+            try:
+                self._writer.write(_encode_command(args))
+                await self._writer.drain()
+                return await _read_reply(self._reader)
+            except RespError:
+                raise
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                await self._close_connection()
+                raise ConnectionError(f"Lost connection to {self.url}: {e}") from e
+            except BaseException:
+                # Close without waiting: the caller may be cancelled already
+                self._writer.close()
+                self._reader = self._writer = None
+                raise
+    
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        """
+        Subscribe to a channel on a dedicated connection and yield message payloads.
+        
+        Raises:
+            ConnectionError: If the connection is lost.
+        """
+        reader, writer = await self._open()
+        try:
+            writer.write(_encode_command(("SUBSCRIBE", channel)))
+            await writer.drain()
+            while True:
+                try:
+                    reply = await _read_reply(reader)
+                except asyncio.IncompleteReadError as e:
+                    raise ConnectionError(f"Lost subscription to {self.url}") from e
+                if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                    yield reply[2]
+        finally:
+            writer.close()
+    
+    async def close(self) -> None:
+        """Close the command connection."""
+        async with self._lock:
+            await self._close_connection()
+    
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Open and authenticate a new connection."""
+        if self._unix_path is not None:
+            reader, writer = await asyncio.open_unix_connection(self._unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(self._host, self._port)
+        
+        setup = []
+        if self._password:
+            setup.append(("AUTH", self._password))
+        if self._db:
+            setup.append(("SELECT", self._db))
+        try:
+            for command in setup:
+                writer.write(_encode_command(command))
+                await writer.drain()
+                await _read_reply(reader)
+        except BaseException:
+            # Do not leak a connection that failed to authenticate
+            writer.close()
+            raise
+        return reader, writer
+    
+    async def _close_connection(self) -> None:
+        """Drop the command connection. Caller holds the lock."""
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self._reader = self._writer = None
+
+
+def _encode_command(args: Tuple[Argument, ...]) -> bytes:
+    """Encode a command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, str):
+            data = arg.encode()
+        else:
+            data = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> Any:
+    """Read one RESP reply."""
+    line = await reader.readuntil(b"\r\n")
+    kind, body = line[:1], line[1:-2]
+    
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        raise RespError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(body)
+        if count < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(count)]
+    raise RespError(f"Unexpected reply type: {line!r}")
@@ -0,0 +1,124 @@
+"""
+Serializers for encoding WebSocket frames.
+
+Each serializer turns a message dict into a frame that is encoded once per
+tick and shared by every client that negotiated the same encoding. Text
+serializers return ``str`` (sent as text frames), binary serializers return
+``bytes`` (sent as binary frames).
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Union
+
+from config import WS_DEFAULT_ENCODING
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+Frame = Union[str, bytes]
+
+
+class Serializer(ABC):
+    """Base class for frame serializers."""
+    
+    name: str = ""
+    binary: bool = False
+    
+    @abstractmethod
+    def encode(self, message: Dict[str, Any]) -> Frame:
+        """
+        Encode a message into a frame.
+        
+        Args:
+            message: The message data to encode.
+        
+        Returns:
+            The encoded frame.
+        """
+    
+    @abstractmethod
+    def decode(self, frame: Frame) -> Dict[str, Any]:
+        """Decode a frame produced by encode."""
+
+
+class JsonSerializer(Serializer):
+    """JSON text frames, using orjson when it is installed."""
+    
+    name = "json"
+    binary = False
+    
+    def encode(self, message: Dict[str, Any]) -> Frame:
+        if orjson is not None:
+            return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        return json.dumps(message)
+    
+    def decode(self, frame: Frame) -> Dict[str, Any]:
+        if orjson is not None:
+            return orjson.loads(frame)
+        return json.loads(frame)
+
+
+class MsgpackSerializer(Serializer):
+    """MessagePack binary frames."""
+    
+    name = "msgpack"
+    binary = True
+    
+    def encode(self, message: Dict[str, Any]) -> Frame:
+        return msgpack.packb(message, use_bin_type=True)
+    
+    def decode(self, frame: Frame) -> Dict[str, Any]:
+        return msgpack.unpackb(frame, raw=False)
+
+
+_SERIALIZERS: Dict[str, Serializer] = {}
+
+
+def register_serializer(serializer: Serializer) -> None:
+    """
+    Register a serializer so clients can negotiate it by name.
+    
+    Args:
+        serializer: The serializer instance to register.
+    """
+    _SERIALIZERS[serializer.name] = serializer
+
+
+def available_encodings() -> List[str]:
+    """Get the names of all registered encodings."""
+    return list(_SERIALIZERS)
+
+
+def get_serializer(name: str = WS_DEFAULT_ENCODING) -> Serializer:
+    """
+    Look up a serializer by encoding name.
+    
+    Unknown or unavailable encodings fall back to WS_DEFAULT_ENCODING.
+    
+    Args:
+        name: The negotiated encoding name.
+    
+    Returns:
+        Serializer: The matching serializer.
+    """
+    serializer = _SERIALIZERS.get(name)
+    if serializer is None:
+        logger.warning(f"Unsupported encoding '{name}', using {WS_DEFAULT_ENCODING}")
+        serializer = _SERIALIZERS[WS_DEFAULT_ENCODING]
+    return serializer
+
+
+register_serializer(JsonSerializer())
+if msgpack is not None:
+    register_serializer(MsgpackSerializer())
@@ -2,36 +2,114 @@
 Simulation Service for generating synthetic real-time medical/weather/WASH data.
 """
 
+import logging
 import random
-from typing import Dict, List, Any
-from collections import defaultdict
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Sequence, Set
+
+import numpy as np
 
 from config import (
+    DISTRICT_PROFILES_PATH,
     DISTRICTS,
     FEATURE_ORDER,
+    LAG_SNAPSHOT_INTERVAL,
     SIMULATION_RANGES,
-    DISEASE_FREQUENCIES,
+    SIMULATION_SEED,
+)
+from .disease_table import DISEASES
+from .district_profiles import STATIC_FEATURES, DistrictProfileStore, load_profiles
+from .lag_state import LAG_FIELDS, LagState
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Lag features come from district state rather than random draws
+LAG_FEATURES = LAG_FIELDS[:3]
+
+FEATURE_GENERATION_SECONDS = REGISTRY.histogram(
+    "feature_generation_seconds", "Time spent generating simulated features"
+)
+LAG_SNAPSHOT_SECONDS = REGISTRY.histogram(
+    "lag_snapshot_seconds", "Time spent writing lag state snapshots"
 )
 
+# Weekly weather averages jitter around the previous week's values
+WEEKLY_WEATHER_NOISE = {
+    "weekly_avg_temp": ("prev_avg_temp", 3.0),
+    "weekly_avg_humidity": ("prev_avg_humidity", 5.0),
+    "weekly_avg_precipitation": ("prev_avg_precipitation", 5.0),
+}
+
 
 class SimulationService:
-    """Service for generating realistic simulated outbreak data."""
+    """
+    Service for generating realistic simulated outbreak data.
+    
+    Static district features (demographics, WASH and health indicators) come
+    from a DistrictProfileStore built once at startup; only weather, water
+    quality, lags and the disease are generated per tick.
+    
+    With a state path, lag state is restored from its snapshot at startup and
+    saved after the first tick, then at most every snapshot_interval seconds;
+    save_lag_state saves it right away, e.g. on shutdown or handover, so
+    forecasts continue across restarts instead of starting from random lags.
+    """
     
-    def __init__(self):
+    def __init__(
+        self,
+        districts: Optional[List[str]] = None,
+        seed: Optional[int] = SIMULATION_SEED,
+        profiles: Optional[DistrictProfileStore] = None,
+        state_path: Optional[Path] = None,
+        snapshot_interval: float = LAG_SNAPSHOT_INTERVAL,
+    ):
+        self._districts = list(districts) if districts is not None else DISTRICTS.copy()
+        self._rng = np.random.default_rng(seed)
+        self._build_column_tables()
+        
+        if profiles is None:
+            profiles = load_profiles(DISTRICT_PROFILES_PATH, self._districts, self._rng)
+        else:
+            profiles.add_generated(self._districts, self._rng)
+        self.profiles = profiles
+        
         # Maintain lag state for each district
-        self._district_states: Dict[str, Dict[str, float]] = defaultdict(
-            lambda: {
-                "No. of Cases_lag_1": random.uniform(0, 50),
-                "No. of Cases_lag_2": random.uniform(0, 50),
-                "cases_roll2": random.uniform(0, 50),
-                "last_predicted_cases": random.uniform(0, 30),
-            }
+        self._state_path = Path(state_path) if state_path is not None else None
+        self._ticks = 0
+        self.snapshot_interval = snapshot_interval
+        self._last_snapshot: Optional[float] = None
+        self.lag_state = self._restore_lag_state()
+    
+    def _build_column_tables(self) -> None:
+        """Precompute FEATURE_ORDER column indices and bounds for the numpy generator."""
+        column = {name: idx for idx, name in enumerate(FEATURE_ORDER)}
+        derived = set(LAG_FEATURES) | set(WEEKLY_WEATHER_NOISE) | set(STATIC_FEATURES)
+        
+        # Independent uniform columns plus one noise column per weekly average,
+        # all drawn with a single generator call
+        drawn = [name for name in SIMULATION_RANGES if name not in derived]
+        self._drawn_columns = np.array([column[name] for name in drawn])
+        self._low = np.array(
+            [SIMULATION_RANGES[name][0] for name in drawn]
+            + [-noise for _, noise in WEEKLY_WEATHER_NOISE.values()]
+        )
+        self._high = np.array(
+            [SIMULATION_RANGES[name][1] for name in drawn]
+            + [noise for _, noise in WEEKLY_WEATHER_NOISE.values()]
+        )
+        
+        self._weekly_columns = np.array([column[name] for name in WEEKLY_WEATHER_NOISE])
+        self._prev_columns = np.array(
+            [column[prev] for prev, _ in WEEKLY_WEATHER_NOISE.values()]
         )
+        self._weekly_min = np.array([SIMULATION_RANGES[name][0] for name in WEEKLY_WEATHER_NOISE])
+        self._weekly_max = np.array([SIMULATION_RANGES[name][1] for name in WEEKLY_WEATHER_NOISE])
         
-        # Initialize states for all districts
-        for district in DISTRICTS:
-            _ = self._district_states[district]
+        self._lag_columns = np.array([column[name] for name in LAG_FEATURES])
     
+    @FEATURE_GENERATION_SECONDS.time()
     def generate_features(self, district: str) -> Dict[str, Any]:
         """
         Generate simulated feature values for a district.
@@ -43,7 +121,7 @@ class SimulationService:
             Dict containing all feature values in the expected format.
         """
         features = {}
-        state = self._district_states[district]
+        state = self.lag_state.get(district)
         
         # Generate weather features with some temporal correlation
         features["prev_avg_temp"] = self._random_in_range("prev_avg_temp")
@@ -65,59 +143,57 @@ class SimulationService:
         features["No. of Cases_lag_2"] = state["No. of Cases_lag_2"]
         features["cases_roll2"] = state["cases_roll2"]
         
-        # Demographic features (relatively stable per district)
-        features["Number of households"] = self._random_in_range("Number of households")
-        features["Population"] = self._random_in_range("Population")
-        features["Area"] = self._random_in_range("Area")
-        features["Population density"] = features["Population"] / features["Area"]
-        features["Population of children b/w (0-4) age"] = self._random_in_range(
-            "Population of children b/w (0-4) age"
-        )
-        features["Population of children b/w (5-9) age"] = self._random_in_range(
-            "Population of children b/w (5-9) age"
-        )
-        features["literacy rate"] = self._random_in_range("literacy rate")
+        # Demographic, WASH and health features (static per district)
+        features.update(self.profiles.get(district))
         
         # Water quality indicators
         features["E_coli"] = self._random_in_range("E_coli")
         features["Total_Coliform"] = self._random_in_range("Total_Coliform")
         
-        # WASH indicators
-        features["Population living in households with an improved drinking-water source (%)"] = (
-            self._random_in_range("Population living in households with an improved drinking-water source (%)")
-        )
-        features["Population living in households that use an improved sanitation facility (%)"] = (
-            self._random_in_range("Population living in households that use an improved sanitation facility (%)")
-        )
-        features["Households using clean fuel for cooking (%)"] = self._random_in_range(
-            "Households using clean fuel for cooking (%)"
-        )
-        features["Households with access to electricity (%)"] = self._random_in_range(
-            "Households with access to electricity (%)"
-        )
-        features["Households using iodized salt (%)"] = self._random_in_range(
-            "Households using iodized salt (%)"
-        )
+        # Disease one-hot encoding
+        features.update(DISEASES.one_hot(self._select_disease()))
         
-        # Health indicators
-        features["Prevalence of diarrhoea in the last 2 weeks (children under 5) (%)"] = (
-            self._random_in_range("Prevalence of diarrhoea in the last 2 weeks (children under 5) (%)")
-        )
-        features["Children with diarrhoea who received ORS (%)"] = self._random_in_range(
-            "Children with diarrhoea who received ORS (%)"
-        )
-        features["Children with diarrhoea who received zinc (%)"] = self._random_in_range(
-            "Children with diarrhoea who received zinc (%)"
-        )
-        features["Children with diarrhoea taken to a health facility (%)"] = self._random_in_range(
-            "Children with diarrhoea taken to a health facility (%)"
+        return features
+    
+    @FEATURE_GENERATION_SECONDS.time()
+    def generate_feature_matrix(self, districts: List[str]) -> np.ndarray:
+        """
+        Generate simulated features for many districts at once.
+        
+        Every per-tick SIMULATION_RANGES column is drawn for all districts in
+        a single call to the seeded numpy generator, and static columns are
+        copied from the profile store, directly in FEATURE_ORDER columns.
+        
+        Args:
+            districts: Names of the districts, one matrix row each.
+        
+        Returns:
+            np.ndarray: Float32 matrix of shape (len(districts), len(FEATURE_ORDER)).
+        """
+        n_rows = len(districts)
+        matrix = np.zeros((n_rows, len(FEATURE_ORDER)), dtype=np.float32)
+        n_drawn = len(self._drawn_columns)
+        
+        draws = self._rng.uniform(self._low, self._high, size=(n_rows, len(self._low)))
+        matrix[:, self._drawn_columns] = draws[:, :n_drawn]
+        
+        # Weekly averages correlate with previous values
+        matrix[:, self._weekly_columns] = np.clip(
+            matrix[:, self._prev_columns] + draws[:, n_drawn:],
+            self._weekly_min,
+            self._weekly_max,
         )
         
-        # Disease one-hot encoding
-        disease_features = self._select_disease()
-        features.update(disease_features)
+        # Lag features from state (evolve based on predictions)
+        matrix[:, self._lag_columns] = self.lag_state.lags(self.lag_state.ids(districts))
         
-        return features
+        # Static district features
+        matrix[:, self.profiles.feature_columns] = self.profiles.values[self.profiles.rows(districts)]
+        
+        # Disease one-hot encoding, sampled for every row at once
+        DISEASES.encode(matrix, DISEASES.sample(self._rng.random(n_rows)))
+        
+        return matrix
     
     def update_lag_state(self, district: str, predicted_cases: float) -> None:
         """
@@ -127,19 +203,124 @@ class SimulationService:
             district: Name of the district.
             predicted_cases: The predicted case count.
         """
-        state = self._district_states[district]
+        self.update_lag_states([district], np.array([predicted_cases]))
+    
+    def update_lag_states(self, districts: Sequence[str], predicted_cases: np.ndarray) -> None:
+        """
+        Update the lag state for a batch of districts in one vectorized step.
+        
+        Args:
+            districts: Names of the districts, each at most once.
+            predicted_cases: The predicted case count for each district.
+        """
+        self.lag_state.update(self.lag_state.ids(districts), predicted_cases)
+    
+    def fill_unobserved_features(
+        self, matrix: np.ndarray, districts: Sequence[str], observed: Set[str]
+    ) -> List[str]:
+        """
+        Fill static district features and lags that observed data did not provide.
+        
+        Population density is derived from observed Population and Area when
+        both are present. Other static columns come from the profile store,
+        which simulates profiles for districts it has not seen; lag columns
+        come from the lag state.
+        
+        Args:
+            matrix: Feature matrix in FEATURE_ORDER, modified in place.
+            districts: District backing each row.
+            observed: Names of the columns that were observed.
+        
+        Returns:
+            List of feature names that are neither observed nor filled.
+        """
+        column = {name: idx for idx, name in enumerate(FEATURE_ORDER)}
+        observed = set(observed)
+        
+        if "Population density" not in observed and {"Population", "Area"} <= observed:
+            matrix[:, column["Population density"]] = (
+                matrix[:, column["Population"]] / matrix[:, column["Area"]]
+            )
+            observed.add("Population density")
+        
+        static = [idx for idx, name in enumerate(STATIC_FEATURES) if name not in observed]
+        if static:
+            unknown = [district for district in dict.fromkeys(districts) if district not in self.profiles]
+            if unknown:
+                logger.warning(f"Simulating profiles for {len(unknown)} districts without one")
+                self.profiles.add_generated(unknown, self._rng)
+            profile_rows = self.profiles.values[self.profiles.rows(districts)]
+            matrix[:, self.profiles.feature_columns[static]] = profile_rows[:, static]
+        
+        lags = [idx for idx, name in enumerate(LAG_FEATURES) if name not in observed]
+        if lags:
+            lag_values = self.lag_state.lags(self.lag_state.ids(districts))
+            matrix[:, self._lag_columns[lags]] = lag_values[:, lags]
+        
+        filled = set(STATIC_FEATURES) | set(LAG_FEATURES)
+        return [name for name in FEATURE_ORDER if name not in observed and name not in filled]
+    
+    def checkpoint(self) -> None:
+        """
+        Mark the end of a tick and snapshot lag state when one is due.
+        
+        The first tick is always snapshotted. Snapshot failures are logged;
+        the in-memory state is unaffected.
+        """
+        self._ticks += 1
+        if (
+            self._last_snapshot is not None
+            and time.monotonic() - self._last_snapshot < self.snapshot_interval
+        ):
+            return
+        
+        self.save_lag_state()
+    
+    def save_lag_state(self) -> None:
+        """
+        Snapshot lag state now, regardless of snapshot_interval.
         
-        # Shift lag values
-        state["No. of Cases_lag_2"] = state["No. of Cases_lag_1"]
-        state["No. of Cases_lag_1"] = predicted_cases
+        Snapshot failures are logged; the in-memory state is unaffected.
+        """
+        if self._state_path is None:
+            return
+        
+        self._last_snapshot = time.monotonic()
+        try:
+            with LAG_SNAPSHOT_SECONDS.time():
+                self.lag_state.save(self._state_path, self._ticks)
+        except OSError as e:
+            logger.error(f"Failed to snapshot lag state to {self._state_path}: {e}")
+    
+    def reload_lag_state(self) -> None:
+        """
+        Replace lag state with the latest snapshot, if there is one.
         
-        # Update rolling average
-        state["cases_roll2"] = (state["No. of Cases_lag_1"] + state["No. of Cases_lag_2"]) / 2
-        state["last_predicted_cases"] = predicted_cases
+        Used when this worker takes over producing batches from another one
+        that has been writing the snapshot.
+        """
+        if self._state_path is not None and self._state_path.exists():
+            self.lag_state = self._restore_lag_state()
     
     def get_districts(self) -> List[str]:
         """Get list of all districts."""
-        return DISTRICTS.copy()
+        return self._districts.copy()
+    
+    def _restore_lag_state(self) -> LagState:
+        """Load lag state from the snapshot if there is a usable one, else start fresh."""
+        if self._state_path is not None and self._state_path.exists():
+            try:
+                state, self._ticks, saved_at = LagState.load(self._state_path, self._rng)
+                state.ids(self._districts)
+                logger.info(
+                    f"Restored lag state for {len(state)} series from tick {self._ticks} "
+                    f"({time.time() - saved_at:.0f}s old)"
+                )
+                return state
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable lag state snapshot {self._state_path}: {e}")
+        
+        return LagState(self._districts, self._rng)
     
     def _random_in_range(self, feature_name: str) -> float:
         """Generate a random value within the defined range for a feature."""
@@ -149,23 +330,6 @@ class SimulationService:
         min_val, max_val = SIMULATION_RANGES[feature_name]
         return random.uniform(min_val, max_val)
     
-    def _select_disease(self) -> Dict[str, int]:
-        """
-        Select a disease based on natural frequency distribution.
-        Returns one-hot encoded disease features.
-        """
-        diseases = list(DISEASE_FREQUENCIES.keys())
-        probabilities = list(DISEASE_FREQUENCIES.values())
-        
-        # Normalize probabilities
-        total = sum(probabilities)
-        probabilities = [p / total for p in probabilities]
-        
-        # Select one disease
-        selected = random.choices(diseases, weights=probabilities, k=1)[0]
-        
-        # Create one-hot encoding
-        disease_features = {disease: 0 for disease in diseases}
-        disease_features[selected] = 1
-        
-        return disease_features
+    def _select_disease(self) -> int:
+        """Select a disease index based on natural frequency distribution."""
+        return int(DISEASES.sample(random.random()))
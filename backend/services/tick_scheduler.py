@@ -0,0 +1,127 @@
+"""
+Tick Scheduler for running the prediction loop on a fixed cadence.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Any
+
+from config import REFRESH_INTERVAL, TICK_MISSED_POLICY
+from .metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Policies for deadlines that pass while a tick is still running
+MISSED_TICK_POLICIES = ("skip", "catch_up", "coalesce")
+
+
+class TickScheduler:
+    """
+    Runs a coroutine on absolute deadlines of a monotonic clock.
+    
+    Deadlines are start + k * interval, so the period does not drift with
+    the time each tick takes. When a tick overruns one or more deadlines the
+    missed-tick policy decides what happens next:
+    
+    - "skip": drop the missed deadlines and wait for the next one.
+    - "catch_up": run every missed tick back to back.
+    - "coalesce": run a single tick immediately, then resume on schedule.
+    """
+    
+    def __init__(
+        self,
+        interval: float = REFRESH_INTERVAL,
+        policy: str = TICK_MISSED_POLICY,
+        clock: Callable[[], float] = time.monotonic,
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        if policy not in MISSED_TICK_POLICIES:
+            raise ValueError(f"Unknown missed tick policy: {policy}")
+        
+        self.interval = interval
+        self.policy = policy
+        self._clock = clock
+        
+        self.ticks = registry.counter("ticks_total", "Ticks run")
+        self.overruns = registry.counter(
+            "tick_overruns_total", "Ticks that ran past the next deadline"
+        )
+        self.skipped_ticks = registry.counter(
+            "ticks_skipped_total", "Deadlines dropped after an overrun"
+        )
+        self.tick_duration = registry.histogram(
+            "tick_duration_seconds", "Time spent running a tick"
+        )
+        self.tick_lateness = registry.histogram(
+            "tick_lateness_seconds", "Delay between deadline and tick start"
+        )
+    
+    async def run(self, tick: Callable[[], Awaitable[None]]) -> None:
+        """
+        Run tick on schedule until cancelled.
+        
+        Args:
+            tick: Coroutine function invoked once per deadline.
+        """
+        deadline = self._clock()
+        
+        while True:
+            now = self._clock()
+            if now < deadline:
+                await asyncio.sleep(deadline - now)
+            
+            started = self._clock()
+            self.tick_lateness.observe(max(0.0, started - deadline))
+            
+            await tick()
+            
+            finished = self._clock()
+            self.tick_duration.observe(finished - started)
+            self.ticks.inc()
+            
+            deadline = self._next_deadline(deadline, finished)
+    
+    def _next_deadline(self, deadline: float, now: float) -> float:
+        """
+        Compute the deadline for the next tick.
+        
+        Args:
+            deadline: The deadline of the tick that just ran.
+            now: The time the tick finished.
+        
+        Returns:
+            float: The next deadline on the monotonic clock.
+        """
+        next_deadline = deadline + self.interval
+        if now <= next_deadline:
+            return next_deadline
+        
+        # Number of deadlines that already passed while the tick ran
+        missed = int((now - next_deadline) // self.interval) + 1
+        self.overruns.inc()
+        logger.warning(
+            f"Tick overran by {now - next_deadline:.3f}s ({missed} deadline(s) missed, "
+            f"policy: {self.policy})"
+        )
+        
+        if self.policy == "catch_up":
+            return next_deadline
+        if self.policy == "coalesce":
+            self.skipped_ticks.inc(missed - 1)
+            return next_deadline + (missed - 1) * self.interval
+        
+        self.skipped_ticks.inc(missed)
+        return next_deadline + missed * self.interval
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler counters and latency histograms."""
+        return {
+            "interval": self.interval,
+            "policy": self.policy,
+            "ticks": int(self.ticks.value),
+            "overruns": int(self.overruns.value),
+            "skipped_ticks": int(self.skipped_ticks.value),
+            "tick_duration_seconds": self.tick_duration.snapshot(),
+            "tick_lateness_seconds": self.tick_lateness.snapshot(),
+        }
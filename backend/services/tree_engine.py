@@ -0,0 +1,265 @@
+"""
+NumPy Tree Engine for evaluating an exported XGBoost tree ensemble.
+
+The booster's trees are flattened once into arrays of split feature,
+threshold, children, default direction and leaf value, and whole batches
+are then evaluated with vectorized NumPy traversal. The compiled arrays can
+be saved to an .npz file so worker processes can run inference without
+importing xgboost at all.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from config import MODEL_ENGINE_CHUNK_ROWS
+
+logger = logging.getLogger(__name__)
+
+# Objectives whose prediction is the raw margin (identity link)
+IDENTITY_OBJECTIVES = {
+    "reg:squarederror",
+    "reg:squaredlogerror",
+    "reg:absoluteerror",
+    "reg:pseudohubererror",
+}
+
+
+class NumpyTreeEnsemble:
+    """Flat-array tree ensemble evaluated with vectorized NumPy traversal."""
+    
+    def __init__(
+        self,
+        split_feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        default_left: np.ndarray,
+        leaf_value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        base_score: float,
+        feature_names: Optional[List[str]] = None,
+        source_digest: Optional[str] = None,
+    ):
+        self.split_feature = split_feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.base_score = base_score
+        self.feature_names = feature_names
+        # Hash of the model file the trees were compiled from, if known
+        self.source_digest = source_digest
+        
+        # Leaves point at themselves; traversal holds them in place explicitly,
+        # since no threshold keeps every input value (e.g. +inf) on the left
+        self.is_leaf = left == np.arange(len(left))
+        
+        # XGBoost allocates sibling nodes in pairs, which lets traversal
+        # compute the right child as left + 1 instead of a second lookup
+        internal = ~self.is_leaf
+        self._consecutive_children = bool(np.all(right[internal] == left[internal] + 1))
+    
+    @property
+    def num_trees(self) -> int:
+        """Number of trees in the ensemble."""
+        return len(self.roots)
+    
+    @classmethod
+    def from_json(cls, model: Union[str, bytes, Dict[str, Any]]) -> "NumpyTreeEnsemble":
+        """
+        Compile an ensemble from an XGBoost JSON model.
+        
+        Args:
+            model: The JSON model (as produced by Booster.save_raw("json")).
+        
+        Returns:
+            NumpyTreeEnsemble: The compiled ensemble.
+        
+        Raises:
+            ValueError: If the model uses features the engine does not support.
+        """
+        if not isinstance(model, dict):
+            model = json.loads(model)
+        
+        learner = model["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"Unsupported objective for numpy engine: {objective}")
+        
+        model_param = learner["learner_model_param"]
+        if int(model_param.get("num_class", 0)) > 1 or int(model_param.get("num_target", 1)) > 1:
+            raise ValueError("Numpy engine supports single-output models only")
+        
+        booster = learner["gradient_booster"]
+        if booster["name"] != "gbtree":
+            raise ValueError(f"Unsupported booster for numpy engine: {booster['name']}")
+        
+        # Newer XGBoost versions store base_score as a bracketed vector
+        base_score = float(str(model_param["base_score"]).strip("[]"))
+        
+        split_feature, threshold, left, right = [], [], [], []
+        default_left, leaf_value, roots = [], [], []
+        max_depth = 0
+        offset = 0
+        
+        for tree in booster["model"]["trees"]:
+            if any(tree["split_type"]):
+                raise ValueError("Numpy engine does not support categorical splits")
+            
+            tree_left = np.asarray(tree["left_children"], dtype=np.int64)
+            tree_right = np.asarray(tree["right_children"], dtype=np.int64)
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            is_leaf = tree_left == -1
+            node_ids = np.arange(len(tree_left)) + offset
+            
+            # Leaves step "left" onto themselves, so every row can take
+            # max_depth steps; traversal forces go_left at leaves
+            left.append(np.where(is_leaf, node_ids, tree_left + offset))
+            right.append(np.where(is_leaf, node_ids, tree_right + offset))
+            split_feature.append(np.where(is_leaf, 0, tree["split_indices"]))
+            threshold.append(np.where(is_leaf, np.float32(np.inf), conditions))
+            leaf_value.append(np.where(is_leaf, conditions, np.float32(0)))
+            default_left.append(np.asarray(tree["default_left"], dtype=bool) | is_leaf)
+            roots.append(offset)
+            
+            max_depth = max(max_depth, _tree_depth(tree_left, tree_right))
+            offset += len(tree_left)
+        
+        feature_names = learner.get("feature_names") or None
+        
+        return cls(
+            split_feature=np.concatenate(split_feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            default_left=np.concatenate(default_left),
+            leaf_value=np.concatenate(leaf_value).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            base_score=base_score,
+            feature_names=feature_names,
+        )
+    
+    @classmethod
+    def from_booster(cls, booster: Any) -> "NumpyTreeEnsemble":
+        """Compile an ensemble from a loaded xgboost.Booster."""
+        return cls.from_json(booster.save_raw("json"))
+    
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Save the compiled arrays to an .npz file.
+        
+        Args:
+            path: Destination file path.
+        """
+        np.savez(
+            path,
+            split_feature=self.split_feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            default_left=self.default_left,
+            leaf_value=self.leaf_value,
+            roots=self.roots,
+            max_depth=np.int64(self.max_depth),
+            base_score=np.float64(self.base_score),
+            feature_names=np.asarray(self.feature_names or [], dtype=str),
+            source_digest=np.asarray(self.source_digest or "", dtype=str),
+        )
+    
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "NumpyTreeEnsemble":
+        """
+        Load compiled arrays saved with save().
+        
+        Args:
+            path: Path to the .npz file.
+        
+        Returns:
+            NumpyTreeEnsemble: The loaded ensemble.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            feature_names = [str(name) for name in data["feature_names"]]
+            # Files saved before digests were recorded have none
+            source_digest = str(data["source_digest"]) if "source_digest" in data.files else ""
+            return cls(
+                split_feature=data["split_feature"],
+                threshold=data["threshold"],
+                left=data["left"],
+                right=data["right"],
+                default_left=data["default_left"],
+                leaf_value=data["leaf_value"],
+                roots=data["roots"],
+                max_depth=int(data["max_depth"]),
+                base_score=float(data["base_score"]),
+                feature_names=feature_names or None,
+                source_digest=source_digest or None,
+            )
+    
+    def predict(self, features: np.ndarray, chunk_rows: int = MODEL_ENGINE_CHUNK_ROWS) -> np.ndarray:
+        """
+        Evaluate the ensemble on a batch of rows.
+        
+        Rows are processed in chunks so the (rows x trees) node index buffer
+        stays small regardless of batch size.
+        
+        Args:
+            features: Float32 array of shape (n_samples, n_features).
+            chunk_rows: Maximum rows traversed at once.
+        
+        Returns:
+            np.ndarray: Float32 predictions of shape (n_samples,).
+        """
+        matrix = np.ascontiguousarray(features, dtype=np.float32)
+        predictions = np.empty(len(matrix), dtype=np.float32)
+        
+        for start in range(0, len(matrix), chunk_rows):
+            chunk = matrix[start:start + chunk_rows]
+            predictions[start:start + len(chunk)] = self._predict_chunk(chunk)
+        
+        return predictions
+    
+    def _predict_chunk(self, chunk: np.ndarray) -> np.ndarray:
+        """Traverse every tree for a chunk of rows and sum the leaf values."""
+        flat = chunk.ravel()
+        row_offsets = (np.arange(len(chunk), dtype=np.int32) * chunk.shape[1])[:, None]
+        nodes = np.broadcast_to(self.roots, (len(chunk), self.num_trees)).copy()
+        
+        for _ in range(self.max_depth):
+            values = np.take(flat, row_offsets + np.take(self.split_feature, nodes))
+            go_left = values < np.take(self.threshold, nodes)
+            missing = np.isnan(values)
+            if missing.any():
+                go_left = np.where(missing, np.take(self.default_left, nodes), go_left)
+            go_left |= np.take(self.is_leaf, nodes)
+            
+            if self._consecutive_children:
+                nodes = np.take(self.left, nodes) + ~go_left
+            else:
+                nodes = np.where(go_left, np.take(self.left, nodes), np.take(self.right, nodes))
+        
+        margins = np.take(self.leaf_value, nodes).sum(axis=1, dtype=np.float64) + self.base_score
+        return margins.astype(np.float32)
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    """Number of splits on the longest root-to-leaf path of one tree."""
+    depth = 0
+    frontier = [0]
+    while True:
+        children = [
+            child for node in frontier
+            for child in (left[node], right[node]) if child != -1
+        ]
+        if not children:
+            return depth
+        depth += 1
+        frontier = children
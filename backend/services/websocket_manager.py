@@ -2,31 +2,310 @@
 WebSocket Manager for handling real-time client connections.
 """
 
-import logging
+import asyncio
 import json
-from typing import List, Dict, Any
+import logging
+from collections import defaultdict, deque
+from typing import Callable, Dict, Any, Iterable, List, Optional, Set, Tuple
 
 from fastapi import WebSocket
 
+from config import (
+    WS_BACKFILL_FRAMES,
+    WS_DEFAULT_ENCODING,
+    WS_SEND_QUEUE_SIZE,
+    WS_SEND_TIMEOUT,
+    WS_SLOW_CLIENT_POLICY,
+)
+from .delta_encoder import DeltaEncoder
+from .metrics import REGISTRY
+from .serializers import Frame, Serializer, available_encodings, get_serializer
+
+# Stream modes a client can request with the "mode" query parameter
+STREAM_MODES = ("full", "delta")
+
+# Topic index key for clients that only filter on outbreaks
+OUTBREAKS_TOPIC = "*"
+
 logger = logging.getLogger(__name__)
 
+SERIALIZATION_SECONDS = REGISTRY.histogram(
+    "serialization_seconds", "Time spent encoding websocket frames"
+)
+CLIENT_SEND_SECONDS = REGISTRY.histogram(
+    "client_send_seconds", "Latency of individual websocket sends"
+)
+CONNECTED_CLIENTS = REGISTRY.gauge("connected_clients", "Connected websocket clients")
+DROPPED_CLIENTS = REGISTRY.counter(
+    "dropped_clients_total", "Clients disconnected for being slow or failing"
+)
+DROPPED_FRAMES = REGISTRY.counter(
+    "dropped_frames_total", "Frames discarded from full client queues"
+)
+BACKFILL_FRAMES = REGISTRY.counter(
+    "backfill_frames_total", "Cached frames sent to clients right after they connect"
+)
+
+
+class Subscription:
+    """
+    Topics a client is subscribed to.
+    
+    A client receives a batch item if it matches any subscribed district or
+    disease topic (or every item when no topics are given), restricted to
+    flagged outbreaks when outbreaks_only is set. Delta-mode clients also
+    receive the item whose flag was just cleared, so they can drop it.
+    """
+    
+    def __init__(
+        self,
+        districts: Iterable[str] = (),
+        diseases: Iterable[str] = (),
+        outbreaks_only: bool = False,
+    ):
+        self.districts = frozenset(districts)
+        self.diseases = frozenset(diseases)
+        self.outbreaks_only = outbreaks_only
+    
+    @classmethod
+    def from_message(cls, message: Dict[str, Any]) -> "Subscription":
+        """
+        Build a subscription from a client's subscribe message.
+        
+        Args:
+            message: The decoded subscribe message.
+        
+        Returns:
+            The requested subscription.
+        
+        Raises:
+            ValueError: If districts or diseases is not a list of strings, or
+                outbreaks_only is not a boolean.
+        """
+        topics = {}
+        for field in ("districts", "diseases"):
+            values = message.get(field)
+            if values is None:
+                values = []
+            if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                raise ValueError(f'"{field}" must be a list of strings')
+            topics[field] = values
+        
+        outbreaks_only = message.get("outbreaks_only", False)
+        if not isinstance(outbreaks_only, bool):
+            raise ValueError('"outbreaks_only" must be true or false')
+        
+        return cls(outbreaks_only=outbreaks_only, **topics)
+    
+    @property
+    def unfiltered(self) -> bool:
+        """Whether the subscription receives every item."""
+        return not self.districts and not self.diseases and not self.outbreaks_only
+    
+    def topics(self) -> List[str]:
+        """Get the topic index keys for this subscription."""
+        if not self.districts and not self.diseases:
+            return [OUTBREAKS_TOPIC] if self.outbreaks_only else []
+        return (
+            [f"district:{district}" for district in self.districts]
+            + [f"disease:{disease}" for disease in self.diseases]
+        )
+    
+    def matches(self, item: Dict[str, Any], cleared: bool = False) -> bool:
+        """
+        Whether a prediction item belongs to this subscription.
+        
+        Args:
+            item: The prediction item.
+            cleared: Whether the item's outbreak flag was cleared this tick;
+                such items pass the outbreaks_only filter.
+        """
+        if self.outbreaks_only and not item.get("outbreak_flag") and not cleared:
+            return False
+        if not self.districts and not self.diseases:
+            return True
+        return item.get("district") in self.districts or item.get("disease") in self.diseases
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the subscription for acknowledgement messages."""
+        return {
+            "districts": sorted(self.districts),
+            "diseases": sorted(self.diseases),
+            "outbreaks_only": self.outbreaks_only,
+        }
+
+
+class BackfillBuffer:
+    """
+    Ring buffer of the latest batch messages and their encoded frames.
+    
+    Frames encoded for a broadcast are kept as they are; an encoding no
+    client used at broadcast time is encoded on first request and cached, so
+    any number of reconnecting clients share one frame per encoding.
+    """
+    
+    def __init__(self, size: int = WS_BACKFILL_FRAMES):
+        self._entries: deque = deque(maxlen=max(size, 0))
+    
+    def add(self, message: Dict[str, Any]) -> Dict[str, Frame]:
+        """
+        Record a batch message.
+        
+        Returns:
+            The entry's frame dict by encoding name, for the caller to fill
+            with frames it has already encoded.
+        """
+        frames: Dict[str, Frame] = {}
+        if self._entries.maxlen:
+            self._entries.append((message, frames))
+        return frames
+    
+    def frames(self, serializer: Serializer) -> List[Frame]:
+        """Get the buffered batches in one encoding, oldest first."""
+        frames = []
+        for message, encoded in list(self._entries):
+            frame = encoded.get(serializer.name)
+            if frame is None:
+                with SERIALIZATION_SECONDS.time():
+                    frame = encoded[serializer.name] = serializer.encode(message)
+            frames.append(frame)
+        return frames
+
+
+class ClientChannel:
+    """
+    Bounded outbound queue and sender task for a single WebSocket client.
+    
+    Frames are queued without blocking the broadcaster and delivered by a
+    per-client task, so one slow client never delays the others.
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        serializer: Serializer,
+        on_failure: Callable[[WebSocket], None],
+        mode: str = "full",
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        send_timeout: float = WS_SEND_TIMEOUT,
+        policy: str = WS_SLOW_CLIENT_POLICY,
+    ):
+        if policy not in ("drop_oldest", "disconnect"):
+            raise ValueError(f"Unknown slow client policy: {policy}")
+        
+        self.websocket = websocket
+        self.serializer = serializer
+        self.mode = mode
+        self.subscription = Subscription()
+        self.send_timeout = send_timeout
+        self.policy = policy
+        self.dropped_frames = 0
+        self._on_failure = on_failure
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task = asyncio.create_task(self._send_loop())
+    
+    def offer(self, frame: Frame) -> bool:
+        """
+        Queue a frame for delivery without waiting.
+        
+        Args:
+            frame: The encoded frame to send.
+        
+        Returns:
+            bool: False if the queue is full and the client should be
+            disconnected under the "disconnect" policy.
+        """
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            if self.policy == "disconnect":
+                return False
+            
+            # Drop the oldest queued frame to make room for the newest one
+            self._queue.get_nowait()
+            self._queue.put_nowait(frame)
+            self.dropped_frames += 1
+            DROPPED_FRAMES.inc()
+        
+        return True
+    
+    def close(self) -> None:
+        """Stop the sender task."""
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+    
+    async def _send_loop(self) -> None:
+        """Deliver queued frames in order, giving up on stalled sends."""
+        try:
+            while True:
+                frame = await self._queue.get()
+                if isinstance(frame, bytes):
+                    send = self.websocket.send_bytes(frame)
+                else:
+                    send = self.websocket.send_text(frame)
+                with CLIENT_SEND_SECONDS.time():
+                    await asyncio.wait_for(send, self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.warning(f"Send to client timed out after {self.send_timeout}s")
+            self._on_failure(self.websocket)
+        except Exception as e:
+            logger.warning(f"Failed to send to client: {e}")
+            self._on_failure(self.websocket)
+
 
 class WebSocketManager:
     """Manager for WebSocket client connections and broadcasting."""
     
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
+        self._channels: Dict[WebSocket, ClientChannel] = {}
+        self._close_tasks: Set[asyncio.Task] = set()
+        self._delta_encoder = DeltaEncoder()
+        self._delta_clients = 0
+        self._topic_index: Dict[str, Set[WebSocket]] = defaultdict(set)
+        
+        # Leave a queue slot for the welcome message ahead of the backfill
+        backfill_size = min(WS_BACKFILL_FRAMES, WS_SEND_QUEUE_SIZE - 1)
+        if backfill_size < WS_BACKFILL_FRAMES:
+            logger.warning(f"WS_BACKFILL_FRAMES exceeds the send queue; replaying {backfill_size} frames")
+        self._backfill = BackfillBuffer(backfill_size)
+        
+        # Encoded snapshot frames for unfiltered clients, valid for one delta sequence
+        self._snapshot_sequence = -1
+        self._snapshot_frames: Dict[str, Frame] = {}
     
     async def connect(self, websocket: WebSocket) -> None:
         """
         Accept a new WebSocket connection.
         
+        The frame encoding is negotiated from the "encoding" query parameter
+        or, failing that, from a websocket subprotocol naming an encoding.
+        The "mode" query parameter selects the "full" (default) or "delta"
+        stream.
+        
         Args:
             websocket: The WebSocket connection to accept.
         """
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"Client connected. Total connections: {len(self.active_connections)}")
+        serializer, subprotocol = self._negotiate_encoding(websocket)
+        mode = websocket.query_params.get("mode", "full")
+        if mode not in STREAM_MODES:
+            logger.warning(f"Unsupported stream mode '{mode}', using full")
+            mode = "full"
+        
+        await websocket.accept(subprotocol=subprotocol)
+        self.active_connections.add(websocket)
+        self._channels[websocket] = ClientChannel(
+            websocket, serializer, on_failure=self._drop_client, mode=mode
+        )
+        if mode == "delta":
+            self._delta_clients += 1
+        CONNECTED_CLIENTS.set(len(self.active_connections))
+        logger.info(
+            f"Client connected ({serializer.name}, {mode}). "
+            f"Total connections: {len(self.active_connections)}"
+        )
     
     def disconnect(self, websocket: WebSocket) -> None:
         """
@@ -36,33 +315,92 @@ class WebSocketManager:
             websocket: The WebSocket connection to remove.
         """
         if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+            self.active_connections.discard(websocket)
+            channel = self._channels.pop(websocket, None)
+            if channel is not None:
+                channel.close()
+                self._unindex(websocket, channel.subscription)
+                if channel.mode == "delta":
+                    self._delta_clients -= 1
+            CONNECTED_CLIENTS.set(len(self.active_connections))
             logger.info(f"Client disconnected. Total connections: {len(self.active_connections)}")
     
-    async def broadcast(self, message: Dict[str, Any]) -> None:
+    async def broadcast(
+        self, message: Dict[str, Any], encoded: Optional[Dict[str, Frame]] = None
+    ) -> None:
         """
         Broadcast a message to all connected clients.
         
+        The message is encoded once per negotiated encoding and stream mode,
+        and the same frame is queued on every matching client's channel;
+        delivery happens concurrently in the per-client sender tasks.
+        Batch predictions advance the delta stream, and delta-mode clients
+        receive the batch delta instead of the full batch. Clients with a
+        topic subscription receive only their slice of the batch; each
+        distinct slice is encoded once.
+        
         Args:
             message: The message data to broadcast.
+            encoded: Frames of the full message already encoded elsewhere
+                (e.g. received from the prediction bus), by encoding name;
+                unfiltered full-stream clients get these without re-encoding.
         """
+        is_batch = message.get("type") == "batch_prediction"
+        delta_message = None
+        backfill_frames: Dict[str, Frame] = {}
+        if is_batch:
+            delta_message = self._delta_encoder.update(
+                message, compute_delta=self._delta_clients > 0
+            )
+            backfill_frames = self._backfill.add(message)
+            backfill_frames.update(encoded or {})
+        
         if not self.active_connections:
             logger.debug("No active connections to broadcast to")
             return
         
-        message_json = json.dumps(message)
-        disconnected = []
+        slices: Dict[WebSocket, Tuple[int, ...]] = {}
+        if is_batch and self._topic_index:
+            slices = self._select_slices(
+                message["items"], delta_message["items"] if delta_message else None
+            )
         
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message_json)
-            except Exception as e:
-                logger.warning(f"Failed to send to client: {e}")
-                disconnected.append(connection)
+        frames: Dict[Tuple[str, str, Optional[Tuple[int, ...]]], Frame] = {
+            ("full", name, None): frame for name, frame in (encoded or {}).items()
+        }
+        overflowed = []
+        
+        for websocket, channel in self._channels.items():
+            use_delta = is_batch and channel.mode == "delta"
+            indices = None
+            if is_batch and not channel.subscription.unfiltered:
+                indices = slices.get(websocket, ())
+                if not indices and not use_delta:
+                    # Nothing relevant this tick; delta clients still need the sequence
+                    continue
+            
+            key = ("delta" if use_delta else "full", channel.serializer.name, indices)
+            frame = frames.get(key)
+            if frame is None:
+                payload = delta_message if use_delta else message
+                if indices is not None:
+                    payload = dict(payload, items=[payload["items"][i] for i in indices])
+                with SERIALIZATION_SECONDS.time():
+                    frame = frames[key] = channel.serializer.encode(payload)
+            
+            if not channel.offer(frame):
+                overflowed.append(websocket)
+        
+        if is_batch:
+            # Keep this tick's full frames for clients that connect before the next one
+            for (mode, name, indices), frame in frames.items():
+                if mode == "full" and indices is None:
+                    backfill_frames[name] = frame
         
-        # Remove disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn)
+        # Remove clients that fell too far behind
+        for websocket in overflowed:
+            logger.warning("Client send queue full, disconnecting")
+            self._drop_client(websocket)
     
     async def send_personal_message(self, websocket: WebSocket, message: Dict[str, Any]) -> None:
         """
@@ -72,12 +410,237 @@ class WebSocketManager:
             websocket: The WebSocket connection to send to.
             message: The message data to send.
         """
+        channel = self._channels.get(websocket)
+        if channel is None:
+            try:
+                await websocket.send_text(get_serializer().encode(message))
+            except Exception as e:
+                logger.warning(f"Failed to send personal message: {e}")
+            return
+        
+        with SERIALIZATION_SECONDS.time():
+            frame = channel.serializer.encode(message)
+        if not channel.offer(frame):
+            logger.warning("Client send queue full, disconnecting")
+            self._drop_client(websocket)
+    
+    async def send_initial_state(self, websocket: WebSocket) -> None:
+        """
+        Send the state a client needs right after connecting.
+        
+        Full-stream clients are backfilled with the latest batch frames
+        (WS_BACKFILL_FRAMES) so they do not wait for the next tick; delta-mode
+        clients receive a full snapshot to apply later deltas to. Both come
+        from cached frames, so a reconnect storm costs no re-encoding.
+        
+        Args:
+            websocket: The newly connected WebSocket.
+        """
+        channel = self._channels.get(websocket)
+        if channel is None:
+            return
+        if channel.mode == "delta":
+            await self.send_snapshot(websocket)
+            return
+        
+        for frame in self._backfill.frames(channel.serializer):
+            if not channel.offer(frame):
+                logger.warning("Client send queue full, disconnecting")
+                self._drop_client(websocket)
+                return
+            BACKFILL_FRAMES.inc()
+    
+    async def send_snapshot(self, websocket: WebSocket) -> None:
+        """
+        Send a full snapshot of the latest predictions to a client.
+        
+        Args:
+            websocket: The WebSocket connection to send to.
+        """
+        channel = self._channels.get(websocket)
+        if channel is None or not channel.subscription.unfiltered:
+            snapshot = self._delta_encoder.snapshot()
+            if channel is not None:
+                snapshot["items"] = [
+                    item for item in snapshot["items"] if channel.subscription.matches(item)
+                ]
+            await self.send_personal_message(websocket, snapshot)
+            return
+        
+        if self._snapshot_sequence != self._delta_encoder.sequence:
+            self._snapshot_sequence = self._delta_encoder.sequence
+            self._snapshot_frames.clear()
+        frame = self._snapshot_frames.get(channel.serializer.name)
+        if frame is None:
+            with SERIALIZATION_SECONDS.time():
+                frame = self._snapshot_frames[channel.serializer.name] = channel.serializer.encode(
+                    self._delta_encoder.snapshot()
+                )
+        if not channel.offer(frame):
+            logger.warning("Client send queue full, disconnecting")
+            self._drop_client(websocket)
+    
+    async def subscribe(self, websocket: WebSocket, subscription: Subscription) -> None:
+        """
+        Replace a client's topic subscription.
+        
+        Delta-mode clients receive a fresh snapshot for the new topics.
+        
+        Args:
+            websocket: The subscribing WebSocket.
+            subscription: The new subscription.
+        """
+        channel = self._channels.get(websocket)
+        if channel is None:
+            return
+        
+        self._unindex(websocket, channel.subscription)
+        channel.subscription = subscription
+        for topic in subscription.topics():
+            self._topic_index[topic].add(websocket)
+        
+        await self.send_personal_message(
+            websocket, {"type": "subscribed", **subscription.to_dict()}
+        )
+        if channel.mode == "delta":
+            await self.send_snapshot(websocket)
+    
+    async def handle_client_message(self, websocket: WebSocket, data: str) -> None:
+        """
+        Handle a message received from a client.
+        
+        Supports plain "ping" as well as JSON messages of type "ping",
+        "resync" (request a fresh snapshot after a sequence gap), "subscribe"
+        (with optional "districts", "diseases" and "outbreaks_only" fields)
+        and "unsubscribe" (receive everything again). An invalid subscribe
+        message is answered with an "error" message and leaves the current
+        subscription in place.
+        
+        Args:
+            websocket: The WebSocket the message came from.
+            data: The raw text message.
+        """
+        if data == "ping":
+            await self.send_personal_message(websocket, {"type": "pong"})
+            return
+        
         try:
-            await websocket.send_text(json.dumps(message))
-        except Exception as e:
-            logger.warning(f"Failed to send personal message: {e}")
-            self.disconnect(websocket)
+            message = json.loads(data)
+        except ValueError:
+            logger.debug(f"Ignoring non-JSON client message: {data[:100]}")
+            return
+        
+        if not isinstance(message, dict):
+            return
+        
+        message_type = message.get("type")
+        if message_type == "ping":
+            await self.send_personal_message(websocket, {"type": "pong"})
+        elif message_type == "resync":
+            await self.send_snapshot(websocket)
+        elif message_type == "subscribe":
+            try:
+                subscription = Subscription.from_message(message)
+            except ValueError as e:
+                await self.send_personal_message(websocket, {"type": "error", "message": str(e)})
+                return
+            await self.subscribe(websocket, subscription)
+        elif message_type == "unsubscribe":
+            await self.subscribe(websocket, Subscription())
+        else:
+            logger.debug(f"Ignoring unknown client message type: {message_type}")
     
     def get_connection_count(self) -> int:
         """Get the number of active connections."""
         return len(self.active_connections)
+    
+    async def shutdown(self) -> None:
+        """Stop all sender tasks and wait for pending closes."""
+        for websocket in list(self.active_connections):
+            self.disconnect(websocket)
+        
+        if self._close_tasks:
+            await asyncio.gather(*self._close_tasks, return_exceptions=True)
+    
+    def _select_slices(
+        self, items: List[Dict[str, Any]], deltas: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[WebSocket, Tuple[int, ...]]:
+        """
+        Resolve which batch items each subscribed client should receive.
+        
+        Args:
+            items: The batch prediction items.
+            deltas: The batch delta items in the same order, or None when no
+                delta client is connected. Delta clients following outbreaks
+                receive the items whose flag was just cleared.
+        
+        Returns:
+            Dict mapping each subscribed client to the indices of its items.
+        """
+        selected: Dict[WebSocket, List[int]] = defaultdict(list)
+        outbreak_subscribers = self._topic_index.get(OUTBREAKS_TOPIC, ())
+        
+        for idx, item in enumerate(items):
+            cleared = deltas is not None and deltas[idx].get("flag_transition") == "cleared"
+            recipients = set(outbreak_subscribers) if item["outbreak_flag"] or cleared else set()
+            for topic in (f"district:{item['district']}", f"disease:{item['disease']}"):
+                subscribers = self._topic_index.get(topic)
+                if subscribers:
+                    recipients.update(subscribers)
+            
+            for websocket in recipients:
+                channel = self._channels.get(websocket)
+                if channel is not None and channel.subscription.matches(
+                    item, cleared=cleared and channel.mode == "delta"
+                ):
+                    selected[websocket].append(idx)
+        
+        return {websocket: tuple(indices) for websocket, indices in selected.items()}
+    
+    def _unindex(self, websocket: WebSocket, subscription: Subscription) -> None:
+        """Remove a client from the topic index."""
+        for topic in subscription.topics():
+            subscribers = self._topic_index.get(topic)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self._topic_index[topic]
+    
+    def _negotiate_encoding(self, websocket: WebSocket) -> Tuple[Serializer, Optional[str]]:
+        """
+        Pick the frame serializer for a connecting client.
+        
+        Args:
+            websocket: The connecting WebSocket.
+        
+        Returns:
+            Tuple of (serializer, subprotocol to accept or None).
+        """
+        requested = websocket.query_params.get("encoding")
+        if requested is not None:
+            return get_serializer(requested), None
+        
+        encodings = available_encodings()
+        for offered in websocket.scope.get("subprotocols", []):
+            if offered in encodings:
+                return get_serializer(offered), offered
+        
+        return get_serializer(WS_DEFAULT_ENCODING), None
+    
+    def _drop_client(self, websocket: WebSocket) -> None:
+        """Disconnect a client that is failing or too slow and close its socket."""
+        if websocket not in self.active_connections:
+            return
+        
+        self.disconnect(websocket)
+        DROPPED_CLIENTS.inc()
+        task = asyncio.create_task(self._close_websocket(websocket))
+        self._close_tasks.add(task)
+        task.add_done_callback(self._close_tasks.discard)
+    
+    async def _close_websocket(self, websocket: WebSocket) -> None:
+        """Close a dropped client's socket, ignoring errors from dead connections."""
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), WS_SEND_TIMEOUT)
+        except Exception:
+            pass
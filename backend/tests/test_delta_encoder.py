@@ -0,0 +1,86 @@
+"""Tests for DeltaEncoder snapshots and deltas."""
+
+import copy
+
+from services.delta_encoder import DeltaEncoder
+
+# Delta keys that describe the change rather than the prediction
+ANNOTATIONS = ("flag_transition", "changed_features")
+
+
+def _item(district, cases, flag=False, disease="Dengue", temp=30.0, version="v1"):
+    return {
+        "ts": f"2026-01-01T00:00:{cases:02.0f}+00:00",
+        "district": district,
+        "disease": disease,
+        "predicted_log": round(cases / 10, 3),
+        "predicted_cases": float(cases),
+        "predicted_cases_rounded": round(cases),
+        "outbreak_prob": 0.9 if flag else 0.1,
+        "outbreak_flag": flag,
+        "input_features": {"weekly_avg_temp": temp, "weekly_avg_humidity": 60.0},
+        "model_version": version,
+    }
+
+
+def _apply(state, delta):
+    """Apply a batch_delta to a client-side state the way the README describes."""
+    state = copy.deepcopy(state)
+    for change in delta["items"]:
+        item = state.setdefault(change["district"], {})
+        item.update({key: value for key, value in change.items() if key not in ANNOTATIONS})
+        if "changed_features" in change:
+            item.setdefault("input_features", {}).update(change["changed_features"])
+    return state
+
+
+def _by_district(message):
+    return {item["district"]: item for item in message["items"]}
+
+
+def test_deltas_rebuild_the_snapshot():
+    encoder = DeltaEncoder()
+    batches = [
+        [_item("ballari", 5), _item("udupi", 12)],
+        [_item("ballari", 7, temp=31.5), _item("udupi", 40, flag=True)],
+        [_item("ballari", 7, disease="Cholera", version="v2"), _item("udupi", 3), _item("mysuru", 9)],
+    ]
+    
+    state = {}
+    for items in batches:
+        delta = encoder.update({"type": "batch_prediction", "items": items})
+        state = _apply(state, delta)
+        assert state == _by_district(encoder.snapshot())
+
+
+def test_delta_reports_only_changes_and_transitions():
+    encoder = DeltaEncoder()
+    encoder.update({"items": [_item("ballari", 5)]})
+    delta = encoder.update({"items": [_item("ballari", 50, flag=True, temp=33.0)]})
+    
+    (change,) = delta["items"]
+    assert change["flag_transition"] == "raised"
+    assert change["changed_features"] == {"weekly_avg_temp": 33.0}
+    assert "disease" not in change and "model_version" not in change
+    
+    delta = encoder.update({"items": [_item("ballari", 4, temp=33.0, version="v2")]})
+    (change,) = delta["items"]
+    assert change["flag_transition"] == "cleared"
+    assert change["changed_features"] == {}
+    assert change["model_version"] == "v2"
+
+
+def test_sequence_numbers_chain_and_survive_skipped_deltas():
+    encoder = DeltaEncoder()
+    first = encoder.update({"items": [_item("ballari", 5)]})
+    assert (first["seq"], first["base_seq"]) == (1, 0)
+    
+    # Without delta clients the state is recorded but no delta is built
+    assert encoder.update({"items": [_item("ballari", 6)]}, compute_delta=False) == {}
+    snapshot = encoder.snapshot()
+    assert snapshot["seq"] == 2
+    assert snapshot["items"][0]["predicted_cases"] == 6.0
+    
+    after = encoder.update({"items": [_item("ballari", 8)]})
+    assert (after["seq"], after["base_seq"]) == (3, 2)
+    assert _apply(_by_district(snapshot), after) == _by_district(encoder.snapshot())
@@ -0,0 +1,58 @@
+"""Tests for DiseaseTable encoding, decoding and sampling."""
+
+import numpy as np
+import pytest
+
+from config import FEATURE_ORDER
+from services.disease_table import DISEASES, UNKNOWN_DISEASE, DiseaseTable
+
+# A layout whose disease columns are not adjacent
+SPLIT_ORDER = ["Disease_Cholera", "temp", "Disease_Dengue", "Disease_Malaria", "humidity"]
+SPLIT_FREQUENCIES = {"Disease_Cholera": 0.5, "Disease_Dengue": 0.25, "Disease_Malaria": 0.25}
+
+
+@pytest.mark.parametrize(
+    "table, width",
+    [(DISEASES, len(FEATURE_ORDER)), (DiseaseTable(SPLIT_FREQUENCIES, SPLIT_ORDER), len(SPLIT_ORDER))],
+    ids=["model", "split"],
+)
+def test_encode_decode_round_trip(table, width):
+    indices = np.arange(len(table)).repeat(2)
+    matrix = np.full((len(indices), width), 7.0, dtype=np.float32)
+    
+    table.encode(matrix, indices)
+    
+    np.testing.assert_array_equal(table.decode(matrix), indices)
+    assert (matrix[:, table.columns].sum(axis=1) == 1).all()
+    other = np.setdiff1d(np.arange(width), table.columns)
+    assert (matrix[:, other] == 7.0).all()
+
+
+def test_rows_without_a_disease_decode_as_unknown():
+    table = DiseaseTable(SPLIT_FREQUENCIES, SPLIT_ORDER)
+    matrix = np.zeros((2, len(SPLIT_ORDER)))
+    matrix[1, SPLIT_ORDER.index("Disease_Malaria")] = 1.0
+    
+    indices = table.decode(matrix)
+    assert indices.tolist() == [-1, 2]
+    assert table.labels(indices) == [UNKNOWN_DISEASE, "Malaria"]
+    # A single feature vector decodes like a one-row matrix
+    assert table.decode(matrix[1]).tolist() == [2]
+
+
+def test_index_accepts_names_with_or_without_prefix():
+    table = DiseaseTable(SPLIT_FREQUENCIES, SPLIT_ORDER)
+    assert table.index("Dengue") == table.index("Disease_Dengue") == 1
+    assert table.index("Measles") == -1
+    assert table.one_hot(1) == {"Disease_Cholera": 0, "Disease_Dengue": 1, "Disease_Malaria": 0}
+
+
+def test_sampling_follows_the_frequencies():
+    table = DiseaseTable(SPLIT_FREQUENCIES, SPLIT_ORDER)
+    assert table.sample(np.array([0.0, 0.49, 0.5, 0.74, 0.75, 0.999999])).tolist() == [0, 0, 1, 1, 2, 2]
+    # The upper end never indexes past the last disease
+    assert table.sample(1.0) == 2
+    
+    draws = table.sample(np.random.default_rng(0).random(100_000))
+    shares = np.bincount(draws, minlength=len(table)) / len(draws)
+    np.testing.assert_allclose(shares, [0.5, 0.25, 0.25], atol=0.01)
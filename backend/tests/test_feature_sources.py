@@ -0,0 +1,66 @@
+"""Tests for scoring observed data from a feature source."""
+
+import asyncio
+import json
+
+import pytest
+
+import services.prediction_service as prediction_module
+import services.serializers as serializers_module
+from services.fallback_predictor import FallbackPredictor
+from services.feature_sources import HttpPushSource
+from services.model_service import ModelService
+from services.prediction_service import PredictionService
+from services.serializers import JsonSerializer
+from services.simulation_service import SimulationService
+
+
+def _reject_constant(name):
+    raise ValueError(f"non-standard JSON constant {name}")
+
+
+def test_partial_observation_encodes_as_standard_json(monkeypatch):
+    monkeypatch.setattr(prediction_module, "INCLUDE_INPUT_FEATURES", True)
+    # The plain json fallback is the encoder that wrote bare NaN tokens
+    monkeypatch.setattr(serializers_module, "orjson", None)
+    service = PredictionService(
+        ModelService(), SimulationService(["ballari"], seed=0), fallback=FallbackPredictor(seed=0)
+    )
+    
+    async def push():
+        source = HttpPushSource()
+        assert source.offer([{"district": "ballari", "weekly_avg_temp": 31.2}])
+        return await source._queue.get()
+    
+    batch = service.predict_observations(asyncio.run(push()))
+    frame = JsonSerializer().encode(batch)
+    
+    decoded = json.loads(frame, parse_constant=_reject_constant)
+    features = decoded["items"][0]["input_features"]
+    assert features["weekly_avg_temp"] == pytest.approx(31.2)
+    assert features["weekly_avg_humidity"] is None
+
+
+def test_pushes_are_chunked_and_admitted_all_or_nothing():
+    def rows(n):
+        return [{"district": "ballari", "weekly_avg_temp": float(i)} for i in range(n)]
+    
+    async def run():
+        source = HttpPushSource(chunk_rows=3, queue_size=4)
+        assert source.max_rows == 12
+        with pytest.raises(ValueError):
+            source.offer(rows(13))
+        
+        assert source.offer(rows(7))
+        # Two slots are left; a three-chunk push is rejected without queueing any of it
+        assert not source.offer(rows(9))
+        assert source.get_stats()["queued_chunks"] == 3
+        assert source.offer(rows(1))
+        
+        chunks = [source._queue.get_nowait() for _ in range(source._queue.qsize())]
+        return chunks, source.get_stats()["rows"]
+    
+    chunks, queued_rows = asyncio.run(run())
+    assert [len(chunk["district"]) for chunk in chunks] == [3, 3, 1, 1]
+    assert chunks[1]["weekly_avg_temp"] == [3.0, 4.0, 5.0]
+    assert queued_rows == 8
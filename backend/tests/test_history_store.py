@@ -0,0 +1,147 @@
+"""Tests for the memory-mapped prediction history store."""
+
+from datetime import datetime, timezone
+
+from services.history_store import ACTIVE_SUFFIX, DICTIONARY_NAME, SEALED_SUFFIX, HistoryStore
+
+BASE = 1_700_000_000.0
+
+
+def _items(ts: float, districts, disease: str = "Dengue"):
+    iso = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+    return [
+        {
+            "ts": iso,
+            "district": district,
+            "disease": disease,
+            "model_version": "v1",
+            "predicted_log": 1.5,
+            "predicted_cases": float(idx),
+            "outbreak_prob": 0.25,
+            "outbreak_flag": idx % 2 == 0,
+        }
+        for idx, district in enumerate(districts)
+    ]
+
+
+def _store(path, **kwargs):
+    kwargs.setdefault("segment_seconds", 3600)
+    kwargs.setdefault("segment_rows", 100)
+    kwargs.setdefault("retention_seconds", 0)
+    return HistoryStore(path, **kwargs)
+
+
+def test_append_and_query_across_segments(tmp_path):
+    store = _store(tmp_path)
+    for hour in range(3):
+        store.append(_items(BASE + hour * 3600, ["ballari", "udupi"]))
+    
+    result = store.query("ballari", BASE - 1, BASE + 3 * 3600)["columns"]
+    assert result["ts"] == [BASE, BASE + 3600, BASE + 7200]
+    assert set(result["disease"]) == {"Dengue"}
+    assert store.get_stats()["sealed_segments"] == 2
+    store.close()
+
+
+def test_query_filters_by_time_range(tmp_path):
+    store = _store(tmp_path)
+    for minute in range(10):
+        store.append(_items(BASE + minute * 60, ["ballari"]))
+    
+    result = store.query("ballari", BASE + 120, BASE + 300)["columns"]
+    assert result["ts"] == [BASE + 120, BASE + 180, BASE + 240, BASE + 300]
+    assert store.query("unknown", BASE, BASE + 600)["columns"]["ts"] == []
+    store.close()
+
+
+def test_segments_rotate_when_full(tmp_path):
+    store = _store(tmp_path, segment_rows=4)
+    districts = [f"d{idx}" for idx in range(10)]
+    store.append(_items(BASE, districts))
+    
+    names = sorted(path.name for path in tmp_path.iterdir() if path.suffix in (ACTIVE_SUFFIX, SEALED_SUFFIX))
+    assert len(names) == 3
+    assert len(set(names)) == 3
+    for district in districts:
+        assert len(store.query(district, BASE, BASE)["columns"]["ts"]) == 1
+    store.close()
+
+
+def test_writer_resumes_active_segment_after_restart(tmp_path):
+    store = _store(tmp_path)
+    store.append(_items(BASE, ["ballari", "udupi"]))
+    store.close()
+    
+    reopened = _store(tmp_path)
+    reopened.append(_items(BASE + 60, ["udupi", "mysuru"]))
+    assert reopened.query("udupi", BASE, BASE + 60)["columns"]["ts"] == [BASE, BASE + 60]
+    assert reopened.query("mysuru", BASE, BASE + 60)["count"] == 1
+    assert len(list(tmp_path.glob(f"*{ACTIVE_SUFFIX}"))) == 1
+    reopened.close()
+
+
+def test_recovers_from_torn_dictionary_line(tmp_path):
+    store = _store(tmp_path)
+    store.append(_items(BASE, ["ballari"]))
+    store.close()
+    with open(tmp_path / DICTIONARY_NAME, "ab") as f:
+        f.write(b'"half-writ')
+    
+    reopened = _store(tmp_path)
+    reopened.append(_items(BASE + 60, ["udupi"]))
+    assert reopened.query("udupi", BASE, BASE + 60)["count"] == 1
+    assert reopened.query("ballari", BASE, BASE + 60)["count"] == 1
+    reopened.close()
+
+
+def test_reset_writer_picks_up_another_writers_changes(tmp_path):
+    first = _store(tmp_path)
+    first.append(_items(BASE, ["ballari"]))
+    
+    # Leadership moves to a second writer, which adds strings and seals the window
+    second = _store(tmp_path)
+    second.append(_items(BASE + 60, ["udupi"], disease="Cholera"))
+    second.append(_items(BASE + 3600, ["mysuru"], disease="Malaria"))
+    second.close()
+    
+    # ...and back to the first
+    first.reset_writer()
+    first.append(_items(BASE + 3660, ["hassan"], disease="Typhoid"))
+    
+    reader = _store(tmp_path)
+    assert reader.query("udupi", BASE, BASE + 7200)["columns"]["disease"] == ["Cholera"]
+    assert reader.query("mysuru", BASE, BASE + 7200)["columns"]["disease"] == ["Malaria"]
+    assert reader.query("hassan", BASE, BASE + 7200)["columns"]["disease"] == ["Typhoid"]
+    assert reader.query("ballari", BASE, BASE + 7200)["columns"]["ts"] == [BASE]
+    first.close()
+    reader.close()
+
+
+def test_downsample_buckets_rows(tmp_path):
+    store = _store(tmp_path)
+    for minute in range(6):
+        store.append(_items(BASE + minute * 60, ["ballari"]))
+    
+    result = store.downsample("ballari", BASE, BASE + 359, 180)["columns"]
+    assert result["ts"] == [BASE, BASE + 180]
+    assert result["count"] == [3, 3]
+    store.close()
+
+
+def test_new_segment_follows_highest_sequence_in_window(tmp_path):
+    store = _store(tmp_path, segment_rows=2)
+    store.append(_items(BASE, ["a", "b", "c", "d", "e"]))
+    store.close()
+    
+    # An earlier sealed segment of the window is gone, leaving a gap
+    sealed = sorted(tmp_path.glob(f"*{SEALED_SUFFIX}"))
+    sealed[0].unlink()
+    
+    reopened = _store(tmp_path, segment_rows=2)
+    reopened.append(_items(BASE + 60, ["f", "g", "h"]))
+    names = sorted(path.name for path in tmp_path.iterdir() if path.suffix in (ACTIVE_SUFFIX, SEALED_SUFFIX))
+    sequences = [name.split("-")[1].split(".")[0] for name in names]
+    assert len(sequences) == len(set(sequences))
+    assert reopened.query("e", BASE, BASE)["count"] == 1
+    assert reopened.query("h", BASE, BASE + 60)["count"] == 1
+    reopened.close()
@@ -0,0 +1,123 @@
+"""Tests for lag state snapshots and their crash recovery."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from services.lag_state import LAG_1, LagState
+from services.simulation_service import SimulationService
+
+DISTRICTS = ["ballari", "udupi", "mysuru"]
+
+
+def _state() -> LagState:
+    state = LagState(DISTRICTS, rng=np.random.default_rng(0))
+    state.update(state.ids(DISTRICTS), np.array([5.0, 10.0, 15.0]))
+    return state
+
+
+def test_snapshot_round_trip(tmp_path):
+    state = _state()
+    path = tmp_path / "lag.snapshot"
+    state.save(path, tick=7)
+    
+    loaded, tick, _ = LagState.load(path)
+    assert tick == 7
+    assert loaded.keys == DISTRICTS
+    np.testing.assert_array_equal(loaded.values, state.values)
+
+
+def test_truncated_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "lag.snapshot"
+    _state().save(path)
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) - 5])
+    
+    with pytest.raises(ValueError):
+        LagState.load(path)
+
+
+def test_corrupt_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "lag.snapshot"
+    _state().save(path)
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    
+    with pytest.raises(ValueError, match="checksum"):
+        LagState.load(path)
+
+
+def test_interrupted_write_leaves_previous_snapshot(tmp_path):
+    path = tmp_path / "lag.snapshot"
+    _state().save(path, tick=1)
+    # A crash mid-write leaves only a stray temporary file behind
+    (tmp_path / ".lag.snapshot.12345.tmp").write_bytes(b"LAGSNAP\0partial")
+    
+    _, tick, _ = LagState.load(path)
+    assert tick == 1
+
+
+def test_concurrent_writers_do_not_share_a_temporary_file(tmp_path):
+    path = tmp_path / "lag.snapshot"
+    states = [_state() for _ in range(8)]
+    errors = []
+    
+    def write(state, tick):
+        try:
+            for _ in range(20):
+                state.save(path, tick)
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=write, args=(state, tick)) for tick, state in enumerate(states)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    LagState.load(path)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_simulation_resumes_from_snapshot_and_ignores_a_corrupt_one(tmp_path):
+    path = tmp_path / "lag.snapshot"
+    first = SimulationService(DISTRICTS, seed=0, state_path=path, snapshot_interval=0)
+    first.update_lag_states(DISTRICTS, np.array([1.0, 2.0, 3.0]))
+    first.checkpoint()
+    
+    resumed = SimulationService(DISTRICTS, seed=1, state_path=path)
+    np.testing.assert_array_equal(resumed.lag_state.values[LAG_1], [1.0, 2.0, 3.0])
+    
+    path.write_bytes(b"garbage")
+    fresh = SimulationService(DISTRICTS, seed=1, state_path=path)
+    assert len(fresh.lag_state) == len(DISTRICTS)
+
+
+def test_checkpoints_are_rate_limited_after_the_first_tick(tmp_path):
+    path = tmp_path / "lag.snapshot"
+    simulation = SimulationService(DISTRICTS, seed=0, state_path=path, snapshot_interval=3600)
+    for _ in range(5):
+        simulation.checkpoint()
+    _, tick, _ = LagState.load(path)
+    assert tick == 1
+    
+    simulation.snapshot_interval = 0
+    simulation.checkpoint()
+    _, tick, _ = LagState.load(path)
+    assert tick == 6
+
+
+def test_forced_save_bypasses_the_rate_limit(tmp_path):
+    path = tmp_path / "lag.snapshot"
+    simulation = SimulationService(DISTRICTS, seed=0, state_path=path, snapshot_interval=3600)
+    simulation.checkpoint()
+    simulation.update_lag_states(DISTRICTS, np.array([4.0, 5.0, 6.0]))
+    simulation.checkpoint()
+    
+    simulation.save_lag_state()
+    state, tick, _ = LagState.load(path)
+    assert tick == 2
+    np.testing.assert_array_equal(state.values[LAG_1], [4.0, 5.0, 6.0])
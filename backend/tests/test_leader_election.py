@@ -0,0 +1,114 @@
+"""Tests for leader election retry behaviour and the RESP client."""
+
+import asyncio
+
+import pytest
+
+from services.leader_election import LeaderElection, run_while_leader
+from services.resp_client import RespClient, RespError
+
+
+class FlakyElection(LeaderElection):
+    """Fails with server error replies before granting leadership."""
+    
+    kind = "flaky"
+    
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.attempts = 0
+        self.released = 0
+    
+    async def try_acquire(self) -> bool:
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise RespError("LOADING Redis is loading the dataset in memory")
+        return True
+    
+    async def renew(self) -> bool:
+        raise RespError("READONLY You can't write against a read only replica")
+    
+    async def release(self) -> None:
+        self.released += 1
+
+
+def test_error_replies_are_retried_instead_of_ending_the_campaign():
+    election = FlakyElection(failures=2)
+    elected = asyncio.Event()
+    
+    async def on_elected():
+        elected.set()
+        await asyncio.Event().wait()
+    
+    async def run():
+        campaign = asyncio.create_task(run_while_leader(election, on_elected, interval=0.01))
+        await asyncio.wait_for(elected.wait(), timeout=2)
+        # The failing renewal drops leadership and the campaign keeps going
+        await asyncio.sleep(0.05)
+        assert not campaign.done()
+        campaign.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await campaign
+    
+    asyncio.run(run())
+    assert election.attempts > 3
+    assert election.released >= 1
+    assert not election.is_leader
+
+
+def test_failed_auth_closes_the_connection():
+    closed = asyncio.Event()
+    
+    async def handle(reader, writer):
+        await reader.readuntil(b"\r\n")
+        writer.write(b"-WRONGPASS invalid username-password pair\r\n")
+        await writer.drain()
+        # The client should hang up rather than leave the socket open
+        await reader.read()
+        closed.set()
+        writer.close()
+    
+    async def run():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = RespClient(f"redis://:secret@127.0.0.1:{port}")
+        # The traceback keeps the failed call's frame, and any writer it leaked, alive
+        with pytest.raises(RespError) as failure:
+            await client.execute("PING")
+        await asyncio.wait_for(closed.wait(), timeout=2)
+        assert failure.value.args[0].startswith("WRONGPASS")
+        server.close()
+    
+    asyncio.run(run())
+
+
+def test_cancelled_command_does_not_leave_its_reply_for_the_next_one():
+    async def handle(reader, writer):
+        try:
+            while True:
+                # ECHO arrives as "*2", "$4", "ECHO", "$<n>", then the message
+                await reader.readuntil(b"\r\n")
+                await reader.readuntil(b"\r\n")
+                await reader.readuntil(b"\r\n")
+                await reader.readuntil(b"\r\n")
+                message = (await reader.readuntil(b"\r\n"))[:-2]
+                if message == b"first":
+                    # Reply only after the client has given up on this command
+                    await asyncio.sleep(0.1)
+                writer.write(b"$%d\r\n%s\r\n" % (len(message), message))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+    
+    async def run():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = RespClient(f"redis://127.0.0.1:{port}")
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.execute("ECHO", "first"), timeout=0.02)
+        await asyncio.sleep(0.15)
+        reply = await client.execute("ECHO", "second")
+        await client.close()
+        server.close()
+        return reply
+    
+    assert asyncio.run(run()) == b"second"
@@ -0,0 +1,32 @@
+"""Tests for draining metrics from one registry into another."""
+
+from services.metrics import MetricsRegistry
+
+
+def test_drained_metrics_merge_into_another_registry():
+    worker, web = MetricsRegistry(), MetricsRegistry()
+    for registry in (worker, web):
+        registry.counter("rows_total")
+        registry.gauge("entries")
+        registry.gauge("clients")
+        registry.histogram("seconds", buckets=(0.1, 1.0))
+    web.gauge("clients").set(4)
+    
+    worker.counter("rows_total").inc(3)
+    worker.gauge("entries").set(7)
+    worker.histogram("seconds").observe(0.05)
+    worker.histogram("seconds").observe(5.0)
+    web.merge(worker.drain())
+    
+    worker.counter("rows_total").inc(2)
+    worker.histogram("seconds").observe(0.5)
+    web.merge(worker.drain())
+    
+    assert web.counter("rows_total").value == 5
+    assert web.gauge("entries").value == 7
+    # Gauges the worker never wrote keep the web process's value
+    assert web.gauge("clients").value == 4
+    snapshot = web.histogram("seconds").snapshot()
+    assert snapshot["buckets"] == {"0.1": 1, "1.0": 2, "+Inf": 3}
+    assert snapshot["sum"] == 5.55
+    assert worker.drain() == {}
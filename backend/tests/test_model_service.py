@@ -0,0 +1,68 @@
+"""Tests for ModelService loading with the compiled tree engine."""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from config import FEATURE_ORDER
+from services.model_service import ModelService
+
+xgb = pytest.importorskip("xgboost")
+
+
+def _train(path, scale: float, feature_names=FEATURE_ORDER) -> None:
+    rng = np.random.default_rng(0)
+    features = rng.uniform(0, 10, size=(500, len(FEATURE_ORDER))).astype(np.float32)
+    dtrain = xgb.DMatrix(features, label=features[:, 0] * scale, feature_names=feature_names)
+    booster = xgb.train({"max_depth": 3, "objective": "reg:squarederror"}, dtrain, num_boost_round=5)
+    booster.save_model(str(path))
+
+
+def _load(path):
+    service = ModelService(engine="numpy", path=path)
+    assert service.load_model()
+    return service
+
+
+def test_compiled_trees_are_recompiled_when_model_contents_change(tmp_path):
+    model_path = tmp_path / "model.json"
+    _train(model_path, scale=1.0)
+    matrix = np.full((1, len(FEATURE_ORDER)), 5.0, dtype=np.float32)
+    first = _load(model_path).predict(matrix)
+    
+    # Replace the model but keep an mtime older than the compiled cache
+    replacement = tmp_path / "replacement.json"
+    _train(replacement, scale=3.0)
+    compiled_mtime = (tmp_path / "model.trees.npz").stat().st_mtime
+    shutil.copyfile(replacement, model_path)
+    os.utime(model_path, (compiled_mtime - 60, compiled_mtime - 60))
+    
+    second = _load(model_path).predict(matrix)
+    assert second[0] == pytest.approx(first[0] * 3, rel=0.05)
+
+
+def test_compiled_trees_are_reused_for_an_unchanged_model(tmp_path, caplog):
+    model_path = tmp_path / "model.json"
+    _train(model_path, scale=1.0)
+    _load(model_path)
+    
+    caplog.set_level("INFO", logger="services.model_service")
+    _load(model_path)
+    assert "Loading compiled trees" in caplog.text
+
+
+@pytest.mark.parametrize("engine", ["xgboost", "numpy"])
+def test_models_without_matching_feature_names_are_rejected(tmp_path, engine):
+    unnamed = tmp_path / "unnamed.json"
+    _train(unnamed, scale=1.0, feature_names=None)
+    renamed = tmp_path / "renamed.json"
+    _train(renamed, scale=1.0, feature_names=list(reversed(FEATURE_ORDER)))
+    
+    service = ModelService(engine=engine, path=tmp_path / "model.json")
+    _train(service.path, scale=1.0)
+    assert service.load_model()
+    assert not service.reload_model(unnamed, "unnamed")
+    assert not service.reload_model(renamed, "renamed")
+    assert service.model_version != "unnamed"
@@ -0,0 +1,105 @@
+"""Tests for PredictionCache expiry, invalidation and eviction."""
+
+import numpy as np
+import pytest
+
+from config import FEATURE_ORDER
+from services.prediction_cache import PredictionCache
+
+TEMP = FEATURE_ORDER.index("weekly_avg_temp")
+
+
+class _Model:
+    """Counts the rows it is asked to score; predicts the row sum."""
+    
+    def __init__(self):
+        self.rows = 0
+    
+    def __call__(self, matrix):
+        self.rows += len(matrix)
+        return matrix.sum(axis=1)
+
+
+def _rows(n, start=0.0):
+    matrix = np.zeros((n, len(FEATURE_ORDER)), dtype=np.float32)
+    matrix[:, TEMP] = start + np.arange(n)
+    return matrix
+
+
+def _cache(now, **kwargs):
+    kwargs.setdefault("quantization", {})
+    return PredictionCache(clock=lambda: now[0], **kwargs)
+
+
+def test_hits_are_served_until_the_ttl_expires():
+    now = [0.0]
+    cache, model = _cache(now, ttl=10.0), _Model()
+    matrix = _rows(3)
+    
+    first = cache.predict(matrix, "v1", model)
+    now[0] = 9.0
+    second = cache.predict(matrix, "v1", model)
+    assert model.rows == 3
+    np.testing.assert_array_equal(first, second)
+    
+    now[0] = 10.5
+    cache.predict(matrix, "v1", model)
+    assert model.rows == 6
+    assert cache.get_stats()["hits"] == 3
+
+
+def test_zero_ttl_keeps_rows_until_evicted():
+    now = [0.0]
+    cache, model = _cache(now, ttl=0), _Model()
+    cache.predict(_rows(2), "v1", model)
+    now[0] = 1e9
+    cache.predict(_rows(2), "v1", model)
+    assert model.rows == 2
+
+
+def test_version_change_invalidates_every_row():
+    now = [0.0]
+    cache, model = _cache(now, ttl=60.0), _Model()
+    cache.predict(_rows(4), "v1", model)
+    
+    cache.predict(_rows(4), "v2", model)
+    assert model.rows == 8
+    assert cache.get_stats()["version"] == "v2"
+    
+    # Rows computed for a model that was swapped out meanwhile are not stored:
+    # only the two rows the new "v2" model scored remain
+    cache.predict(_rows(2, start=100.0), "v1", lambda m: cache.predict(m, "v2", model))
+    assert cache.get_stats()["version"] == "v2"
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_least_recently_used_rows_are_evicted():
+    now = [0.0]
+    cache, model = _cache(now, max_entries=2, ttl=0), _Model()
+    a, b, c = _rows(1, 0.0), _rows(1, 1.0), _rows(1, 2.0)
+    cache.predict(a, "v1", model)
+    cache.predict(b, "v1", model)
+    cache.predict(a, "v1", model)
+    cache.predict(c, "v1", model)
+    assert model.rows == 3
+    
+    cache.predict(a, "v1", model)
+    assert model.rows == 3
+    cache.predict(b, "v1", model)
+    assert model.rows == 4
+
+
+def test_quantized_rows_share_a_prediction_and_batch_duplicates_run_once():
+    now = [0.0]
+    cache, model = _cache(now, ttl=0, quantization={"weather": 0.5}), _Model()
+    matrix = _rows(3)
+    matrix[:, TEMP] = [30.1, 30.2, 30.1]
+    
+    predictions = cache.predict(matrix, "v1", model)
+    assert model.rows == 1
+    assert len(set(predictions.tolist())) == 1
+
+
+def test_unknown_quantization_group_is_rejected():
+    with pytest.raises(ValueError):
+        PredictionCache(quantization={"moods": 1.0})
@@ -0,0 +1,62 @@
+"""Tests for PredictionExecutor in process mode."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from config import MODEL_PATH
+from services.metrics import REGISTRY
+from services.model_service import ModelService
+from services.prediction_executor import PredictionExecutor
+from services.prediction_service import PredictionService
+from services.simulation_service import SimulationService
+
+pytest.importorskip("xgboost")
+pytestmark = pytest.mark.skipif(not Path(MODEL_PATH).exists(), reason="bundled model missing")
+
+
+def test_process_executor_reloads_the_worker_model():
+    model_service = ModelService()
+    model_service.load_model()
+    prediction_service = PredictionService(model_service, SimulationService(seed=0))
+    executor = PredictionExecutor(prediction_service, kind="process")
+    
+    async def run():
+        await executor.warm_up()
+        swapped = await executor.reload_model("default", version="reloaded")
+        batch, _ = await executor.run_batch()
+        status = await executor.registry_status()
+        return swapped, batch, status
+    
+    try:
+        swapped, batch, status = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    
+    assert swapped
+    assert {item["model_version"] for item in batch["items"]} == {"reloaded"}
+    assert status["models"]["default"]["version"] == "reloaded"
+    assert model_service.model_version == "reloaded"
+
+
+def test_process_executor_reports_worker_metrics():
+    model_service = ModelService()
+    model_service.load_model()
+    prediction_service = PredictionService(model_service, SimulationService(seed=0))
+    executor = PredictionExecutor(prediction_service, kind="process")
+    batch_sizes = REGISTRY.histogram("batch_size")
+    predict_seconds = REGISTRY.histogram("model_predict_seconds")
+    before = batch_sizes.snapshot()["count"], predict_seconds.snapshot()["count"]
+    
+    async def run():
+        for _ in range(3):
+            await executor.run_batch()
+    
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
+    
+    assert batch_sizes.snapshot()["count"] == before[0] + 3
+    assert predict_seconds.snapshot()["count"] >= before[1] + 3
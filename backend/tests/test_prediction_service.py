@@ -0,0 +1,82 @@
+"""Tests for batched versus per-district prediction in PredictionService."""
+
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import services.prediction_service as prediction_module
+from config import MODEL_PATH
+from services.fallback_predictor import FallbackPredictor
+from services.model_service import ModelService
+from services.prediction_service import PredictionService
+from services.simulation_service import SimulationService
+
+DISTRICTS = ["ballari", "udupi", "mysuru", "kodagu", "bidar"]
+
+
+def _service(model_service: ModelService) -> PredictionService:
+    return PredictionService(
+        model_service, SimulationService(DISTRICTS, seed=42), fallback=FallbackPredictor(seed=7)
+    )
+
+
+def _assert_same_predictions(actual, expected):
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        got, want = dict(got), dict(want)
+        # Lags carried over from the previous tick may differ in the last ulp
+        assert got.pop("input_features") == pytest.approx(want.pop("input_features"))
+        del got["ts"], want["ts"]
+        assert got == want
+
+
+def _loaded_model_service() -> ModelService:
+    pytest.importorskip("xgboost")
+    if not Path(MODEL_PATH).exists():
+        pytest.skip("bundled model missing")
+    model_service = ModelService()
+    model_service.load_model()
+    return model_service
+
+
+@pytest.mark.parametrize(
+    "make_model_service", [ModelService, _loaded_model_service], ids=["fallback", "model"]
+)
+def test_batched_path_matches_per_district_path(monkeypatch, make_model_service):
+    # Dict mode draws features district by district, like the per-row path
+    monkeypatch.setattr(prediction_module, "SIMULATION_MODE", "dict")
+    batched = _service(make_model_service())
+    individual = _service(make_model_service())
+    
+    for tick in range(3):
+        # Dict-mode features are drawn from the module-level random generator
+        random.seed(tick)
+        expected = individual._predict_districts_individually(DISTRICTS)
+        random.seed(tick)
+        actual = batched._predict_districts_batched(DISTRICTS)
+        _assert_same_predictions(actual, expected)
+    
+    np.testing.assert_allclose(
+        batched.simulation_service.lag_state.values, individual.simulation_service.lag_state.values
+    )
+
+
+def test_failed_batch_call_is_retried_per_district(monkeypatch):
+    service = _service(ModelService())
+    calls = []
+    
+    def predict(matrix, districts, shadow=True):
+        calls.append(len(matrix))
+        if len(matrix) > 1 or districts[0] == "udupi":
+            raise RuntimeError("boom")
+        return service.fallback.predict(matrix), ["v"]
+    
+    monkeypatch.setattr(type(service.model_service), "is_loaded", property(lambda self: True))
+    monkeypatch.setattr(service.model_registry, "predict", predict)
+    
+    predictions = service._predict_districts_batched(DISTRICTS)
+    
+    assert calls == [len(DISTRICTS)] + [1] * len(DISTRICTS)
+    assert [item["district"] for item in predictions] == [d for d in DISTRICTS if d != "udupi"]
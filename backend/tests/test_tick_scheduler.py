@@ -0,0 +1,68 @@
+"""Tests for TickScheduler deadlines and missed-tick policies."""
+
+import asyncio
+
+import pytest
+
+import services.tick_scheduler as scheduler_module
+from services.metrics import MetricsRegistry
+from services.tick_scheduler import TickScheduler
+
+
+class _Stop(Exception):
+    pass
+
+
+def _run(policy, durations, monkeypatch):
+    """Run a scheduler with interval 1.0 on a fake clock; return tick start times."""
+    now = [0.0]
+    starts = []
+    
+    async def fake_sleep(seconds):
+        now[0] += seconds
+    
+    async def tick():
+        starts.append(now[0])
+        if len(starts) > len(durations):
+            raise _Stop
+        now[0] += durations[len(starts) - 1]
+    
+    monkeypatch.setattr(scheduler_module.asyncio, "sleep", fake_sleep)
+    scheduler = TickScheduler(
+        interval=1.0, policy=policy, clock=lambda: now[0], registry=MetricsRegistry()
+    )
+    with pytest.raises(_Stop):
+        asyncio.run(scheduler.run(tick))
+    
+    return starts, scheduler.get_stats()
+
+
+def test_ticks_stay_on_absolute_deadlines(monkeypatch):
+    starts, stats = _run("skip", [0.25, 0.5, 0.75, 0.1], monkeypatch)
+    assert starts == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert stats["overruns"] == 0
+
+
+def test_skip_drops_missed_deadlines(monkeypatch):
+    # The second tick runs from 1.0 to 3.5, missing the deadlines at 2.0 and 3.0
+    starts, stats = _run("skip", [0.1, 2.5, 0.1], monkeypatch)
+    assert starts == [0.0, 1.0, 4.0, 5.0]
+    assert (stats["overruns"], stats["skipped_ticks"]) == (1, 2)
+
+
+def test_catch_up_runs_missed_ticks_back_to_back(monkeypatch):
+    starts, stats = _run("catch_up", [0.1, 2.5, 0.1, 0.1, 0.1], monkeypatch)
+    assert starts == [0.0, 1.0, 3.5, 3.6, 4.0, 5.0]
+    # The first catch-up tick also finishes past its deadline at 3.0
+    assert (stats["overruns"], stats["skipped_ticks"]) == (2, 0)
+
+
+def test_coalesce_runs_one_tick_then_resumes(monkeypatch):
+    starts, stats = _run("coalesce", [0.1, 2.5, 0.1], monkeypatch)
+    assert starts == [0.0, 1.0, 3.5, 4.0]
+    assert (stats["overruns"], stats["skipped_ticks"]) == (1, 1)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        TickScheduler(policy="later", registry=MetricsRegistry())
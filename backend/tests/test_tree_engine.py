@@ -0,0 +1,74 @@
+"""Parity tests for the NumPy tree engine against the XGBoost booster."""
+
+import numpy as np
+import pytest
+
+from services.tree_engine import NumpyTreeEnsemble
+
+xgb = pytest.importorskip("xgboost")
+
+N_FEATURES = 8
+
+
+@pytest.fixture(scope="module")
+def booster():
+    rng = np.random.default_rng(0)
+    features = rng.uniform(-10, 10, size=(2000, N_FEATURES)).astype(np.float32)
+    features[rng.random(features.shape) < 0.1] = np.nan
+    # Column 0 drives the target, so leaves and splits both read it
+    target = np.nan_to_num(features[:, 0]) * 2 + np.nan_to_num(features[:, 1]) ** 2
+    dtrain = xgb.DMatrix(features, label=target)
+    return xgb.train(
+        {"max_depth": 5, "eta": 0.3, "objective": "reg:squarederror", "base_score": 0.5},
+        dtrain,
+        num_boost_round=30,
+    )
+
+
+def _inputs(seed: int, n_rows: int = 3000) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    features = rng.uniform(-15, 15, size=(n_rows, N_FEATURES)).astype(np.float32)
+    draws = rng.random(features.shape)
+    features[draws < 0.05] = np.inf
+    features[(draws >= 0.05) & (draws < 0.10)] = -np.inf
+    features[(draws >= 0.10) & (draws < 0.15)] = np.nan
+    return features
+
+
+def test_matches_booster_on_finite_inputs(booster):
+    engine = NumpyTreeEnsemble.from_booster(booster)
+    features = np.random.default_rng(1).uniform(-15, 15, size=(3000, N_FEATURES)).astype(np.float32)
+    
+    np.testing.assert_allclose(engine.predict(features), booster.inplace_predict(features), rtol=1e-5, atol=1e-4)
+
+
+def test_matches_booster_on_non_finite_inputs(booster):
+    engine = NumpyTreeEnsemble.from_booster(booster)
+    features = _inputs(seed=2)
+    
+    np.testing.assert_allclose(engine.predict(features), booster.inplace_predict(features), rtol=1e-5, atol=1e-4)
+
+
+def test_leaves_stay_put_when_column_zero_is_inf(booster):
+    engine = NumpyTreeEnsemble.from_booster(booster)
+    features = np.random.default_rng(5).uniform(-15, 15, size=(500, N_FEATURES)).astype(np.float32)
+    features[:, 0] = np.inf
+    
+    np.testing.assert_allclose(engine.predict(features), booster.inplace_predict(features), rtol=1e-5, atol=1e-4)
+
+
+def test_chunking_does_not_change_predictions(booster):
+    engine = NumpyTreeEnsemble.from_booster(booster)
+    features = _inputs(seed=3, n_rows=1000)
+    
+    np.testing.assert_array_equal(engine.predict(features, chunk_rows=97), engine.predict(features))
+
+
+def test_save_and_load_round_trip(booster, tmp_path):
+    engine = NumpyTreeEnsemble.from_booster(booster)
+    path = tmp_path / "model.trees.npz"
+    engine.save(path)
+    loaded = NumpyTreeEnsemble.load(path)
+    features = _inputs(seed=4, n_rows=500)
+    
+    np.testing.assert_array_equal(loaded.predict(features), engine.predict(features))
@@ -0,0 +1,175 @@
+"""Tests for WebSocketManager delivery, subscriptions and backfill."""
+
+import asyncio
+import json
+
+from services.websocket_manager import WebSocketManager
+
+
+class FakeWebSocket:
+    """Records the JSON frames a client would receive."""
+    
+    def __init__(self, **query):
+        self.query_params = query
+        self.scope = {"subprotocols": []}
+        self.received = []
+    
+    async def accept(self, subprotocol=None):
+        pass
+    
+    async def send_text(self, text):
+        self.received.append(json.loads(text))
+    
+    async def send_bytes(self, data):
+        raise AssertionError("unexpected binary frame")
+    
+    async def close(self, code=None):
+        pass
+    
+    def take(self):
+        """Return and forget the messages received so far."""
+        received, self.received = self.received, []
+        return received
+
+
+def _batch(flags):
+    return {
+        "type": "batch_prediction",
+        "items": [
+            {
+                "ts": "2026-01-01T00:00:00+00:00",
+                "district": district,
+                "disease": "Dengue",
+                "predicted_log": 1.0,
+                "predicted_cases": 2.0,
+                "predicted_cases_rounded": 2,
+                "outbreak_prob": 0.9 if flag else 0.1,
+                "outbreak_flag": flag,
+                "model_version": "v1",
+            }
+            for district, flag in flags.items()
+        ],
+    }
+
+
+def _districts(frame):
+    return [item["district"] for item in frame["items"]]
+
+
+async def _settle():
+    """Let the per-client sender tasks deliver their queued frames."""
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+
+async def _connect(manager, **query):
+    websocket = FakeWebSocket(**query)
+    await manager.connect(websocket)
+    await manager.send_initial_state(websocket)
+    await _settle()
+    return websocket
+
+
+def test_outbreak_delta_clients_receive_the_cleared_transition():
+    async def run():
+        manager = WebSocketManager()
+        client = await _connect(manager, mode="delta")
+        await manager.handle_client_message(
+            client, json.dumps({"type": "subscribe", "outbreaks_only": True})
+        )
+        await _settle()
+        client.take()
+        
+        await manager.broadcast(_batch({"ballari": True, "udupi": False}))
+        await manager.broadcast(_batch({"ballari": False, "udupi": False}))
+        await manager.broadcast(_batch({"ballari": False, "udupi": False}))
+        await _settle()
+        await manager.shutdown()
+        return client.take()
+    
+    raised, cleared, quiet = asyncio.run(run())
+    assert _districts(raised) == ["ballari"]
+    assert [(item["district"], item["flag_transition"]) for item in cleared["items"]] == [
+        ("ballari", "cleared")
+    ]
+    assert quiet["items"] == []
+
+
+def test_subscriptions_receive_their_slice():
+    async def run():
+        manager = WebSocketManager()
+        everything = await _connect(manager)
+        ballari = await _connect(manager)
+        outbreaks = await _connect(manager)
+        nothing = await _connect(manager)
+        for client, subscribe in [
+            (ballari, {"districts": ["ballari"]}),
+            (outbreaks, {"outbreaks_only": True}),
+            (nothing, {"districts": ["kodagu"]}),
+        ]:
+            await manager.handle_client_message(client, json.dumps({"type": "subscribe", **subscribe}))
+        await _settle()
+        acks = [client.take()[-1] for client in (ballari, outbreaks, nothing)]
+        everything.take()
+        
+        await manager.broadcast(_batch({"ballari": False, "udupi": True, "mysuru": False}))
+        await _settle()
+        await manager.shutdown()
+        return acks, [client.take() for client in (everything, ballari, outbreaks, nothing)]
+    
+    acks, (everything, ballari, outbreaks, nothing) = asyncio.run(run())
+    assert acks[0] == {
+        "type": "subscribed", "districts": ["ballari"], "diseases": [], "outbreaks_only": False
+    }
+    assert _districts(everything[0]) == ["ballari", "udupi", "mysuru"]
+    assert _districts(ballari[0]) == ["ballari"]
+    assert _districts(outbreaks[0]) == ["udupi"]
+    assert nothing == []
+
+
+def test_invalid_subscribe_messages_are_rejected():
+    async def run():
+        manager = WebSocketManager()
+        client = await _connect(manager)
+        await manager.handle_client_message(
+            client, json.dumps({"type": "subscribe", "districts": ["ballari"]})
+        )
+        for bad in [
+            {"districts": "ballari"},
+            {"diseases": [["Dengue"]]},
+            {"districts": {"ballari": 1}},
+            {"outbreaks_only": "yes"},
+        ]:
+            await manager.handle_client_message(client, json.dumps({"type": "subscribe", **bad}))
+        await _settle()
+        replies = client.take()
+        
+        await manager.broadcast(_batch({"ballari": False, "udupi": False}))
+        await _settle()
+        connected = manager.get_connection_count()
+        await manager.shutdown()
+        return replies, client.take(), connected
+    
+    replies, batches, connected = asyncio.run(run())
+    assert replies[0]["type"] == "subscribed"
+    assert [reply["type"] for reply in replies[1:]] == ["error"] * 4
+    assert "districts" in replies[1]["message"]
+    # The earlier subscription still applies and the client stays connected
+    assert _districts(batches[0]) == ["ballari"]
+    assert connected == 1
+
+
+def test_new_clients_are_backfilled_from_the_latest_batch():
+    async def run():
+        manager = WebSocketManager()
+        await manager.broadcast(_batch({"ballari": False}))
+        await manager.broadcast(_batch({"ballari": True}))
+        full = await _connect(manager)
+        delta = await _connect(manager, mode="delta")
+        await manager.shutdown()
+        return full.take(), delta.take()
+    
+    full, delta = asyncio.run(run())
+    assert [frame["type"] for frame in full] == ["batch_prediction"]
+    assert full[0]["items"][0]["outbreak_flag"] is True
+    assert delta == [{"type": "batch_snapshot", "seq": 2, "items": _batch({"ballari": True})["items"]}]